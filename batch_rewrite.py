@@ -0,0 +1,69 @@
+# batch_rewrite.py
+"""
+Офлайн-рерайт резюме под вакансии без Telegram.
+
+Входной JSONL — по одной паре в строке:
+    {"id": "pair-1", "resume": {...}, "vacancy": {...}}
+resume и vacancy — ответ API HH (/resumes/{id}, /vacancies/{id}) или уже
+распарсенные данные; id необязателен (по умолчанию — хэш содержимого).
+
+Результаты дописываются в выходной JSONL по мере готовности. Повторный запуск
+с тем же выходным файлом продолжает работу: успешно обработанные пары
+пропускаются, неудачные выполняются заново.
+
+Запуск (нужен OPENAI_API_KEY в окружении или .env):
+    python batch_rewrite.py pairs.jsonl [-o results.jsonl] [--concurrency 4] [--no-cache]
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from config.config import RewriteMode, load_pipeline_config
+from core.logger import setup_logger
+from services.batch_runner import BatchRunner
+from services.llm_cache import LLMResultCache
+from services.llm_service import LLMService
+
+logger = setup_logger(__name__)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Входной JSONL с парами резюме/вакансия")
+    parser.add_argument("-o", "--output", help="Выходной JSONL (по умолчанию <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Сколько пар обрабатывать одновременно")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш результатов LLM")
+    parser.add_argument("--log-every", type=int, default=10, help="Как часто писать прогресс в лог (в парах)")
+    args = parser.parse_args()
+
+    output_path = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    config = load_pipeline_config()
+    result_cache = None if args.no_cache else LLMResultCache(
+        db_path=config.storage.llm_cache_path,
+        max_entries=config.cache.llm_max_entries,
+        ttl=config.cache.llm_ttl
+    )
+    llm_service = LLMService(config, result_cache=result_cache)
+    # Потоковый рерайт имеет смысл только для показа прогресса в Telegram
+    rewrite_mode = config.openai.rewrite_mode
+    if rewrite_mode == RewriteMode.STREAM:
+        rewrite_mode = RewriteMode.SINGLE
+    runner = BatchRunner(
+        llm_service,
+        concurrency=args.concurrency,
+        rewrite_mode=rewrite_mode,
+        log_every=args.log_every
+    )
+
+    try:
+        stats = await runner.run(args.input, output_path)
+    finally:
+        await llm_service.close()
+
+    print(f"\nРезультаты: {output_path}")
+    print(json.dumps(stats.summary(llm_service), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
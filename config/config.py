@@ -1,8 +1,10 @@
 # config/config.py
 
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
 from os import getenv
 from enum import Enum
+from typing import Optional
 from core.logger import setup_logger
 from dotenv import load_dotenv
 load_dotenv(dotenv_path="./.env", override=True)
@@ -15,11 +17,56 @@ class Environment(Enum):
     DEMO = "demo"
 
 
+class RewriteMode(Enum):
+    """Режим выполнения финального рерайта."""
+    SINGLE = "single"   # один запрос, результат целиком
+    STREAM = "stream"   # один запрос с потоковым показом прогресса
+    FANOUT = "fanout"   # параллельные запросы по разделам резюме
+
+
+class PipelineMode(Enum):
+    """Режим пайплайна рерайта."""
+    TWO_STAGE = "two_stage"   # GAP-анализ, затем отдельный рерайт
+    FAST = "fast"             # анализ и рерайт одним запросом
+
+
 @dataclass
 class OpenAIConfig:
     """Конфигурация OpenAI."""
     api_key: str
     model_name: str = "gpt-4o-mini-2024-07-18"
+    base_url: Optional[str] = None  # None — API OpenAI; иначе совместимый сервер (например, standins)
+    request_timeout: float = 90.0
+    connect_timeout: float = 10.0
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    max_retries: int = 2
+    rewrite_mode: RewriteMode = RewriteMode.STREAM
+    fanout_concurrency: int = 8
+    pipeline_mode: PipelineMode = PipelineMode.TWO_STAGE
+    # Адаптивный лимит одновременных запросов (см. LLMScheduler)
+    concurrency_initial: int = 8
+    concurrency_min: int = 1
+    concurrency_max: int = 32
+    latency_target: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "OpenAIConfig":
+        """Считывает параметры OpenAI из переменных окружения."""
+        return cls(
+            api_key=getenv("OPENAI_API_KEY"),
+            model_name=cls.model_name,
+            base_url=getenv("OPENAI_BASE_URL") or None,
+            request_timeout=float(getenv("OPENAI_TIMEOUT", cls.request_timeout)),
+            max_connections=int(getenv("OPENAI_MAX_CONNECTIONS", cls.max_connections)),
+            rewrite_mode=RewriteMode(getenv("REWRITE_MODE", cls.rewrite_mode.value).strip().lower()),
+            fanout_concurrency=int(getenv("OPENAI_FANOUT_CONCURRENCY", cls.fanout_concurrency)),
+            pipeline_mode=PipelineMode(getenv("PIPELINE_MODE", cls.pipeline_mode.value).strip().lower()),
+            concurrency_initial=int(getenv("OPENAI_CONCURRENCY_INITIAL", cls.concurrency_initial)),
+            concurrency_min=int(getenv("OPENAI_CONCURRENCY_MIN", cls.concurrency_min)),
+            concurrency_max=int(getenv("OPENAI_CONCURRENCY_MAX", cls.concurrency_max)),
+            latency_target=float(getenv("OPENAI_LATENCY_TARGET", cls.latency_target))
+        )
 
 
 @dataclass
@@ -29,15 +76,177 @@ class HHConfig:
     client_secret: str
     redirect_uri: str
     base_redirect_path: str = ""
+    token_refresh_margin: float = 300.0
+    token_refresh_interval: float = 60.0
+    # Адреса API; переопределяются, например, для локальных заглушек (standins)
+    base_url: str = "https://api.hh.ru"
+    token_url: str = "https://hh.ru/oauth/token"
+    auth_url: str = "https://hh.ru/oauth/authorize"
     
     def update_redirect_uri(self, new_base_url: str):
         self.redirect_uri = new_base_url
 
 
+@dataclass
+class HTTPConfig:
+    """Конфигурация пула HTTP-соединений для внешних API."""
+    total_timeout: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    limit: int = 100
+    limit_per_host: int = 20
+    keepalive_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "HTTPConfig":
+        """Считывает параметры пула из переменных окружения (с дефолтами)."""
+        return cls(
+            total_timeout=float(getenv("HTTP_TOTAL_TIMEOUT", cls.total_timeout)),
+            connect_timeout=float(getenv("HTTP_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(getenv("HTTP_READ_TIMEOUT", cls.read_timeout)),
+            limit=int(getenv("HTTP_POOL_LIMIT", cls.limit)),
+            limit_per_host=int(getenv("HTTP_POOL_LIMIT_PER_HOST", cls.limit_per_host)),
+            keepalive_timeout=float(getenv("HTTP_KEEPALIVE_TIMEOUT", cls.keepalive_timeout))
+        )
+
+
+@dataclass
+class HHLimitsConfig:
+    """Ограничение частоты и повторы запросов к API HeadHunter."""
+    app_rate: float = 10.0
+    app_burst: float = 20.0
+    user_rate: float = 2.0
+    user_burst: float = 5.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    retry_budget_ratio: float = 0.2
+    breaker_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "HHLimitsConfig":
+        """Считывает параметры ограничений из переменных окружения."""
+        return cls(
+            app_rate=float(getenv("HH_APP_RATE", cls.app_rate)),
+            app_burst=float(getenv("HH_APP_BURST", cls.app_burst)),
+            user_rate=float(getenv("HH_USER_RATE", cls.user_rate)),
+            user_burst=float(getenv("HH_USER_BURST", cls.user_burst)),
+            max_retries=int(getenv("HH_MAX_RETRIES", cls.max_retries)),
+            backoff_base=float(getenv("HH_BACKOFF_BASE", cls.backoff_base)),
+            backoff_max=float(getenv("HH_BACKOFF_MAX", cls.backoff_max)),
+            retry_budget_ratio=float(getenv("HH_RETRY_BUDGET_RATIO", cls.retry_budget_ratio)),
+            breaker_threshold=int(getenv("HH_BREAKER_THRESHOLD", cls.breaker_threshold)),
+            breaker_reset_timeout=float(getenv("HH_BREAKER_RESET_TIMEOUT", cls.breaker_reset_timeout))
+        )
+
+
+@dataclass
+class StorageConfig:
+    """Конфигурация локального хранилища данных приложения."""
+    data_dir: str = "storage"
+    token_cache_size: int = 1024
+    blob_max_age: float = 14 * 24 * 3600.0
+    archive_segment_mb: int = 64
+    archive_retention_days: float = 30.0
+
+    @property
+    def token_db_path(self) -> str:
+        """Путь к SQLite-базе с токенами пользователей."""
+        return os.path.join(self.data_dir, "tokens.sqlite3")
+
+    @property
+    def fsm_db_path(self) -> str:
+        """Путь к SQLite-базе с состояниями FSM."""
+        return os.path.join(self.data_dir, "fsm.sqlite3")
+
+    @property
+    def blob_dir(self) -> str:
+        """Каталог контентно-адресуемого хранилища крупных объектов."""
+        return os.path.join(self.data_dir, "blobs")
+
+    @property
+    def archive_dir(self) -> str:
+        """Каталог архива прогонов пайплайна (сжатые JSONL-сегменты и индекс)."""
+        return os.path.join(self.data_dir, "archive")
+
+    @property
+    def llm_cache_path(self) -> str:
+        """Путь к SQLite-базе с кэшем результатов LLM."""
+        return os.path.join(self.data_dir, "llm_cache.sqlite3")
+
+    @classmethod
+    def from_env(cls) -> "StorageConfig":
+        """Считывает параметры хранилища из переменных окружения."""
+        return cls(
+            data_dir=getenv("STORAGE_DIR", cls.data_dir),
+            token_cache_size=int(getenv("TOKEN_CACHE_SIZE", cls.token_cache_size)),
+            blob_max_age=float(getenv("BLOB_MAX_AGE", cls.blob_max_age)),
+            archive_segment_mb=int(getenv("ARCHIVE_SEGMENT_MB", cls.archive_segment_mb)),
+            archive_retention_days=float(getenv("ARCHIVE_RETENTION_DAYS", cls.archive_retention_days))
+        )
+
+
+@dataclass
+class CacheConfig:
+    """Конфигурация кэшей приложения."""
+    vacancy_max_size: int = 512
+    vacancy_ttl: float = 600.0
+    llm_max_entries: int = 5000
+    llm_ttl: float = 7 * 24 * 3600.0
+
+    @classmethod
+    def from_env(cls) -> "CacheConfig":
+        """Считывает параметры кэшей из переменных окружения."""
+        return cls(
+            vacancy_max_size=int(getenv("VACANCY_CACHE_SIZE", cls.vacancy_max_size)),
+            vacancy_ttl=float(getenv("VACANCY_CACHE_TTL", cls.vacancy_ttl)),
+            llm_max_entries=int(getenv("LLM_CACHE_MAX_ENTRIES", cls.llm_max_entries)),
+            llm_ttl=float(getenv("LLM_CACHE_TTL", cls.llm_ttl))
+        )
+
+
+@dataclass
+class JobsConfig:
+    """Конфигурация очереди фоновых задач рерайта."""
+    workers: int = 4
+    max_queue: int = 100
+    batch_max_vacancies: int = 20  # сколько вакансий можно прислать одним сообщением или файлом
+    batch_concurrency: int = 10    # сколько вакансий пакета обрабатываются одновременно
+
+    @classmethod
+    def from_env(cls) -> "JobsConfig":
+        """Считывает параметры очереди из переменных окружения."""
+        return cls(
+            workers=int(getenv("JOB_WORKERS", cls.workers)),
+            max_queue=int(getenv("JOB_QUEUE_SIZE", cls.max_queue)),
+            batch_max_vacancies=int(getenv("BATCH_MAX_VACANCIES", cls.batch_max_vacancies)),
+            batch_concurrency=int(getenv("BATCH_CONCURRENCY", cls.batch_concurrency))
+        )
+
+
+class UpdateMode(Enum):
+    """Способ получения обновлений от Telegram."""
+    POLLING = "polling"
+    WEBHOOK = "webhook"
+
+
 @dataclass
 class BotConfig:
     """Конфигурация бота."""
     token: str
+    update_mode: UpdateMode = UpdateMode.POLLING
+    webhook_base_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[str] = None
+    webhook_max_in_flight: int = 100
+
+    @property
+    def webhook_url(self) -> Optional[str]:
+        """Полный URL webhook, который регистрируется в Telegram."""
+        if not self.webhook_base_url:
+            return None
+        return f"{self.webhook_base_url.rstrip('/')}{self.webhook_path}"
 
 
 @dataclass
@@ -47,6 +256,11 @@ class Config:
     hh: HHConfig
     openai: OpenAIConfig
     environment: Environment
+    http: HTTPConfig = field(default_factory=HTTPConfig)
+    hh_limits: HHLimitsConfig = field(default_factory=HHLimitsConfig)
+    storage: StorageConfig = field(default_factory=StorageConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    jobs: JobsConfig = field(default_factory=JobsConfig)
     
     @classmethod
     def get_environment(cls) -> Environment:
@@ -79,17 +293,51 @@ def load_config() -> Config:
     )
     
     config = Config(
-        bot=BotConfig(token=getenv("BOT_TOKEN")),
+        bot=BotConfig(
+            token=getenv("BOT_TOKEN"),
+            update_mode=(
+                UpdateMode.WEBHOOK
+                if getenv("BOT_UPDATE_MODE", "polling").strip().lower() == "webhook"
+                else UpdateMode.POLLING
+            ),
+            webhook_base_url=getenv("WEBHOOK_BASE_URL") or getenv("RENDER_EXTERNAL_URL"),
+            webhook_path=getenv("WEBHOOK_PATH", BotConfig.webhook_path),
+            webhook_secret=getenv("WEBHOOK_SECRET"),
+            webhook_max_in_flight=int(getenv("WEBHOOK_MAX_IN_FLIGHT", BotConfig.webhook_max_in_flight))
+        ),
         hh=HHConfig(
             client_id=getenv("HH_CLIENT_ID"),
             client_secret=getenv("HH_CLIENT_SECRET"),
-            redirect_uri=default_redirect_uri
+            redirect_uri=default_redirect_uri,
+            token_refresh_margin=float(getenv("HH_TOKEN_REFRESH_MARGIN", HHConfig.token_refresh_margin)),
+            token_refresh_interval=float(getenv("HH_TOKEN_REFRESH_INTERVAL", HHConfig.token_refresh_interval)),
+            base_url=getenv("HH_API_BASE_URL", HHConfig.base_url),
+            token_url=getenv("HH_TOKEN_URL", HHConfig.token_url),
+            auth_url=getenv("HH_AUTH_URL", HHConfig.auth_url)
         ),
-        openai=OpenAIConfig(
-            api_key=getenv("OPENAI_API_KEY"),
-            model_name=OpenAIConfig.model_name
-        ),
-        environment=environment
+        openai=OpenAIConfig.from_env(),
+        environment=environment,
+        http=HTTPConfig.from_env(),
+        hh_limits=HHLimitsConfig.from_env(),
+        storage=StorageConfig.from_env(),
+        cache=CacheConfig.from_env(),
+        jobs=JobsConfig.from_env()
     )
     
-    return config
\ No newline at end of file
+    return config
+
+def load_pipeline_config() -> Config:
+    """
+    Конфигурация для запуска пайплайна без бота (офлайн-обработка, бенчмарки).
+
+    Нужны только параметры OpenAI и локального хранилища, поэтому токены
+    Telegram и HeadHunter не требуются: разделы bot и hh не заполняются.
+    """
+    return Config(
+        bot=None,
+        hh=None,
+        openai=OpenAIConfig.from_env(),
+        environment=Config.get_environment(),
+        storage=StorageConfig.from_env(),
+        cache=CacheConfig.from_env()
+    )
@@ -15,13 +15,41 @@ DEFAULT_RESPONSE = "Пожалуйста, используйте кнопки м
 WAITING_RESUME_LINK = "Пожалуйста, отправьте ссылку на ваше резюме с сайта hh.ru"
 INVALID_RESUME_LINK = "Пожалуйста, отправьте корректную ссылку на резюме."
 RESUME_FOUND = "Резюме успешно найдено. Начинаю обработку..."
-RESUME_PARSED = "Резюме успешно обработано.\n\nТеперь отправьте ссылку на вакансию."
+RESUME_PARSED = (
+    "Резюме успешно обработано.\n\nТеперь отправьте ссылку на вакансию.\n"
+    "Для быстрого режима (анализ и рерайт одним запросом) добавьте после ссылки слово «быстро».\n"
+    "Можно прислать сразу несколько ссылок (в сообщении или текстовым файлом) — "
+    "я подготовлю отдельный вариант резюме под каждую вакансию."
+)
 
 # Сообщения для работы со ссылкой вакансии
 INVALID_VACANCY_LINK = "Пожалуйста, отправьте корректную ссылку на вакансию."
 VACANCY_FOUND = "Вакансия успешно найдена. Начинаю обработку..."
 VACANCY_PARSED = "Вакансия успешно обработана...\n\n Ждите подверждения обновления вашего резюме"
 
+# Сообщения очереди задач и прогресса рерайта
+JOB_QUEUED = "⏳ Задача поставлена в очередь (позиция: {position}). Я сообщу о ходе обработки."
+JOB_ALREADY_RUNNING = "Ваше резюме уже обрабатывается. Пожалуйста, дождитесь завершения."
+JOB_QUEUE_FULL = "Сейчас слишком много запросов. Пожалуйста, попробуйте через несколько минут."
+PROGRESS_GAP_STARTED = "🔍 Анализирую соответствие резюме вакансии..."
+PROGRESS_GAP_DONE = "✅ Анализ завершён. Переписываю резюме…"
+PROGRESS_REWRITE_DONE = "✅ Резюме переписано. Обновляю его на hh.ru…"
+STREAM_PREVIEW_HEADER = "✍️ Переписываю резюме…"
+PROGRESS_FAST_STARTED = "⚡ Быстрый режим: анализирую вакансию и переписываю резюме одним запросом…"
+
+# Сообщения пакетного режима (несколько вакансий за раз)
+BATCH_TOO_MANY = "Слишком много вакансий за один раз: {count}. Максимум — {limit}."
+BATCH_INVALID_FILE = "Не удалось прочитать файл. Пришлите текстовый файл со ссылками на вакансии hh.ru."
+BATCH_VACANCIES_FOUND = "📦 Найдено вакансий: {count}. Загружаю их…"
+BATCH_VACANCIES_FAILED = "Не удалось загрузить вакансии: {ids}"
+BATCH_STARTED = "🔍 Готовлю варианты резюме под {total} вакансий…"
+BATCH_PROGRESS = "📦 Готово вариантов: {done} из {total}"
+BATCH_DONE = (
+    "✅ Готово вариантов: {done} из {total}.\n\n"
+    "Резюме на hh.ru не изменялось — выберите подходящий вариант из присланных файлов."
+)
+BATCH_VARIANT_CAPTION = "Вариант резюме под вакансию {url}"
+
 # приветственное сообщение
 GREETING_BASE = (
     "Я бот для создания персонализированных резюме. "
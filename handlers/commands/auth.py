@@ -10,6 +10,7 @@ import os
 from core.states import UserState
 from services.hh_api import HeadHunterAPI
 from services.callback_server import CallbackServer
+from services.oauth_state import PendingLogin
 from core.logger import setup_logger
 from keyboards.reply import get_main_keyboard
 from core.text import (
@@ -25,7 +26,13 @@ from config.config import Config, Environment
 logger = setup_logger(__name__)
 
 class AuthCommandHandler:
-    def __init__(self, bot: Bot, hh_api: HeadHunterAPI, config: Config):
+    def __init__(
+        self,
+        bot: Bot,
+        hh_api: HeadHunterAPI,
+        config: Config,
+        callback_server: Optional[CallbackServer] = None
+    ):
         self.bot = bot
         self.hh_api = hh_api
         self.config = config
@@ -34,42 +41,49 @@ class AuthCommandHandler:
         host = '0.0.0.0'  # Всегда используем 0.0.0.0 для привязки ко всем интерфейсам
         port = int(os.environ.get('PORT', 8000))  # Получаем порт из переменной окружения
         
-        self.callback_server = CallbackServer(
+        # В режиме webhook сервер общий и уже запущен при старте бота
+        self.callback_server = callback_server or CallbackServer(
             host=host,
             port=port
         )
-        self._current_user_id: Optional[int] = None
-        self._current_state: Optional[FSMContext] = None
     
-    async def _handle_auth_code(self, code: str):
+    async def _handle_auth_code(self, code: str, login: PendingLogin) -> bool:
+        """
+        Завершает авторизацию пользователя, которому принадлежит callback.
+        
+        Args:
+            code: Код авторизации от HH
+            login: Авторизация, найденная по параметру state
+            
+        Returns:
+            bool: True, если токены получены
+        """
         try:
-            if self._current_user_id and self._current_state:
-                # Обмениваем код на токены
-                tokens = await self.hh_api.exchange_code_for_tokens(code)
-                # Устанавливаем состояние authorized
-                await self._current_state.set_state(UserState.authorized)
-                
-                # Отправляем сообщение с клавиатурой
-                await self.bot.send_message(
-                    self._current_user_id,
-                    AUTH_SUCCESS_MSG + CHOOSE_ACTION_MSG,
-                    reply_markup=get_main_keyboard()
-                )
-                logger.info(f"Пользователь {self._current_user_id} успешно авторизован")
+            # Обмениваем код на токены
+            await self.hh_api.exchange_code_for_tokens(code, login.user_id)
+            # Устанавливаем состояние authorized
+            await login.state.set_state(UserState.authorized)
+            
+            # Отправляем сообщение с клавиатурой
+            await self.bot.send_message(
+                login.user_id,
+                AUTH_SUCCESS_MSG + CHOOSE_ACTION_MSG,
+                reply_markup=get_main_keyboard()
+            )
+            logger.info(f"Пользователь {login.user_id} успешно авторизован")
+            return True
                 
         except Exception as e:
-            logger.error(f"Ошибка при обработке кода авторизации: {e}")
-            if self._current_user_id:
-                await self.bot.send_message(
-                    self._current_user_id,
-                    AUTH_ERROR_MSG
-                )
+            logger.error(f"Ошибка при обработке кода авторизации пользователя {login.user_id}: {e}")
+            try:
+                await self.bot.send_message(login.user_id, AUTH_ERROR_MSG)
+            except Exception as send_error:
+                logger.error(f"Не удалось сообщить пользователю {login.user_id} об ошибке: {send_error}")
+            return False
     
     async def handle_auth(self, message: Message, state: FSMContext) -> Any:
         """Обработчик команды авторизации."""
         try:
-            self._current_user_id = message.from_user.id
-            self._current_state = state
             await state.set_state(UserState.unauthorized)
             
             # Запускаем сервер для обработки callback
@@ -86,8 +100,9 @@ class AuthCommandHandler:
             #         self.hh_api.redirect_uri = f"{domain}/callback"
             #         logger.info(f"Установлен redirect_uri: {self.hh_api.redirect_uri}")
             
-            # Получаем URL для авторизации
-            auth_url = self.hh_api.get_auth_url()
+            # Получаем URL для авторизации: state связывает callback с этим пользователем
+            login_token = self.callback_server.pending_logins.create(message.from_user.id, state)
+            auth_url = self.hh_api.get_auth_url(state=login_token)
             
             # Сообщение для пользователя
             auth_message = AUTH_INTRO_MSG + auth_url
@@ -1,20 +1,27 @@
 # handlers/messages/rewrite_resume_handler.py
-from typing import Any, Dict, Optional
-import json
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
-from datetime import datetime
-from pathlib import Path
+import re
 from aiogram import Bot
-from aiogram.types import Message
+from aiogram.types import BufferedInputFile, Message
 from aiogram.fsm.context import FSMContext
 from core.states import UserState
 from core.logger import setup_logger
-from models.gap_analysis import GapAnalysisResult
+from models.gap_analysis import ResumeGapAnalysis
 from models.resume import ResumeUpdate
 from services.entity_extractor import EntityExtractor
 from services.hh_api import HeadHunterAPI
 from services.llm_service import LLMService
+from services.llm_scheduler import current_llm_user
 from services.resume_updater import ResumeUpdaterService 
+from services.vacancy_cache import VacancyCache
+from services.job_queue import Job, JobQueue
+from services.blob_store import BlobStore
+from services.message_editor import ThrottledMessageEditor
+from services.stream_parser import StreamEvent
+from services.run_archive import RunArchive
+from config.config import PipelineMode, RewriteMode
 from core.text import (
     ERROR_MSG,
     INVALID_RESUME_LINK,
@@ -23,15 +30,52 @@ from core.text import (
     INVALID_VACANCY_LINK,
     VACANCY_FOUND,
     VACANCY_PARSED,
-    
+    JOB_QUEUED,
+    JOB_ALREADY_RUNNING,
+    JOB_QUEUE_FULL,
+    PROGRESS_GAP_STARTED,
+    PROGRESS_GAP_DONE,
+    PROGRESS_REWRITE_DONE,
+    PROGRESS_FAST_STARTED,
+    STREAM_PREVIEW_HEADER,
+    BATCH_TOO_MANY,
+    BATCH_INVALID_FILE,
+    BATCH_VACANCIES_FOUND,
+    BATCH_VACANCIES_FAILED,
+    BATCH_STARTED,
+    BATCH_PROGRESS,
+    BATCH_DONE,
+    BATCH_VARIANT_CAPTION
 )
 
 logger = setup_logger(__name__)
 
+# Слова после ссылки на вакансию, включающие быстрый режим для этого запроса
+FAST_MODE_FLAGS = {"fast", "быстро", "быстрый"}
+
+# Ссылка на вакансию: https://hh.ru/vacancy/123456?query=...
+VACANCY_LINK_RE = re.compile(r"hh\.ru/vacancy/(\d+)")
+# Максимальный размер файла со списком ссылок
+MAX_LINKS_FILE_SIZE = 1024 * 1024
+
 class RewriteResumeHandler:
     """Обработчик состояния изменения резюме"""
     
-    def __init__(self, bot: Bot, hh_api: HeadHunterAPI, llm_service: LLMService):
+    def __init__(
+        self,
+        bot: Bot,
+        hh_api: HeadHunterAPI,
+        llm_service: LLMService,
+        vacancy_cache: Optional[VacancyCache] = None,
+        blob_store: Optional[BlobStore] = None,
+        run_archive: Optional[RunArchive] = None,
+        rewrite_mode: RewriteMode = RewriteMode.STREAM,
+        pipeline_mode: PipelineMode = PipelineMode.TWO_STAGE,
+        workers: int = 4,
+        max_queue: int = 100,
+        batch_max_vacancies: int = 20,
+        batch_concurrency: int = 10
+    ):
         """
         Инициализация обработчика.
         
@@ -39,12 +83,30 @@ class RewriteResumeHandler:
             bot: Экземпляр бота
             hh_api: Клиент API HeadHunter
             llm_service: Сервис для работы с языковой моделью
+            vacancy_cache: Общий кэш вакансий (если не передан, создаётся собственный)
+            blob_store: Хранилище крупных объектов, на которые ссылается состояние FSM
+            run_archive: Архив прогонов пайплайна (если не передан, прогоны не сохраняются)
+            rewrite_mode: Режим финального рерайта (потоковый, одним запросом или по разделам)
+            pipeline_mode: Режим пайплайна по умолчанию (двухэтапный или быстрый)
+            workers: Количество воркеров очереди рерайта
+            max_queue: Максимальная длина очереди рерайта
+            batch_max_vacancies: Максимум вакансий в одном пакетном запросе
+            batch_concurrency: Сколько вакансий пакета обрабатываются одновременно
         """
         self.bot = bot
         self.hh_api = hh_api
         self.entity_extractor = EntityExtractor()
+        self.vacancy_cache = vacancy_cache or VacancyCache(hh_api, self.entity_extractor)
+        self.blob_store = blob_store or BlobStore(os.path.join("storage", "blobs"))
+        self.run_archive = run_archive
+        self.rewrite_mode = rewrite_mode
+        self.pipeline_mode = pipeline_mode
+        self.batch_max_vacancies = batch_max_vacancies
+        self.batch_concurrency = batch_concurrency
         self.llm_service = llm_service  # Добавляем сервис LLM
         self.resume_updater = ResumeUpdaterService(hh_api)  # Добавляем сервис обновления резюме
+        # Очередь фоновых задач: пайплайн рерайта выполняется вне обработчика сообщений
+        self.job_queue = JobQueue(self._run_rewrite_job, workers=workers, max_queue=max_queue)
     
     async def handle_message(self, message: Message, state: FSMContext) -> Any:
         """Обработка сообщений в состоянии rewrite_resume"""
@@ -69,7 +131,7 @@ class RewriteResumeHandler:
     
     async def _process_resume(self, message: Message, state: FSMContext) -> None:
         """Обработка ссылки на резюме"""
-        if "hh.ru/resume/" not in message.text:
+        if not message.text or "hh.ru/resume/" not in message.text:
             await message.answer(INVALID_RESUME_LINK)
             return
             
@@ -77,7 +139,9 @@ class RewriteResumeHandler:
         
         try:
             # Получаем данные резюме через API
-            resume_data = await self.hh_api.make_api_request(f'/resumes/{resume_id}')
+            resume_data = await self.hh_api.make_api_request(
+                f'/resumes/{resume_id}', user_id=message.from_user.id
+            )
             await message.answer(RESUME_FOUND)
             
             # Парсим резюме
@@ -85,11 +149,11 @@ class RewriteResumeHandler:
             if not parsed_resume:
                 raise ValueError("Не удалось обработать резюме")
                 
-            # Сохраняем данные в состояние
+            # Крупные объекты кладём в BlobStore, в состоянии храним только ссылки
             await state.update_data(
             resume_id=resume_id,
-            original_resume=resume_data,
-            parsed_resume=parsed_resume.model_dump(exclude_none=True),
+            original_resume_ref=await self.blob_store.put(resume_data),
+            parsed_resume_ref=await self.blob_store.put(parsed_resume.model_dump(exclude_none=True)),
             resume_processed=True
         )
             
@@ -99,95 +163,315 @@ class RewriteResumeHandler:
             logger.error(f"Ошибка при обработке резюме: {e}")
             await message.answer(ERROR_MSG)
     
+    async def _read_message_text(self, message: Message) -> Optional[str]:
+        """
+        Текст сообщения со ссылками: текст/подпись или содержимое
+        присланного текстового файла. None, если файл прочитать не удалось.
+        """
+        if not message.document:
+            return message.text or message.caption or ""
+        if message.document.file_size and message.document.file_size > MAX_LINKS_FILE_SIZE:
+            logger.warning(f"Файл со ссылками слишком большой: {message.document.file_size} байт")
+            return None
+        try:
+            content = await self.bot.download(message.document)
+            text = content.read().decode("utf-8", errors="replace")
+        except Exception as e:
+            logger.error(f"Не удалось загрузить файл со ссылками: {e}")
+            return None
+        return "\n".join(filter(None, (message.caption, text)))
+
+    @staticmethod
+    def _extract_vacancy_ids(text: str) -> List[str]:
+        """Идентификаторы вакансий из всех ссылок в тексте (без повторов, в порядке появления)."""
+        return list(dict.fromkeys(VACANCY_LINK_RE.findall(text)))
+
     async def _process_vacancy(self, message: Message, state: FSMContext) -> None:
-        """Обработка ссылки на вакансию"""
-        if "hh.ru/vacancy/" not in message.text:
+        """Обработка ссылки на вакансию (или нескольких ссылок — пакетный режим)"""
+        text = await self._read_message_text(message)
+        if text is None:
+            await message.answer(BATCH_INVALID_FILE)
+            return
+
+        vacancy_ids = self._extract_vacancy_ids(text)
+        if not vacancy_ids:
             await message.answer(INVALID_VACANCY_LINK)
             return
             
-        vacancy_id = message.text.split('/')[-1].split('?')[0]
+        # После ссылки можно указать режим: "https://hh.ru/vacancy/123 быстро"
+        flags = [word for word in text.split() if "hh.ru/vacancy/" not in word]
+        pipeline_mode = (
+            PipelineMode.FAST if any(flag.lower() in FAST_MODE_FLAGS for flag in flags)
+            else self.pipeline_mode
+        )
+
+        if len(vacancy_ids) > 1:
+            await self._process_vacancy_batch(message, state, vacancy_ids, pipeline_mode)
+            return
+        vacancy_id = vacancy_ids[0]
         
         try:
-            # Получаем данные вакансии через API
-            vacancy_data = await self.hh_api.make_api_request(f'/vacancies/{vacancy_id}')
+            # Получаем вакансию (из кэша или через API) вместе с результатом парсинга
+            cached_vacancy = await self.vacancy_cache.get(vacancy_id, user_id=message.from_user.id)
+            if not cached_vacancy:
+                raise ValueError("Не удалось обработать вакансию")
             await message.answer(VACANCY_FOUND)
             
-            # Парсим вакансию
-            parsed_vacancy = self.entity_extractor.extract_vacancy_info(vacancy_data)
-            if not parsed_vacancy:
-                raise ValueError("Не удалось обработать вакансию")
+            vacancy_data = cached_vacancy.raw
+            parsed_vacancy = cached_vacancy.parsed
                 
-            # Сохраняем данные в состояние
+            # Крупные объекты кладём в BlobStore, в состоянии храним только ссылки
             await state.update_data(
                 vacancy_id=vacancy_id,
-                original_vacancy=vacancy_data,
-                parsed_vacancy=parsed_vacancy.model_dump(exclude_none=True)
+                original_vacancy_ref=await self.blob_store.put(vacancy_data),
+                parsed_vacancy_ref=await self.blob_store.put(parsed_vacancy.model_dump(exclude_none=True))
         )
             
             await message.answer(VACANCY_PARSED)
             
             # После успешной обработки вакансии вызываем финальный рерайт
-            await self._finalize_processing(message, state)
+            await self._finalize_processing(message, state, pipeline_mode)
             
         except Exception as e:
             logger.error(f"Ошибка при обработке вакансии: {e}")
             await message.answer(ERROR_MSG)
+
+    async def _process_vacancy_batch(
+        self,
+        message: Message,
+        state: FSMContext,
+        vacancy_ids: List[str],
+        pipeline_mode: PipelineMode
+    ) -> None:
+        """
+        Пакетный режим: загружает все вакансии одновременно и ставит
+        в очередь одну задачу, готовящую вариант резюме под каждую из них.
+        """
+        if len(vacancy_ids) > self.batch_max_vacancies:
+            await message.answer(BATCH_TOO_MANY.format(count=len(vacancy_ids), limit=self.batch_max_vacancies))
+            return
+
+        await message.answer(BATCH_VACANCIES_FOUND.format(count=len(vacancy_ids)))
+        try:
+            # Вакансии загружаются параллельно; частоту запросов к HH ограничивает клиент API
+            results = await asyncio.gather(
+                *(self.vacancy_cache.get(vacancy_id, user_id=message.from_user.id) for vacancy_id in vacancy_ids),
+                return_exceptions=True
+            )
+            loaded = {
+                vacancy_id: cached for vacancy_id, cached in zip(vacancy_ids, results)
+                if cached and not isinstance(cached, BaseException)
+            }
+            failed = [vacancy_id for vacancy_id in vacancy_ids if vacancy_id not in loaded]
+            if failed:
+                logger.warning(f"Не удалось загрузить вакансии {failed}")
+                await message.answer(BATCH_VACANCIES_FAILED.format(ids=", ".join(failed)))
+            if not loaded:
+                await message.answer(ERROR_MSG)
+                return
+
+            refs = await asyncio.gather(*(
+                self.blob_store.put(cached.parsed.model_dump(exclude_none=True))
+                for cached in loaded.values()
+            ))
+            vacancies = [
+                {"vacancy_id": vacancy_id, "parsed_vacancy_ref": ref}
+                for vacancy_id, ref in zip(loaded, refs)
+            ]
+            await self._finalize_processing(message, state, pipeline_mode, vacancies=vacancies)
+
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной обработке вакансий: {e}")
+            await message.answer(ERROR_MSG)
             
-            
-    async def _finalize_processing(self, message: Message, state: FSMContext) -> None:
+    async def _finalize_processing(
+        self,
+        message: Message,
+        state: FSMContext,
+        pipeline_mode: Optional[PipelineMode] = None,
+        vacancies: Optional[List[Dict[str, str]]] = None
+    ) -> None:
+        """
+        Ставит рерайт резюме в очередь фоновых задач и сразу возвращает управление.
+        Сам пайплайн выполняется воркером в _run_rewrite_job.
+        Если передан список вакансий, задача готовит вариант резюме под каждую.
+        """
+        payload = {"state": state, "pipeline_mode": pipeline_mode or self.pipeline_mode}
+        if vacancies:
+            payload["vacancies"] = vacancies
+        try:
+            job = self.job_queue.submit(
+                user_id=message.from_user.id,
+                chat_id=message.chat.id,
+                payload=payload
+            )
+        except ValueError:
+            await message.answer(JOB_ALREADY_RUNNING)
+            return
+
+        if not job:
+            await message.answer(JOB_QUEUE_FULL)
+            return
+
+        await message.answer(JOB_QUEUED.format(position=self.job_queue.queue_depth))
+
+    async def _load_blob(self, ref: Optional[str]) -> Optional[Any]:
+        """Загружает объект из BlobStore по ссылке из состояния (None, если ссылки нет)."""
+        if not ref:
+            return None
+        try:
+            return await self.blob_store.get(ref)
+        except FileNotFoundError:
+            logger.error(f"Объект {ref} отсутствует в хранилище")
+            return None
+
+    async def _rewrite(
+        self,
+        job: Job,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis
+    ) -> Optional[ResumeUpdate]:
+        """Финальный рерайт в режиме, выбранном в конфигурации."""
+        if self.rewrite_mode == RewriteMode.STREAM:
+            return await self._stream_rewrite(job, parsed_resume, gap_result)
+        if self.rewrite_mode == RewriteMode.FANOUT:
+            return await self.llm_service.final_resume_rewrite_fanout(parsed_resume, gap_result)
+        return await self.llm_service.final_resume_rewrite(parsed_resume, gap_result)
+
+    async def _stream_rewrite(
+        self,
+        job: Job,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis
+    ) -> Optional[ResumeUpdate]:
+        """
+        Потоковый рерайт: одно сообщение пользователю редактируется
+        по мере того, как модель выдаёт готовые разделы резюме.
+        """
+        editor = ThrottledMessageEditor(self.bot, job.chat_id)
+        sections: Dict[str, Any] = {}
+        experience: Dict[int, dict] = {}
+
+        async def on_event(event: StreamEvent) -> None:
+            if event.section == "experience" and event.index is not None:
+                experience[event.index] = event.value
+            else:
+                sections[event.section] = event.value
+            await editor.update(self._render_stream_preview(sections, experience))
+
+        await editor.update(STREAM_PREVIEW_HEADER)
+        final_resume = await self.llm_service.stream_final_resume_rewrite(
+            parsed_resume, gap_result, on_event
+        )
+        await editor.finish()
+        return final_resume
+
+    @staticmethod
+    def _render_stream_preview(sections: Dict[str, Any], experience: Dict[int, dict]) -> str:
+        """Формирует текст промежуточного сообщения из готовых разделов."""
+        lines = [STREAM_PREVIEW_HEADER, ""]
+        if sections.get("title"):
+            lines.append(f"📌 {sections['title']}")
+        if sections.get("skill_set"):
+            lines.append(f"🛠 {', '.join(sections['skill_set'])}")
+        for index in sorted(experience):
+            entry = experience[index]
+            description = entry.get("description", "")
+            if len(description) > 300:
+                description = description[:300] + "…"
+            lines.append(f"\n💼 {entry.get('position', '')}\n{description}")
+        return "\n".join(lines)
+
+    async def _report_progress(self, job: Job, stage: str, text: str) -> None:
+        """Фиксирует этап задачи и сообщает о нём пользователю."""
+        job.stage = stage
+        try:
+            await self.bot.send_message(job.chat_id, text)
+        except Exception as e:
+            logger.error(f"Не удалось отправить сообщение о прогрессе задачи {job.job_id}: {e}")
+
+    async def _run_rewrite_job(self, job: Job) -> None:
         """
-        Завершает обработку резюме и вакансии.
+        Выполняет пайплайн рерайта (вызывается воркером очереди).
         1) Запуск GAP-анализа
-        2) Отправка результатов GAP-анализа (если нужно)
+        2) Отправка прогресса пользователю
         3) Финальный рерайт резюме
         4) Обновление резюме через API
         5) Возврат пользователя в состояние authorized
         """
+        if job.payload.get("vacancies"):
+            await self._run_batch_job(job)
+            return
+
+        state: FSMContext = job.payload["state"]
+        chat_id = job.chat_id
+        # Запросы к модели в этой задаче планируются как запросы этого пользователя
+        current_llm_user.set(job.user_id)
         try:
-            # Получаем данные из состояния
+            # Получаем ссылки из состояния и загружаем сами данные из BlobStore
             data = await state.get_data()
-            parsed_resume = data.get('parsed_resume')
-            parsed_vacancy = data.get('parsed_vacancy')
-            original_resume = data.get('original_resume')
             resume_id = data.get('resume_id')
+            parsed_resume = await self._load_blob(data.get('parsed_resume_ref'))
+            parsed_vacancy = await self._load_blob(data.get('parsed_vacancy_ref'))
+            original_resume = await self._load_blob(data.get('original_resume_ref'))
             
             if not parsed_resume or not parsed_vacancy:
-                await message.answer("Внутренняя ошибка: отсутствуют данные резюме или вакансии.")
+                await self.bot.send_message(chat_id, "Внутренняя ошибка: отсутствуют данные резюме или вакансии.")
                 return
             
-            # 1. Запускаем GAP-анализ
-            gap_result = self.llm_service.gap_analysis(parsed_resume, parsed_vacancy)
-            if not gap_result:
-                logger.error("GAP-анализ вернул None.")
-                await message.answer("Произошла ошибка при GAP-анализе. Попробуйте позже.")
-                return
+            if job.payload.get("pipeline_mode") == PipelineMode.FAST:
+                # 1-2. Быстрый режим: анализ и рерайт одним запросом
+                await self._report_progress(job, "fast_rewrite", PROGRESS_FAST_STARTED)
+                fast_result = await self.llm_service.fast_analysis_rewrite(
+                    parsed_resume, parsed_vacancy, vacancy_id=data.get('vacancy_id')
+                )
+                if not fast_result:
+                    await self.bot.send_message(chat_id, "Произошла ошибка при рерайте резюме. Попробуйте позже.")
+                    return
+                gap_result, final_resume = fast_result
+            else:
+                # 1. Запускаем GAP-анализ
+                await self._report_progress(job, "gap_analysis", PROGRESS_GAP_STARTED)
+                gap_result = await self.llm_service.gap_analysis(
+                    parsed_resume, parsed_vacancy, vacancy_id=data.get('vacancy_id')
+                )
+                if not gap_result:
+                    logger.error("GAP-анализ вернул None.")
+                    await self.bot.send_message(chat_id, "Произошла ошибка при GAP-анализе. Попробуйте позже.")
+                    return
 
-            # 2. Финальный рерайт (учитывает результаты GAP-анализа)
-            final_resume = self.llm_service.final_resume_rewrite(parsed_resume, gap_result)
-            if not final_resume:
-                await message.answer("Произошла ошибка при финальном рерайте. Попробуйте позже.")
-                return
-            
-            # 3. Логируем всё в отдельную папку
-            self._save_process_logs(
-                resume_id=resume_id,
-                original_resume=original_resume,
-                parsed_resume=parsed_resume,
-                parsed_vacancy=parsed_vacancy,
-                gap_result=gap_result,
-                final_resume=final_resume
-            )
+                # 2. Финальный рерайт (учитывает результаты GAP-анализа)
+                await self._report_progress(job, "rewrite", PROGRESS_GAP_DONE)
+                final_resume = await self._rewrite(job, parsed_resume, gap_result)
+                if not final_resume:
+                    await self.bot.send_message(chat_id, "Произошла ошибка при финальном рерайте. Попробуйте позже.")
+                    return
             
+            # 3. Сохраняем прогон в архив (запись на диск выполняется в фоне)
+            if self.run_archive:
+                self.run_archive.archive({
+                    "user_id": job.user_id,
+                    "resume_id": resume_id,
+                    "vacancy_id": data.get('vacancy_id'),
+                    "pipeline_mode": job.payload.get("pipeline_mode", self.pipeline_mode).value,
+                    "original_resume": original_resume,
+                    "parsed_resume": parsed_resume,
+                    "parsed_vacancy": parsed_vacancy,
+                    "gap_analysis": gap_result.model_dump(exclude_none=True),
+                    "final_resume": final_resume.model_dump(exclude_none=True)
+                })
 
             # Обновляем резюме через API (например, patch-запросом)
+            await self._report_progress(job, "update", PROGRESS_REWRITE_DONE)
             updated_resume = await self.resume_updater.update_resume(
                 resume_id=resume_id,
                 existing_resume=original_resume,
-                rewritten_resume=final_resume
+                rewritten_resume=final_resume,
+                user_id=job.user_id
             )
 
             if not updated_resume:
-                await message.answer("Произошла ошибка при обновлении резюме на сайте.")
+                await self.bot.send_message(chat_id, "Произошла ошибка при обновлении резюме на сайте.")
                 return
 
             # Формируем ссылку на обновлённое резюме и выводим её пользователю
@@ -198,74 +482,124 @@ class RewriteResumeHandler:
                 f"{resume_url}"
             )
 
-            await message.answer(success_message)
+            await self.bot.send_message(chat_id, success_message)
 
             # Возвращаемся в состояние authorized
             await state.set_state(UserState.authorized)
 
         except Exception as e:
             logger.error(f"Ошибка при финализации обработки: {e}")
-            await message.answer(
+            await self.bot.send_message(
+                chat_id,
                 "Произошла ошибка при обновлении резюме. Пожалуйста, попробуйте позже."
             )
+            raise
             
-    def _save_process_logs(
-        self,
-        resume_id: str,
-        original_resume: dict,
-        parsed_resume: dict,
-        parsed_vacancy: dict,
-        gap_result: GapAnalysisResult, 
-        final_resume: ResumeUpdate
-    ) -> None:
+    async def _run_batch_job(self, job: Job) -> None:
         """
-        Сохраняет все промежуточные и финальные данные в отдельную папку:
-         - LOG/<yyyy-mm-dd_HH-MM-SS>_<resume_id>/
-             original_resume.json
-             parsed_resume.json
-             original_vacancy.json
-             parsed_vacancy.json
-             gap_analysis.json
-             final_resume.json
+        Пакетный пайплайн: вариант резюме под каждую вакансию из payload["vacancies"].
+
+        Резюме загружается один раз и передаётся во все пайплайны одним объектом
+        (его представление для промптов строится один раз), вакансии обрабатываются
+        параллельно, поэтому пакет занимает примерно столько же, сколько самая
+        долгая вакансия. Резюме на hh.ru не изменяется: каждый вариант
+        отправляется пользователю отдельным файлом.
         """
+        state: FSMContext = job.payload["state"]
+        vacancies: List[Dict[str, str]] = job.payload["vacancies"]
+        pipeline_mode = job.payload.get("pipeline_mode")
+        chat_id = job.chat_id
+        current_llm_user.set(job.user_id)
         try:
-            # 1) Определяем директорию для логов
-            log_root = Path("LOG")
-            log_root.mkdir(exist_ok=True)
-            
-            # 2) Формируем название подпапки с датой/временем и resume_id (или UUID)
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            folder_name = f"{timestamp}_{resume_id}"
-            folder_path = log_root / folder_name
-            folder_path.mkdir(exist_ok=True)
-            
-            # 3) Сохраняем каждый объект в отдельный JSON-файл
-            self._write_json(folder_path / "original_resume.json", original_resume)
-            self._write_json(folder_path / "parsed_resume.json", parsed_resume)
-            
-            # Если есть "original_vacancy" (сырые данные вакансии),
-            # можете так же сохранить:
-            # self._write_json(folder_path / "original_vacancy.json", original_vacancy)
+            data = await state.get_data()
+            parsed_resume = await self._load_blob(data.get('parsed_resume_ref'))
+            if not parsed_resume:
+                await self.bot.send_message(chat_id, "Внутренняя ошибка: отсутствуют данные резюме.")
+                return
 
-            # parsed_vacancy — это уже разбор вакансии
-            self._write_json(folder_path / "parsed_vacancy.json", parsed_vacancy)
-            
-            # gap_result — pydantic-модель, преобразуем в dict
-            gap_dict = gap_result.model_dump(exclude_none=True)
-            self._write_json(folder_path / "gap_analysis.json", gap_dict)
-            
-            # финальное резюме тоже pydantic-модель
-            final_resume_dict = final_resume.model_dump(exclude_none=True)
-            self._write_json(folder_path / "final_resume.json", final_resume_dict)
+            total = len(vacancies)
+            await self._report_progress(job, "batch", BATCH_STARTED.format(total=total))
+            editor = ThrottledMessageEditor(self.bot, chat_id)
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            finished = 0
+            succeeded = 0
+
+            async def process(item: Dict[str, str]) -> None:
+                nonlocal finished, succeeded
+                async with semaphore:
+                    final_resume = await self._tailor_variant(parsed_resume, item, pipeline_mode)
+                if final_resume and await self._send_variant(chat_id, item["vacancy_id"], final_resume):
+                    succeeded += 1
+                finished += 1
+                await editor.update(BATCH_PROGRESS.format(done=finished, total=total))
+
+            await asyncio.gather(*(process(item) for item in vacancies))
+            await editor.finish()
+
+            logger.info(f"Пакет задачи {job.job_id}: готово {succeeded} из {total} вариантов")
+            await self.bot.send_message(chat_id, BATCH_DONE.format(done=succeeded, total=total))
+            await state.set_state(UserState.authorized)
 
-            logger.info(
-                f"Данные рерайта (ID {resume_id}) сохранены в папку: {folder_path}"
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной обработке: {e}")
+            await self.bot.send_message(chat_id, ERROR_MSG)
+            raise
+
+    async def _tailor_variant(
+        self,
+        parsed_resume: dict,
+        item: Dict[str, str],
+        pipeline_mode: Optional[PipelineMode]
+    ) -> Optional[ResumeUpdate]:
+        """GAP-анализ и рерайт резюме под одну вакансию пакета (None при ошибке)."""
+        vacancy_id = item["vacancy_id"]
+        try:
+            parsed_vacancy = await self._load_blob(item.get("parsed_vacancy_ref"))
+            if not parsed_vacancy:
+                return None
+            if pipeline_mode == PipelineMode.FAST:
+                fast_result = await self.llm_service.fast_analysis_rewrite(
+                    parsed_resume, parsed_vacancy, vacancy_id=vacancy_id
+                )
+                return fast_result[1] if fast_result else None
+
+            gap_result = await self.llm_service.gap_analysis(
+                parsed_resume, parsed_vacancy, vacancy_id=vacancy_id
             )
+            if not gap_result:
+                return None
+            # Потоковый предпросмотр для пакета не нужен: вариант приходит файлом
+            if self.rewrite_mode == RewriteMode.FANOUT:
+                return await self.llm_service.final_resume_rewrite_fanout(parsed_resume, gap_result)
+            return await self.llm_service.final_resume_rewrite(parsed_resume, gap_result)
+        except Exception as e:
+            logger.error(f"Ошибка при подготовке варианта под вакансию {vacancy_id}: {e}")
+            return None
 
-        except Exception as log_exc:
-            logger.error(f"Ошибка при сохранении логов в папку: {log_exc}")
+    async def _send_variant(self, chat_id: int, vacancy_id: str, final_resume: ResumeUpdate) -> bool:
+        """Отправляет вариант резюме текстовым файлом."""
+        url = f"https://hh.ru/vacancy/{vacancy_id}"
+        try:
+            document = BufferedInputFile(
+                self._render_variant(url, final_resume).encode("utf-8"),
+                filename=f"resume_for_vacancy_{vacancy_id}.txt"
+            )
+            await self.bot.send_document(chat_id, document, caption=BATCH_VARIANT_CAPTION.format(url=url))
+            return True
+        except Exception as e:
+            logger.error(f"Не удалось отправить вариант под вакансию {vacancy_id}: {e}")
+            return False
 
-    def _write_json(self, file_path: Path, data: dict) -> None:
-        """Утилита для записи словаря в JSON-файл с отступами."""
-        with file_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    @staticmethod
+    def _render_variant(url: str, final_resume: ResumeUpdate) -> str:
+        """Текст варианта резюме для файла."""
+        lines = [f"Вакансия: {url}", "", f"Желаемая должность: {final_resume.title}"]
+        if final_resume.skill_set:
+            lines.append(f"Ключевые навыки: {', '.join(final_resume.skill_set)}")
+        if final_resume.skills:
+            lines += ["", "О себе:", final_resume.skills]
+        if final_resume.experience:
+            lines += ["", "Опыт работы:"]
+            for entry in final_resume.experience:
+                lines += ["", entry.position, entry.description]
+        return "\n".join(lines) + "\n"
@@ -1,14 +1,22 @@
 # main.py
 import asyncio
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.filters import Command, StateFilter
-from aiogram.fsm.storage.memory import MemoryStorage
-from config.config import load_config, Config
+from config.config import load_config, Config, UpdateMode
 from core.logger import setup_logger
 from core.states import UserState
 from services.hh_api import HeadHunterAPI
+from services.token_vault import TokenVault
+from services.token_refresher import TokenRefreshScheduler
 from services.llm_service import LLMService
+from services.llm_cache import LLMResultCache
 from services.demo_service import DemoService
+from services.vacancy_cache import VacancyCache
+from services.blob_store import BlobStore
+from services.run_archive import RunArchive
+from services.fsm_storage import SQLiteStorage
+from services.callback_server import CallbackServer
 
 from handlers.commands.start import StartCommandHandler
 from handlers.commands.auth import AuthCommandHandler
@@ -22,7 +30,13 @@ from handlers.messages.no_state_handler import no_state_message_handler
 
 logger = setup_logger(__name__)
 
-async def register_command_handlers(dp: Dispatcher, bot: Bot, config: Config, hh_api: HeadHunterAPI) -> None:
+async def register_command_handlers(
+    dp: Dispatcher,
+    bot: Bot,
+    config: Config,
+    hh_api: HeadHunterAPI,
+    callback_server: Optional[CallbackServer] = None
+) -> None:
     """
     Регистрация обработчиков команд бота.
     
@@ -30,11 +44,12 @@ async def register_command_handlers(dp: Dispatcher, bot: Bot, config: Config, hh
         dp: Диспетчер для регистрации обработчиков
         bot: Экземпляр бота для обработчиков
         config: Конфигурация приложения
+        callback_server: Общий веб-сервер (в режиме webhook)
     """
     
     # Инициализируем обработчики команд
     start_handler = StartCommandHandler(bot)
-    auth_handler = AuthCommandHandler(bot, hh_api, config)
+    auth_handler = AuthCommandHandler(bot, hh_api, config, callback_server)
     
     # Регистрируем обработчики
     dp.message.register(
@@ -49,7 +64,13 @@ async def register_command_handlers(dp: Dispatcher, bot: Bot, config: Config, hh
     
     logger.info("Зарегистрированы обработчики команд")
 
-async def register_message_handlers(dp: Dispatcher, bot: Bot, config: Config, hh_api: HeadHunterAPI) -> None:
+async def register_message_handlers(
+    dp: Dispatcher,
+    bot: Bot,
+    config: Config,
+    hh_api: HeadHunterAPI,
+    callback_server: Optional[CallbackServer] = None
+) -> None:
     """
     Регистрация обработчиков текстовых сообщений бота.
     
@@ -58,15 +79,65 @@ async def register_message_handlers(dp: Dispatcher, bot: Bot, config: Config, hh
         bot: Экземпляр бота для обработчиков
         config: Конфигурация приложения
         hh_api: Экземпляр API клиента HeadHunter
+        callback_server: Общий веб-сервер (в режиме webhook), на нём публикуются метрики
     """
     # Создаем экземпляр LLMService
-    llm_service = LLMService(config)
+    llm_service = LLMService(
+        config,
+        result_cache=LLMResultCache(
+            db_path=config.storage.llm_cache_path,
+            max_entries=config.cache.llm_max_entries,
+            ttl=config.cache.llm_ttl
+        )
+    )
     
     # Инициализируем обработчики сообщений
     initial_state_handler = InitialStateMessageHandler(bot)
     unauthorized_state_handler = UnauthorizedStateMessageHandler(bot)
     authorized_state_handler = AuthorizedStateMessageHandler(bot, hh_api)
-    rewrite_resume_handler = RewriteResumeHandler(bot, hh_api, llm_service)
+    # Общий для всех пользователей кэш вакансий
+    vacancy_cache = VacancyCache(
+        hh_api,
+        max_size=config.cache.vacancy_max_size,
+        ttl=config.cache.vacancy_ttl
+    )
+    # Крупные объекты (резюме, вакансии) хранятся вне FSM, в состоянии — только ссылки
+    blob_store = BlobStore(config.storage.blob_dir, max_age=config.storage.blob_max_age)
+    dp.startup.register(blob_store.prune)
+    # Архив прогонов пайплайна: пишется в фоне сжатыми сегментами
+    run_archive = RunArchive(
+        config.storage.archive_dir,
+        segment_max_bytes=config.storage.archive_segment_mb * 1024 * 1024,
+        retention_days=config.storage.archive_retention_days
+    )
+    dp.startup.register(run_archive.start)
+    rewrite_resume_handler = RewriteResumeHandler(
+        bot,
+        hh_api,
+        llm_service,
+        vacancy_cache,
+        blob_store,
+        run_archive,
+        rewrite_mode=config.openai.rewrite_mode,
+        pipeline_mode=config.openai.pipeline_mode,
+        workers=config.jobs.workers,
+        max_queue=config.jobs.max_queue,
+        batch_max_vacancies=config.jobs.batch_max_vacancies,
+        batch_concurrency=config.jobs.batch_concurrency
+    )
+    dp.startup.register(rewrite_resume_handler.job_queue.start)
+    # Порядок важен: сначала останавливаем воркеры, затем закрываем клиентов, которыми они пользуются
+    dp.shutdown.register(rewrite_resume_handler.job_queue.stop)
+    dp.shutdown.register(run_archive.stop)
+    dp.shutdown.register(llm_service.close)
+
+    if callback_server:
+        callback_server.add_metrics("llm_scheduler", llm_service.scheduler.stats)
+        callback_server.add_metrics("job_queue", rewrite_resume_handler.job_queue.stats)
+        callback_server.add_metrics("vacancy_cache", vacancy_cache.stats)
+        callback_server.add_metrics("hh_api", hh_api.stats)
+        callback_server.add_metrics("run_archive", run_archive.stats)
+        callback_server.add_metrics("oauth", callback_server.pending_logins.stats)
 
     dp.message.register(
         no_state_message_handler,
@@ -97,29 +168,92 @@ async def register_message_handlers(dp: Dispatcher, bot: Bot, config: Config, hh
     
     logger.info("Зарегистрированы обработчики сообщений")
 
-async def register_handlers(dp: Dispatcher, bot: Bot, config: Config) -> None:
+async def register_handlers(
+    dp: Dispatcher,
+    bot: Bot,
+    config: Config,
+    callback_server: Optional[CallbackServer] = None
+) -> None:
     """
     Регистрация всех обработчиков бота.
     
     Args:
         dp: Диспетчер для регистрации обработчиков
         bot: Экземпляр бота для обработчиков
+        callback_server: Общий веб-сервер (в режиме webhook)
     """
     
     hh_api = HeadHunterAPI(
         client_id=config.hh.client_id,
         client_secret=config.hh.client_secret,
-        redirect_uri=config.hh.redirect_uri
+        redirect_uri=config.hh.redirect_uri,
+        http_config=config.http,
+        limits=config.hh_limits,
+        base_url=config.hh.base_url,
+        token_url=config.hh.token_url,
+        auth_url=config.hh.auth_url,
+        token_vault=TokenVault(
+            db_path=config.storage.token_db_path,
+            cache_size=config.storage.token_cache_size
+        )
     )
     
     # Регистрируем обработчики команд
-    await register_command_handlers(dp, bot, config, hh_api)
+    await register_command_handlers(dp, bot, config, hh_api, callback_server)
     
     # Регистрируем обработчики сообщений
-    await register_message_handlers(dp, bot, config, hh_api)
+    await register_message_handlers(dp, bot, config, hh_api, callback_server)
+    
+    # Упреждающее обновление токенов до истечения expires_in
+    token_refresher = TokenRefreshScheduler(
+        hh_api,
+        margin=config.hh.token_refresh_margin,
+        interval=config.hh.token_refresh_interval
+    )
+    dp.startup.register(token_refresher.start)
+    dp.shutdown.register(token_refresher.stop)
+    
+    # Пул соединений и хранилище токенов закрываются при остановке диспетчера
+    dp.shutdown.register(hh_api.close)
     
     logger.info("Все обработчики успешно зарегистрированы")
 
+async def run_webhook(dp: Dispatcher, bot: Bot, config: Config, callback_server: CallbackServer) -> None:
+    """
+    Запуск бота в режиме webhook.
+    
+    Одно aiohttp-приложение с самого старта обслуживает и webhook Telegram,
+    и OAuth callback. Обновления обрабатываются конкурентно с ограничением
+    на количество одновременно обрабатываемых.
+    """
+    if not config.bot.webhook_url:
+        raise ValueError("Для режима webhook необходимо задать WEBHOOK_BASE_URL")
+
+    callback_server.setup_webhook(
+        dp,
+        bot,
+        path=config.bot.webhook_path,
+        secret=config.bot.webhook_secret,
+        max_in_flight=config.bot.webhook_max_in_flight
+    )
+    if not await callback_server.start():
+        raise RuntimeError("Не удалось запустить веб-сервер")
+
+    await dp.emit_startup(bot=bot)
+    try:
+        await bot.set_webhook(
+            url=config.bot.webhook_url,
+            secret_token=config.bot.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(config.bot.webhook_max_in_flight, 100)
+        )
+        logger.info(f"Webhook установлен: {config.bot.webhook_url}")
+        # Работаем до отмены (остановки процесса)
+        await asyncio.Event().wait()
+    finally:
+        await callback_server.stop()
+        await dp.emit_shutdown(bot=bot)
+
 async def main():
     """
     Основная функция запуска бота.
@@ -131,24 +265,35 @@ async def main():
     demo_service = DemoService(config)
     await demo_service.setup()
     
-    # Инициализируем хранилище состояний
-    storage = MemoryStorage()
+    # Инициализируем персистентное хранилище состояний
+    storage = SQLiteStorage(config.storage.fsm_db_path)
     
     # Инициализируем бота и диспетчер с хранилищем состояний
     bot = Bot(token=config.bot.token)
     dp = Dispatcher(storage=storage)
     
+    # В режиме webhook один веб-сервер обслуживает и Telegram, и OAuth callback
+    webhook_mode = config.bot.update_mode == UpdateMode.WEBHOOK
+    callback_server = CallbackServer() if webhook_mode else None
+    
     # Регистрируем все обработчики
-    await register_handlers(dp, bot, config)
+    await register_handlers(dp, bot, config, callback_server)
     
-    logger.info(f"Бот запущен в режиме: {config.environment.value}")
+    logger.info(
+        f"Бот запущен в режиме: {config.environment.value}, "
+        f"получение обновлений: {config.bot.update_mode.value}"
+    )
     
     try:
-        await dp.start_polling(bot)
+        if webhook_mode:
+            await run_webhook(dp, bot, config, callback_server)
+        else:
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Произошла ошибка: {e}")
     finally:
         await demo_service.cleanup()
+        await storage.close()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List
+from models.resume import ResumeUpdate
 
 class GapAnalysisResult(BaseModel):
     recomendation_analyzing: str = Field(..., description="Рекомендации по улучшению резюме")
@@ -20,4 +21,12 @@ class ResumeGapAnalysis(BaseModel):
     recommendations: List[Recommendation] = Field(..., description = "Cписок рекомендаций по улучшению резюме (Колличевство обьектов если section --> 'Experience' равно их общему количевству представленных в резюме.)")
     
     class Config:
-        extra = "forbid"        # <--- Добавляем
\ No newline at end of file
+        extra = "forbid"        # <--- Добавляем
+
+class ResumeAnalysisRewrite(BaseModel):
+    """Объединённый ответ быстрого режима: GAP-анализ и переписанное резюме за один запрос"""
+    recommendations: List[Recommendation] = Field(..., description = "Cписок рекомендаций по улучшению резюме (для каждой записи опыта отдельная рекомендация 'experience[i]')")
+    rewritten_resume: ResumeUpdate = Field(..., description = "Резюме, переписанное строго по рекомендациям из recommendations")
+
+    class Config:
+        extra = "forbid"
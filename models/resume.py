@@ -62,6 +62,34 @@ class ProfessionalRole(BaseModel):
     class Config:
         extra = "forbid"
 
+class TitleUpdate(BaseModel):
+    """Модель переписанной желаемой должности"""
+    title: str = Field(..., description="Желаемая IT должность")
+
+    class Config:
+        extra = "forbid"
+
+class SkillsUpdate(BaseModel):
+    """Модель переписанного описания навыков"""
+    skills: str = Field(..., description="Дополнительная информация, описание навыков в свободной подробной форме перечисляя все ключевые навыки и скилы")
+
+    class Config:
+        extra = "forbid"
+
+class SkillSetUpdate(BaseModel):
+    """Модель переписанного списка ключевых навыков"""
+    skill_set: List[str] = Field(..., description="Ключевые навыки (список уникальных строк)")
+
+    class Config:
+        extra = "forbid"
+
+class ProfessionalRolesUpdate(BaseModel):
+    """Модель переписанного списка профессиональных ролей"""
+    professional_roles: List[ProfessionalRole] = Field(..., description="Список профессиональных ролей")
+
+    class Config:
+        extra = "forbid"
+
 class ResumeInfo(BaseModel):
     """
     Модель данных резюме.
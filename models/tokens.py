@@ -0,0 +1,23 @@
+# models/tokens.py
+import time
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+class HHTokens(BaseModel):
+    """Модель пары OAuth-токенов пользователя HeadHunter"""
+    access_token: str = Field(..., description="Токен доступа")
+    refresh_token: str = Field(..., description="Токен обновления")
+    expires_at: Optional[float] = Field(None, description="Момент истечения access_token (unix time)")
+
+    class Config:
+        extra = "forbid"
+
+    @classmethod
+    def from_token_response(cls, tokens: Dict[str, Any]) -> "HHTokens":
+        """Создаёт модель из ответа token endpoint (учитывает expires_in)."""
+        expires_in = tokens.get("expires_in")
+        return cls(
+            access_token=tokens.get("access_token", ""),
+            refresh_token=tokens.get("refresh_token", ""),
+            expires_at=time.time() + float(expires_in) if expires_in else None
+        )
@@ -34,4 +34,17 @@ class VacancyInfo(BaseModel):
     employment_form: Optional[EmploymentForm] = Field(None, description="Форма занятости")
     experience: Optional[ExperienceVac] = Field(None, description="Требуемый опыт работы")
     schedule: Optional[Schedule] = Field(None, description="График работы")
-    employment: Optional[Employment] = Field(None, description="Тип занятости")
\ No newline at end of file
+    employment: Optional[Employment] = Field(None, description="Тип занятости")
+
+
+class VacancyRequirements(BaseModel):
+    """Сжатые требования вакансии (результат предобработки описания)"""
+    position: str = Field(..., description="Название позиции из вакансии")
+    seniority: str = Field(..., description="Уровень позиции (enum: 'intern', 'junior', 'middle', 'senior', 'lead', 'unknown')")
+    must_have: List[str] = Field(..., description="Обязательные требования: короткие пункты без воды, по одному требованию в пункте")
+    nice_to_have: List[str] = Field(..., description="Желательные требования (будет плюсом): короткие пункты")
+    stack: List[str] = Field(..., description="Технологии, инструменты и языки, упомянутые в вакансии (только названия)")
+    responsibilities: List[str] = Field(..., description="Основные обязанности: короткие пункты")
+
+    class Config:
+        extra = "forbid"
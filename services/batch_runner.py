@@ -0,0 +1,282 @@
+# services/batch_runner.py
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config.config import RewriteMode
+from core.logger import setup_logger
+from services.entity_extractor import EntityExtractor
+from services.llm_service import LLMService
+
+logger = setup_logger(__name__)
+
+@dataclass
+class BatchStats:
+    """Итоги пакетного прогона."""
+    ok: int = 0
+    failed: int = 0
+    skipped: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def processed(self) -> int:
+        return self.ok + self.failed
+
+    def summary(self, llm_service: Optional[LLMService] = None) -> Dict[str, Any]:
+        """Сводка по прогону: количество пар, пропускная способность, задержки и расход токенов."""
+        elapsed = time.monotonic() - self.started_at
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+
+        summary: Dict[str, Any] = {
+            "processed": self.processed,
+            "ok": self.ok,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "seconds": round(elapsed, 2),
+            "pairs_per_minute": round(self.processed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": round(latencies[-1], 2) if latencies else 0.0,
+        }
+        if llm_service is not None:
+            for key in ("calls", "prompt_tokens", "completion_tokens"):
+                summary[f"llm_{key}"] = int(sum(stats[key] for stats in llm_service.usage.values()))
+            scheduler = llm_service.scheduler.stats()
+            summary["llm_retries"] = scheduler["retries"]
+            summary["llm_rate_limited"] = scheduler["rate_limited"]
+        return summary
+
+
+class BatchRunner:
+    """
+    Офлайн-обработка пар резюме/вакансия без Telegram.
+
+    Читает JSONL, где каждая строка — объект
+        {"id": "...", "resume": {...}, "vacancy": {...}}
+    (id необязателен; resume и vacancy — ответ API HH или уже распарсенные
+    данные), и для каждой пары выполняет EntityExtractor -> gap_analysis ->
+    финальный рерайт. Одновременно обрабатывается не больше concurrency пар,
+    входной файл читается по мере обработки.
+
+    Результаты дописываются в выходной JSONL сразу по готовности, и этот же
+    файл служит контрольной точкой: при повторном запуске пары, для которых
+    уже есть успешный результат, пропускаются, а неудачные выполняются снова
+    (для каждой пары действительна последняя запись).
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        concurrency: int = 4,
+        rewrite_mode: RewriteMode = RewriteMode.SINGLE,
+        log_every: int = 10
+    ):
+        """
+        Инициализация.
+
+        Args:
+            llm_service: Сервис LLM
+            concurrency: Сколько пар обрабатываются одновременно
+            rewrite_mode: Режим финального рерайта (потоковый выполняется одним запросом)
+            log_every: Как часто (в обработанных парах) писать прогресс в лог
+        """
+        self.llm_service = llm_service
+        self.concurrency = max(1, concurrency)
+        self.rewrite_mode = rewrite_mode
+        self.log_every = log_every
+        self.entity_extractor = EntityExtractor()
+
+    # -------------------------------------------------------------------------
+    # Входные данные
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def pair_id(record: Dict[str, Any]) -> str:
+        """Идентификатор пары: явный id или хэш содержимого (стабилен между запусками)."""
+        if record.get("id") is not None:
+            return str(record["id"])
+        canonical = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def read_pairs(input_path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+        """Построчно читает входной JSONL: (номер строки, запись или None, ошибка разбора)."""
+        with open(input_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, None, f"Некорректный JSON: {e}"
+                    continue
+                if not isinstance(record, dict) or not isinstance(record.get("resume"), dict) \
+                        or not isinstance(record.get("vacancy"), dict):
+                    yield line_no, None, "Ожидается объект с полями resume и vacancy"
+                    continue
+                yield line_no, record, None
+
+    @staticmethod
+    def load_checkpoint(output_path: str) -> Set[str]:
+        """Идентификаторы пар, уже успешно обработанных в предыдущих запусках."""
+        done: Set[str] = set()
+        if not os.path.exists(output_path):
+            return done
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Строка могла оборваться при аварийной остановке
+                    continue
+                if result.get("status") == "ok":
+                    done.add(result["id"])
+                else:
+                    done.discard(result.get("id"))
+        return done
+
+    def prepare_resume(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Распарсенное резюме: ответ API HH (есть id) разбирается EntityExtractor."""
+        if "id" not in data:
+            return data
+        parsed = self.entity_extractor.extract_resume_info(data)
+        if not parsed:
+            raise ValueError("Не удалось обработать резюме")
+        return parsed.model_dump(exclude_none=True)
+
+    def prepare_vacancy(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Распарсенная вакансия: ответ API HH (есть id) разбирается EntityExtractor."""
+        if "id" not in data:
+            return data
+        parsed = self.entity_extractor.extract_vacancy_info(data)
+        if not parsed:
+            raise ValueError("Не удалось обработать вакансию")
+        return parsed.model_dump(exclude_none=True)
+
+    # -------------------------------------------------------------------------
+    # Обработка
+    # -------------------------------------------------------------------------
+
+    async def process_pair(self, pair_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполняет пайплайн для одной пары и возвращает запись результата."""
+        resume_id = record["resume"].get("id")
+        vacancy_id = record["vacancy"].get("id")
+        result: Dict[str, Any] = {
+            "id": pair_id,
+            "resume_id": resume_id,
+            "vacancy_id": vacancy_id,
+            "status": "error",
+        }
+        started = time.monotonic()
+        try:
+            parsed_resume = self.prepare_resume(record["resume"])
+            parsed_vacancy = self.prepare_vacancy(record["vacancy"])
+
+            gap_result = await self.llm_service.gap_analysis(
+                parsed_resume, parsed_vacancy, vacancy_id=vacancy_id
+            )
+            if not gap_result:
+                raise ValueError("GAP-анализ не выполнен")
+            if self.rewrite_mode == RewriteMode.FANOUT:
+                final_resume = await self.llm_service.final_resume_rewrite_fanout(parsed_resume, gap_result)
+            else:
+                final_resume = await self.llm_service.final_resume_rewrite(parsed_resume, gap_result)
+            if not final_resume:
+                raise ValueError("Финальный рерайт не выполнен")
+
+            result.update(
+                status="ok",
+                gap_analysis=gap_result.model_dump(exclude_none=True),
+                resume=final_resume.model_dump(exclude_none=True)
+            )
+        except Exception as e:
+            logger.error(f"Пара {pair_id}: ошибка обработки: {e}")
+            result["error"] = str(e)
+        result["seconds"] = round(time.monotonic() - started, 3)
+        return result
+
+    async def run(self, input_path: str, output_path: str) -> BatchStats:
+        """
+        Обрабатывает входной файл и дописывает результаты в выходной.
+
+        Args:
+            input_path: Входной JSONL с парами
+            output_path: Выходной JSONL (он же контрольная точка)
+
+        Returns:
+            BatchStats: Итоги прогона
+        """
+        done = self.load_checkpoint(output_path)
+        if done:
+            logger.info(f"Контрольная точка: {len(done)} пар уже обработаны, они будут пропущены")
+
+        stats = BatchStats()
+        queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "a+", encoding="utf-8") as output:
+            # Если предыдущий запуск оборвался посреди строки, начинаем с новой
+            if output.tell() > 0:
+                output.seek(output.tell() - 1)
+                if output.read(1) != "\n":
+                    output.write("\n")
+
+            def write(result: Dict[str, Any]) -> None:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                if result["status"] == "ok":
+                    stats.ok += 1
+                    stats.latencies.append(result["seconds"])
+                else:
+                    stats.failed += 1
+                if self.log_every and stats.processed % self.log_every == 0:
+                    summary = stats.summary()
+                    logger.info(
+                        f"Обработано {stats.processed} пар (ошибок {stats.failed}), "
+                        f"{summary['pairs_per_minute']} пар/мин"
+                    )
+
+            async def worker() -> None:
+                while True:
+                    item = await queue.get()
+                    try:
+                        if item is None:
+                            return
+                        write(await self.process_pair(*item))
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                seen: Set[str] = set()
+                for line_no, record, error in self.read_pairs(input_path):
+                    if record is None:
+                        logger.warning(f"Строка {line_no} пропущена: {error}")
+                        write({"id": f"line-{line_no}", "status": "error", "error": error, "seconds": 0.0})
+                        continue
+                    pair_id = self.pair_id(record)
+                    if pair_id in done or pair_id in seen:
+                        stats.skipped += 1
+                        continue
+                    seen.add(pair_id)
+                    # Очередь ограничена: входной файл читается не быстрее обработки
+                    await queue.put((pair_id, record))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        return stats
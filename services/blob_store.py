@@ -0,0 +1,115 @@
+# services/blob_store.py
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from typing import Any, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class BlobStore:
+    """
+    Контентно-адресуемое хранилище сжатых JSON-объектов на диске.
+    
+    Объект сериализуется в канонический JSON, сжимается zlib и сохраняется
+    в файл, имя которого — SHA-256 содержимого. Вместо самого объекта
+    вызывающий код хранит короткую ссылку (хэш), поэтому одинаковые данные
+    (например, популярная вакансия) лежат на диске в единственном экземпляре.
+    """
+
+    def __init__(self, root_dir: str, compress_level: int = 6, max_age: float = 14 * 24 * 3600.0):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            root_dir: Каталог для файлов
+            compress_level: Уровень сжатия zlib (1-9)
+            max_age: Срок хранения неиспользуемых объектов по умолчанию (для prune)
+        """
+        self.root_dir = root_dir
+        self.compress_level = compress_level
+        self.max_age = max_age
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        """Путь к файлу объекта (с разбиением по первым двум символам хэша)."""
+        return os.path.join(self.root_dir, ref[:2], f"{ref}.json.z")
+
+    def _put_sync(self, obj: Any) -> str:
+        payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        ref = hashlib.sha256(payload).hexdigest()
+        path = self._path(ref)
+        if os.path.exists(path):
+            # Объект уже есть — только отмечаем использование для prune()
+            os.utime(path)
+            return ref
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Уникальный временный файл: одинаковый объект могут записывать несколько потоков сразу
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{ref}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(payload, self.compress_level))
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # Тот же объект уже записан параллельным put — это успех
+            if not os.path.exists(path):
+                raise
+        return ref
+
+    def _get_sync(self, ref: str) -> Any:
+        with open(self._path(ref), "rb") as f:
+            return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+
+    def _prune_sync(self, max_age: float) -> int:
+        border = time.time() - max_age
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.getmtime(path) < border:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    async def put(self, obj: Any) -> str:
+        """
+        Сохраняет объект и возвращает ссылку на него.
+        
+        Args:
+            obj: JSON-сериализуемый объект
+            
+        Returns:
+            str: Ссылка (SHA-256 канонического JSON)
+        """
+        return await asyncio.to_thread(self._put_sync, obj)
+
+    async def get(self, ref: str) -> Any:
+        """
+        Загружает объект по ссылке.
+        
+        Raises:
+            FileNotFoundError: Если объект отсутствует (например, удалён prune)
+        """
+        return await asyncio.to_thread(self._get_sync, ref)
+
+    async def prune(self, max_age: Optional[float] = None) -> int:
+        """
+        Удаляет объекты, которые не использовались дольше max_age секунд.
+        
+        Args:
+            max_age: Срок хранения (по умолчанию — заданный при создании)
+            
+        Returns:
+            int: Количество удалённых объектов
+        """
+        removed = await asyncio.to_thread(self._prune_sync, max_age if max_age is not None else self.max_age)
+        if removed:
+            logger.info(f"Удалено {removed} устаревших объектов из {self.root_dir}")
+        return removed
@@ -1,8 +1,11 @@
 # services/callback_server.py
+import asyncio
 from aiohttp import web
-from typing import Optional, Callable
+from typing import Any, Callable, Dict, Optional, Set
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
 from core.logger import setup_logger
-import requests
+from services.oauth_state import PendingLoginRegistry
 import os
 
 logger = setup_logger(__name__)
@@ -12,63 +15,172 @@ class CallbackServer:
     Веб-сервер для обработки callback от OAuth2 авторизации HeadHunter.
     
     Запускает сервер, который ожидает получения кода авторизации
-    и передает его в обработчик.
+    и передает его в обработчик вместе с авторизацией, найденной по
+    параметру state (см. PendingLoginRegistry). В режиме webhook то же
+    aiohttp-приложение принимает обновления Telegram (см. setup_webhook).
     """
     
-    def __init__(self, host: str = '0.0.0.0', port: int = None):
+    def __init__(self, host: str = '0.0.0.0', port: int = None, login_ttl: float = 600.0):
         self.host = host
         # Получаем порт из переменной окружения Render или используем 8000
         self.port = int(os.environ.get('PORT', 8000))
         self.app = web.Application()
         self.callback_handler: Optional[Callable] = None
+        # Ожидающие авторизации пользователей по токену OAuth state
+        self.pending_logins = PendingLoginRegistry(ttl=login_ttl)
         self._setup_routes()
         self._is_running: bool = False
         self._runner: Optional[web.AppRunner] = None
+        # Параметры приёма обновлений Telegram (заполняются в setup_webhook)
+        self._dp: Optional[Dispatcher] = None
+        self._bot: Optional[Bot] = None
+        self._webhook_secret: Optional[str] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._update_tasks: Set[asyncio.Task] = set()
+        # Источники метрик для GET /metrics (имя -> функция, возвращающая dict)
+        self._metrics: Dict[str, Callable[[], Dict[str, Any]]] = {}
         
     def _setup_routes(self):
         """Настройка маршрутов веб-сервера."""
         self.app.router.add_get('/', self._handle_callback)
+        self.app.router.add_get('/metrics', self._handle_metrics)
+
+    def add_metrics(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Регистрирует источник метрик, отдаваемых по GET /metrics.
+        
+        Args:
+            name: Имя раздела в ответе
+            provider: Функция без аргументов, возвращающая dict с метриками
+        """
+        self._metrics[name] = provider
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        """Текущие метрики всех зарегистрированных источников (JSON)."""
+        metrics = {}
+        for name, provider in self._metrics.items():
+            try:
+                metrics[name] = provider()
+            except Exception as e:
+                logger.error(f"Ошибка при получении метрик {name}: {e}")
+                metrics[name] = {"error": str(e)}
+        return web.json_response(metrics)
     
+    def setup_webhook(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        path: str = '/webhook',
+        secret: Optional[str] = None,
+        max_in_flight: int = 100
+    ) -> None:
+        """
+        Добавляет маршрут приёма обновлений Telegram (webhook).
+        
+        Должен вызываться до start(). Обновления обрабатываются конкурентно
+        в фоновых задачах; одновременно обрабатывается не более max_in_flight
+        обновлений, при превышении ответ Telegram задерживается (backpressure).
+        
+        Args:
+            dp: Диспетчер с зарегистрированными обработчиками
+            bot: Экземпляр бота
+            path: Путь webhook
+            secret: Секрет, который Telegram передаёт в X-Telegram-Bot-Api-Secret-Token
+            max_in_flight: Максимум одновременно обрабатываемых обновлений
+        """
+        self._dp = dp
+        self._bot = bot
+        self._webhook_secret = secret
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self.app.router.add_post(path, self._handle_webhook)
+        logger.info(f"Добавлен маршрут webhook: {path} (max_in_flight={max_in_flight})")
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        """Приём обновления Telegram: валидация и запуск обработки в фоне."""
+        if self._webhook_secret and (
+            request.headers.get('X-Telegram-Bot-Api-Secret-Token') != self._webhook_secret
+        ):
+            logger.warning("Получен webhook-запрос с неверным секретом")
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self._bot})
+        except Exception as e:
+            logger.error(f"Некорректное обновление в webhook: {e}")
+            return web.Response(status=400)
+
+        # Ждём свободный слот, затем отвечаем сразу, не дожидаясь обработки
+        await self._in_flight.acquire()
+        task = asyncio.create_task(self._process_update(update))
+        self._update_tasks.add(task)
+        task.add_done_callback(self._update_tasks.discard)
+        return web.Response(status=200)
+
+    async def _process_update(self, update: Update) -> None:
+        """Передаёт обновление в диспетчер и освобождает слот."""
+        try:
+            await self._dp.feed_update(self._bot, update)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке обновления {update.update_id}: {e}")
+        finally:
+            self._in_flight.release()
+
     async def _handle_callback(self, request: web.Request) -> web.Response:
-        """Обработчик callback запроса от OAuth2."""
+        """
+        Обработчик callback запроса от OAuth2.
+        
+        По параметру state находит пользователя, начавшего авторизацию,
+        и передаёт код и его авторизацию (PendingLogin) в обработчик.
+        """
         try:
             code = request.query.get('code')
-            logger.info(f"Получен код авторизации: {code}")
+            if not code or not self.callback_handler:
+                logger.error("Код авторизации отсутствует в запросе")
+                return web.Response(
+                    text="Ошибка авторизации. Пожалуйста, попробуйте снова.",
+                    status=400
+                )
             
-            if code and self.callback_handler:
-                logger.info("Начинаем обработку полученного кода")
-                await self.callback_handler(code)
+            login = self.pending_logins.pop(request.query.get('state'))
+            if not login:
                 return web.Response(
-                    text="Авторизация успешно завершена. Вы можете закрыть это окно и вернуться в бот.",
-                    content_type='text/html'
+                    text="Ссылка авторизации устарела или уже использована. Отправьте /auth в боте ещё раз.",
+                    status=400
                 )
             
-            logger.error("Код авторизации отсутствует в запросе")
+            logger.info(f"Получен код авторизации пользователя {login.user_id}")
+            if not await self.callback_handler(code, login):
+                return web.Response(
+                    text="Ошибка авторизации. Пожалуйста, попробуйте снова.",
+                    status=400
+                )
             return web.Response(
-                text="Ошибка авторизации. Пожалуйста, попробуйте снова.",
-                status=400
+                text="Авторизация успешно завершена. Вы можете закрыть это окно и вернуться в бот.",
+                content_type='text/html'
             )
         except Exception as e:
             logger.error(f"Ошибка при обработке callback: {e}")
             return web.Response(text="Произошла ошибка", status=500)
     
-    async def start(self, callback_handler: Callable) -> bool:
+    async def start(self, callback_handler: Optional[Callable] = None) -> bool:
         """
         Запуск сервера, если он еще не запущен.
         
         Args:
-            callback_handler: Функция для обработки полученного кода авторизации
+            callback_handler: Корутина (code, login) -> bool, обрабатывающая код авторизации
+                пользователя login (можно не передавать, если сервер запускается заранее в режиме webhook)
             
         Returns:
             bool: True если сервер был запущен или уже работает, False в случае ошибки
         """
+        if callback_handler:
+            self.callback_handler = callback_handler
+
         if self._is_running:
             logger.info("Callback сервер уже запущен")
-            self.callback_handler = callback_handler
             return True
             
         try:
-            self.callback_handler = callback_handler
             self._runner = web.AppRunner(self.app)
             await self._runner.setup()
             # Используем self.host вместо хардкода localhost
@@ -82,8 +194,10 @@ class CallbackServer:
             return False
             
     async def stop(self):
-        """Остановка сервера."""
+        """Остановка сервера (с ожиданием обработки уже принятых обновлений)."""
         if self._is_running and self._runner:
             await self._runner.cleanup()
+            if self._update_tasks:
+                await asyncio.gather(*self._update_tasks, return_exceptions=True)
             self._is_running = False
-            logger.info("Callback сервер остановлен")
\ No newline at end of file
+            logger.info("Callback сервер остановлен")
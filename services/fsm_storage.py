@@ -0,0 +1,103 @@
+# services/fsm_storage.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class SQLiteStorage(BaseStorage):
+    """
+    Персистентное хранилище состояний FSM на базе SQLite.
+    
+    Заменяет MemoryStorage: состояния и данные пользователей переживают
+    перезапуск бота и не занимают память процесса. Данные хранятся
+    компактным JSON; крупные объекты (резюме, вакансии) должны лежать
+    в BlobStore, а в FSM — только ссылки на них. Файл базы локальный,
+    поэтому состояния не разделяются между экземплярами бота.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            db_path: Путь к файлу SQLite
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, "
+            "state TEXT, "
+            "data TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _make_key(key: StorageKey) -> str:
+        """Строковый ключ записи из StorageKey."""
+        return ":".join(
+            str(part) if part is not None else ""
+            for part in (
+                key.bot_id, key.chat_id, key.user_id,
+                key.thread_id, key.business_connection_id, key.destiny
+            )
+        )
+
+    # ------------------------------------------------------------------
+    # Синхронные операции с базой (выполняются в отдельном потоке)
+    # ------------------------------------------------------------------
+
+    def _fetch(self, db_key: str, column: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._conn.execute(f"SELECT {column} FROM fsm WHERE key = ?", (db_key,)).fetchone()
+        return row[0] if row else None
+
+    def _store(self, db_key: str, column: str, value: Optional[str]) -> None:
+        with self._db_lock:
+            self._conn.execute(
+                f"INSERT INTO fsm (key, {column}) VALUES (?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}",
+                (db_key, value)
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Интерфейс BaseStorage
+    # ------------------------------------------------------------------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Устанавливает состояние пользователя."""
+        value = state.state if isinstance(state, State) else state
+        await asyncio.to_thread(self._store, self._make_key(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Возвращает состояние пользователя."""
+        return await asyncio.to_thread(self._fetch, self._make_key(key), "state")
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Заменяет данные пользователя."""
+        value = json.dumps(dict(data), ensure_ascii=False, separators=(",", ":"))
+        await asyncio.to_thread(self._store, self._make_key(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Возвращает данные пользователя."""
+        raw = await asyncio.to_thread(self._fetch, self._make_key(key), "data")
+        return json.loads(raw) if raw else {}
+
+    async def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._db_lock:
+            self._conn.close()
+        logger.info("FSM-хранилище закрыто")
@@ -1,53 +1,247 @@
 # services/hh_api.py
-from typing import Dict, Optional, Any
-import requests
+import asyncio
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, NamedTuple, Optional, Any
+import aiohttp
+from multidict import CIMultiDict
 from urllib.parse import quote
+from config.config import HHLimitsConfig, HTTPConfig
 from core.logger import setup_logger
+from models.tokens import HHTokens
+from services.http_session import HTTPSessionPool
+from services.rate_limiter import CircuitBreaker, KeyedTokenBuckets, RetryBudget, TokenBucket
+from services.token_vault import TokenVault
 
 logger = setup_logger(__name__)
 
+# Статусы, при которых запрос повторяется (перегрузка или временная недоступность HH)
+RETRY_STATUSES = {429, 502, 503}
+
+class InvalidGrantError(aiohttp.ClientResponseError):
+    """
+    Token endpoint окончательно отклонил grant (invalid_grant): токен отозван или уже использован.
+
+    after_retry — отказ получен при повторе: первая попытка могла быть выполнена
+    HH и уже израсходовать refresh_token, поэтому отказ не означает отзыв доступа.
+    """
+    after_retry: bool = False
+
+
+class HHResponse(NamedTuple):
+    """Ответ API HeadHunter: статус, JSON-тело и заголовки."""
+    status: int
+    data: Dict[str, Any]
+    headers: Mapping[str, str]
+
+
 class HeadHunterAPI:
     """
     Класс для работы с API HeadHunter.
     
     Обеспечивает полный цикл авторизации и взаимодействия с API HeadHunter,
-    включая управление токенами и их обновление.
+    включая управление токенами и их обновление. Все запросы выполняются
+    асинхронно через общий пул aiohttp-соединений и не блокируют event loop.
+    
+    Токены хранятся отдельно для каждого пользователя Telegram в TokenVault,
+    поэтому один экземпляр клиента обслуживает любое число авторизованных
+    пользователей одновременно.
     """
 
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        redirect_uri: str,
+        http_config: Optional[HTTPConfig] = None,
+        token_vault: Optional[TokenVault] = None,
+        limits: Optional[HHLimitsConfig] = None,
+        base_url: str = 'https://api.hh.ru',
+        token_url: str = 'https://hh.ru/oauth/token',
+        auth_url: str = 'https://hh.ru/oauth/authorize'
+    ):
         """Инициализация клиента API HeadHunter."""
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
-        self.base_url = 'https://api.hh.ru'
-        self.token_url = 'https://hh.ru/oauth/token'
-        self._access_token: Optional[str] = None
-        self._refresh_token: Optional[str] = None
-
-    @property
-    def access_token(self) -> Optional[str]:
-        """Получение текущего access token."""
-        return self._access_token
-
-    @property
-    def is_authenticated(self) -> bool:
-        """Проверка наличия действующего токена."""
-        return bool(self._access_token and self._refresh_token)
-
-    def get_auth_url(self) -> str:
-        """Генерация URL для авторизации пользователя."""
+        self.base_url = base_url.rstrip('/')
+        self.token_url = token_url
+        self.auth_url = auth_url
+        self._http = HTTPSessionPool(http_config)
+        self.token_vault = token_vault or TokenVault()
+        # Текущие обновления токенов по пользователям (single-flight)
+        self._refresh_tasks: Dict[int, asyncio.Task] = {}
+        # Ограничение частоты: общее для приложения и отдельное для токена каждого пользователя
+        self.limits = limits or HHLimitsConfig()
+        self._app_bucket = TokenBucket(self.limits.app_rate, self.limits.app_burst)
+        self._user_buckets = KeyedTokenBuckets(self.limits.user_rate, self.limits.user_burst)
+        self.retry_budget = RetryBudget(self.limits.retry_budget_ratio)
+        self.circuit_breaker = CircuitBreaker(
+            self.limits.breaker_threshold, self.limits.breaker_reset_timeout, name="api.hh.ru"
+        )
+
+    async def get_access_token(self, user_id: int) -> Optional[str]:
+        """Получение текущего access token пользователя."""
+        tokens = await self.token_vault.get(user_id)
+        return tokens.access_token if tokens else None
+
+    async def is_authenticated(self, user_id: int) -> bool:
+        """Проверка наличия действующего токена у пользователя."""
+        tokens = await self.token_vault.get(user_id)
+        return bool(tokens and tokens.access_token and tokens.refresh_token)
+
+    def get_auth_url(self, state: Optional[str] = None) -> str:
+        """
+        Генерация URL для авторизации пользователя.
+        
+        Args:
+            state: Токен OAuth state; HH вернёт его в callback вместе с кодом,
+                по нему определяется, чья это авторизация
+        """
         auth_url = (
-            f'https://hh.ru/oauth/authorize?'
+            f'{self.auth_url}?'
             f'response_type=code&'
             f'client_id={self.client_id}&'
             f'redirect_uri={self.redirect_uri}'
         )
+        if state:
+            auth_url += f'&state={quote(state)}'
         logger.info("Сгенерирован URL авторизации")
         return auth_url
 
-    async def exchange_code_for_tokens(self, authorization_code: str) -> Dict[str, str]:
+    async def close(self) -> None:
+        """Закрывает пул HTTP-соединений клиента и хранилище токенов."""
+        await self._http.close()
+        await self.token_vault.close()
+
+    async def _throttle(self, user_id: Optional[int] = None) -> None:
+        """Ждёт разрешения лимитов частоты приложения и пользователя."""
+        waited = await self._app_bucket.acquire()
+        if user_id is not None:
+            waited += await self._user_buckets.acquire(user_id)
+        if waited > 1:
+            logger.info(f"Запрос к HH (пользователь {user_id}) ждал лимита частоты {waited:.1f} с")
+
+    def _can_retry(self, method: str, status: Optional[int], attempt: int) -> bool:
+        """
+        Решает, повторять ли запрос.
+        
+        POST повторяется только после 429 (запрос заведомо не выполнен);
+        после 502/503 и ошибок соединения он мог быть выполнен.
+        """
+        if attempt >= self.limits.max_retries:
+            return False
+        if method == 'POST' and status != 429:
+            return False
+        if not self.retry_budget.try_retry():
+            logger.warning("Бюджет повторов запросов к HH исчерпан")
+            return False
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка повтора с джиттером."""
+        delay = min(self.limits.backoff_max, self.limits.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _retry_after(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Задержка из заголовка Retry-After (секунды или HTTP-дата), не больше backoff_max."""
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(0.0, delay), self.limits.backoff_max)
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние ограничителей запросов к HH."""
+        return {
+            "circuit": self.circuit_breaker.state.value,
+            "retries_rejected": self.retry_budget.rejected,
+            "user_buckets": len(self._user_buckets),
+        }
+
+    async def _post_token_request(self, payload: Dict[str, str]) -> Dict[str, str]:
+        """
+        Отправляет form-запрос на token endpoint и возвращает JSON ответа.
+
+        Ответы 429/502/503 и ошибки соединения повторяются с экспоненциальной
+        задержкой или по Retry-After (в пределах max_retries и бюджета повторов).
+
+        Raises:
+            InvalidGrantError: Ответ 400/401 с ошибкой invalid_grant
+            aiohttp.ClientResponseError: При другом ошибочном статусе ответа
+        """
+        attempt = 0
+        while True:
+            await self._throttle()
+            retry_after = None
+            try:
+                session = await self._http.get_session()
+                async with session.post(self.token_url, data=payload) as response:
+                    body = await response.text()
+                    logger.info(f"Статус ответа: {response.status}")
+                    if response.status < 400:
+                        return json.loads(body)
+                    logger.error(f"Детали ошибки: {body}")
+                    if response.status in (400, 401) and self._token_error(body) == "invalid_grant":
+                        error = InvalidGrantError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message="invalid_grant",
+                            headers=response.headers
+                        )
+                        error.after_retry = attempt > 0
+                        raise error
+                    if not (response.status in RETRY_STATUSES and self._can_retry_token_request(attempt)):
+                        response.raise_for_status()
+                    retry_after = self._retry_after(response.headers)
+                    status = response.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not self._can_retry_token_request(attempt):
+                    logger.error(f"Ошибка соединения с token endpoint: {e!r}")
+                    raise
+                status = None
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            attempt += 1
+            logger.warning(
+                f"Повтор запроса токенов ({status or 'нет соединения'}) "
+                f"{attempt}/{self.limits.max_retries} через {delay:.1f} с"
+            )
+            await asyncio.sleep(delay)
+
+    def _can_retry_token_request(self, attempt: int) -> bool:
+        if attempt >= self.limits.max_retries:
+            return False
+        if not self.retry_budget.try_retry():
+            logger.warning("Бюджет повторов запросов к HH исчерпан")
+            return False
+        return True
+
+    @staticmethod
+    def _token_error(body: str) -> Optional[str]:
+        """Код ошибки OAuth ("error") из тела ответа token endpoint."""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        return data.get("error") if isinstance(data, dict) else None
+
+    async def exchange_code_for_tokens(self, authorization_code: str, user_id: int) -> Dict[str, str]:
         """
         Обмен кода авторизации на токены доступа.
+        
+        Args:
+            authorization_code: Код из OAuth callback
+            user_id: Пользователь Telegram, для которого сохраняются токены
         """
         try:
             payload = {
@@ -58,67 +252,103 @@ class HeadHunterAPI:
                 'redirect_uri': self.redirect_uri
             }
             
-            # Добавляем логирование запроса
             logger.info(f"Отправка запроса на получение токенов. URL: {self.token_url}")
-            logger.info(f"Параметры запроса: {payload}")
-            
-            response = requests.post(self.token_url, data=payload)
-            
-            # Логируем ответ сервера
-            logger.info(f"Статус ответа: {response.status_code}")
-            logger.info(f"Тело ответа: {response.text}")
             
-            response.raise_for_status()
+            tokens = await self._post_token_request(payload)
+            await self.token_vault.set(user_id, HHTokens.from_token_response(tokens))
             
-            tokens = response.json()
-            self._access_token = tokens.get('access_token')
-            self._refresh_token = tokens.get('refresh_token')
-            
-            logger.info("Успешно получены токены доступа")
+            logger.info(f"Успешно получены токены доступа для пользователя {user_id}")
             return tokens
                 
-        except requests.exceptions.HTTPError as e:
+        except aiohttp.ClientResponseError as e:
             logger.error(f"Ошибка при получении токенов: {e}")
-            logger.error(f"Детали ошибки: {e.response.text if hasattr(e, 'response') else 'Нет деталей'}")
             raise
 
-    async def refresh_access_token(self) -> Dict[str, str]:
+    async def refresh_access_token(
+        self,
+        user_id: int,
+        stale_access_token: Optional[str] = None,
+        proactive: bool = False
+    ) -> Dict[str, str]:
         """
-        Обновление access_token с использованием refresh_token.
+        Обновление access_token пользователя с использованием refresh_token.
+        
+        Одновременные вызовы для одного пользователя объединяются: выполняется
+        ровно один запрос к token endpoint, остальные ждут его результата. Это
+        важно, так как HH инвалидирует старый refresh_token после обновления.
         
+        Args:
+            user_id: Пользователь Telegram
+            stale_access_token: Токен, получивший 401. Если в хранилище уже
+                лежит другой токен, значит его обновил параллельный запрос,
+                и повторное обновление не выполняется.
+            proactive: Упреждающее обновление ещё действующего токена. Токены
+                пользователя не удаляются даже при invalid_grant: решение
+                принимается при следующем 401.
+            
         Returns:
             Dict[str, str]: Новые токены доступа
             
         Raises:
             ValueError: Если отсутствует refresh_token
-            requests.exceptions.HTTPError: При ошибке запроса к API
+            aiohttp.ClientResponseError: При ошибке запроса к API
         """
-        if not self._refresh_token:
-            logger.error("Попытка обновления токена без refresh_token")
+        task = self._refresh_tasks.get(user_id)
+        if task is None and stale_access_token is not None:
+            current = await self.token_vault.get(user_id)
+            if current and current.access_token != stale_access_token:
+                logger.info(f"Токен пользователя {user_id} уже обновлён параллельным запросом")
+                return current.model_dump()
+            task = self._refresh_tasks.get(user_id)
+
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_tokens(user_id, delete_on_invalid_grant=not proactive))
+            self._refresh_tasks[user_id] = task
+            task.add_done_callback(lambda t: self._on_refresh_done(user_id, t))
+
+        # shield: отмена одного из ожидающих не должна прерывать общее обновление
+        return await asyncio.shield(task)
+
+    def _on_refresh_done(self, user_id: int, task: asyncio.Task) -> None:
+        """Снимает завершённое обновление с учёта и забирает его исключение."""
+        if self._refresh_tasks.get(user_id) is task:
+            del self._refresh_tasks[user_id]
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh_tokens(self, user_id: int, delete_on_invalid_grant: bool = True) -> Dict[str, str]:
+        """
+        Выполняет сам запрос обновления токенов (вызывается через refresh_access_token).
+
+        Токены удаляются только при окончательном отказе (invalid_grant);
+        после 429/5xx и ошибок соединения они сохраняются для следующей попытки.
+        """
+        current = await self.token_vault.get(user_id)
+        if not current or not current.refresh_token:
+            logger.error(f"Попытка обновления токена без refresh_token (пользователь {user_id})")
             raise ValueError("Refresh token отсутствует. Необходима повторная авторизация.")
 
         try:
             payload = {
                 'grant_type': 'refresh_token',
-                'refresh_token': self._refresh_token,
+                'refresh_token': current.refresh_token,
                 'client_id': self.client_id,
                 'client_secret': self.client_secret
             }
             
-            response = requests.post(self.token_url, data=payload)
-            response.raise_for_status()
-            
-            tokens = response.json()
-            self._access_token = tokens.get('access_token')
-            self._refresh_token = tokens.get('refresh_token')
+            tokens = await self._post_token_request(payload)
+            await self.token_vault.set(user_id, HHTokens.from_token_response(tokens))
             
-            logger.info("Токены успешно обновлены")
+            logger.info(f"Токены пользователя {user_id} успешно обновлены")
             return tokens
             
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"Ошибка при обновлении токенов: {e}")
-            self._access_token = None
-            self._refresh_token = None
+        except InvalidGrantError as e:
+            logger.error(f"HH отклонил refresh_token пользователя {user_id}: {e}")
+            if delete_on_invalid_grant and not e.after_retry:
+                await self.token_vault.delete(user_id)
+            raise
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Ошибка при обновлении токенов пользователя {user_id} (токены сохранены): {e}")
             raise
 
     async def make_api_request(
@@ -126,7 +356,9 @@ class HeadHunterAPI:
         endpoint: str, 
         method: str = 'GET', 
         data: Optional[Dict] = None, 
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        *,
+        user_id: int
     ) -> Dict[str, Any]:
         """
         Выполнение запроса к API HeadHunter с автоматическим обновлением токена.
@@ -136,60 +368,147 @@ class HeadHunterAPI:
             method: HTTP метод (GET, POST, PUT, DELETE)
             data: Данные для отправки в теле запроса
             params: Параметры строки запроса
+            user_id: Пользователь Telegram, от имени которого выполняется запрос
             
         Returns:
             Dict[str, Any]: Ответ от API в формате JSON
             
         Raises:
             ValueError: Если отсутствует access_token
-            requests.exceptions.HTTPError: При ошибке запроса к API
+            aiohttp.ClientResponseError: При ошибке запроса к API
         """
-        if not self._access_token:
-            logger.error("Попытка выполнения запроса без access_token")
+        response = await self.request(endpoint, method, data, params, user_id=user_id)
+        return response.data
+
+    async def request(
+        self,
+        endpoint: str,
+        method: str = 'GET',
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        *,
+        user_id: int,
+        headers: Optional[Dict[str, str]] = None,
+        _retry_on_401: bool = True
+    ) -> HHResponse:
+        """
+        Выполнение запроса к API HeadHunter с доступом к статусу и заголовкам ответа.
+        
+        В отличие от make_api_request позволяет передать дополнительные заголовки
+        (например, If-None-Match для условных запросов) и не считает ответ
+        304 Not Modified ошибкой. При ответе 401 токен обновляется и запрос
+        повторяется не более одного раза.
+        
+        Частота запросов ограничена корзинами токенов (на приложение и на
+        пользователя). Ответы 429/502/503 и ошибки соединения повторяются
+        с экспоненциальной задержкой или по Retry-After в пределах бюджета
+        повторов; после серии отказов HH предохранитель временно отклоняет
+        запросы (CircuitOpenError).
+        
+        Args:
+            endpoint: Конечная точка API
+            method: HTTP метод (GET, POST, PUT, DELETE)
+            data: Данные для отправки в теле запроса
+            params: Параметры строки запроса
+            user_id: Пользователь Telegram, от имени которого выполняется запрос
+            headers: Дополнительные заголовки запроса
+            
+        Returns:
+            HHResponse: Статус, JSON-тело и заголовки ответа
+        """
+        access_token = await self.get_access_token(user_id)
+        if not access_token:
+            logger.error(f"Попытка выполнения запроса без access_token (пользователь {user_id})")
             raise ValueError("Access token отсутствует. Необходима авторизация.")
 
-        headers = {
-            'Authorization': f'Bearer {self._access_token}',
-            'User-Agent': 'ResumeBot/1.0'
-        }
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
+
+        request_headers = dict(headers or {})
+        request_headers['Authorization'] = f'Bearer {access_token}'
         url = f'{self.base_url}{endpoint}'
+        json_body = data if method in ('POST', 'PUT') else None
+        query = params if method == 'GET' else None
 
         try:
-            response = None
-            if method == 'GET':
-                response = requests.get(url, headers=headers, params=params)
-            elif method == 'POST':
-                response = requests.post(url, headers=headers, json=data)
-            elif method == 'PUT':
-                response = requests.put(url, headers=headers, json=data)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
-            else:
-                raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
-            
-            logger.info(f"Статус ответа: {response.status_code}")
-            logger.info(f"Текст ответа: {response.url}")
+            attempt = 0
+            self.retry_budget.record_request()
+            while True:
+                await self._throttle(user_id)
+                probe = self.circuit_breaker.before_request()
+                retry_after = None
+                try:
+                    session = await self._http.get_session()
+                    async with session.request(method, url, headers=request_headers, json=json_body, params=query) as response:
+                        logger.info(f"Статус ответа: {response.status}")
+                        logger.info(f"Текст ответа: {response.url}")
+                        status = response.status
+                        response_headers = CIMultiDict(response.headers)
+                        if status >= 500:
+                            self.circuit_breaker.record_failure()
+                        else:
+                            self.circuit_breaker.record_success()
+
+                        # Если токен истёк, пробуем обновить и повторить запрос (один раз)
+                        if status == 401 and _retry_on_401:
+                            logger.info("Токен истёк, выполняется обновление")
+                            refresh_needed = True
+                        else:
+                            refresh_needed = False
+                            body = await response.text()
+                            if status in RETRY_STATUSES and self._can_retry(method, status, attempt):
+                                retry_after = self._retry_after(response_headers)
+                            else:
+                                if status >= 400:
+                                    logger.error(f"Детали ошибки: {body}")
+                                response.raise_for_status()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    self.circuit_breaker.record_failure()
+                    if not self._can_retry(method, None, attempt):
+                        logger.error(f"Ошибка соединения с API: {e!r}")
+                        raise
+                    logger.warning(f"Ошибка соединения с API ({e!r})")
+                    status = None
+                except BaseException:
+                    # Отмена или непредвиденная ошибка: проба не должна навсегда занять HALF_OPEN
+                    if probe:
+                        self.circuit_breaker.release_probe()
+                    raise
 
-            # Если токен истёк, пробуем обновить и повторить запрос
-            if response.status_code == 401:
-                logger.info("Токен истёк, выполняется обновление")
-                await self.refresh_access_token()
-                return await self.make_api_request(endpoint, method, data, params)
+                if status is None or (status in RETRY_STATUSES and not refresh_needed):
+                    delay = retry_after if retry_after is not None else self._backoff(attempt)
+                    attempt += 1
+                    logger.warning(
+                        f"Повтор запроса {method} {endpoint} ({status or 'нет соединения'}) "
+                        f"{attempt}/{self.limits.max_retries} через {delay:.1f} с"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                break
 
-            response.raise_for_status()
+            if refresh_needed:
+                await self.refresh_access_token(user_id, stale_access_token=access_token)
+                return await self.request(
+                    endpoint, method, data, params,
+                    user_id=user_id, headers=headers, _retry_on_401=False
+                )
 
             # Если статус 204, тело пустое => возвращаем пустой словарь
-            if response.status_code == 204:
+            if status == 204:
                 logger.info("Резюме успешно обновлено на HH!")
-                return {}
+                return HHResponse(status, {}, response_headers)
+
+            # 304 Not Modified: тело отсутствует, данные у вызывающего уже есть
+            if status == 304:
+                return HHResponse(status, {}, response_headers)
 
             # Если текст пустой, тоже возвращаем пустой словарь, чтобы не упасть на JSONDecodeError
-            if not response.text.strip():
+            if not body.strip():
                 logger.info("Получен пустой ответ, возвращаем пустой словарь.")
-                return {}
+                return HHResponse(status, {}, response_headers)
 
-            return response.json()
+            return HHResponse(status, json.loads(body), response_headers)
 
-        except requests.exceptions.HTTPError as e:
+        except aiohttp.ClientResponseError as e:
             logger.error(f"Ошибка при выполнении запроса к API: {e}")
-            raise
\ No newline at end of file
+            raise
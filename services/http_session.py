@@ -0,0 +1,70 @@
+# services/http_session.py
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+from config.config import HTTPConfig
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class HTTPSessionPool:
+    """
+    Общая пуловая aiohttp-сессия для обращений к внешним API.
+
+    Сессия создаётся лениво при первом запросе и переиспользуется всеми
+    вызовами: соединения держатся открытыми (keep-alive), а количество
+    одновременных соединений ограничено как в целом, так и на один хост.
+    """
+
+    def __init__(self, config: Optional[HTTPConfig] = None, user_agent: str = 'ResumeBot/1.0'):
+        """
+        Инициализация пула.
+
+        Args:
+            config: Параметры пула и таймаутов
+            user_agent: Значение заголовка User-Agent по умолчанию
+        """
+        self.config = config or HTTPConfig()
+        self.user_agent = user_agent
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Создаёт сессию с настроенным коннектором и таймаутами."""
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            keepalive_timeout=self.config.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.total_timeout,
+            sock_connect=self.config.connect_timeout,
+            sock_read=self.config.read_timeout
+        )
+        logger.info(
+            f"Создан пул HTTP-соединений: limit={self.config.limit}, "
+            f"limit_per_host={self.config.limit_per_host}"
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={'User-Agent': self.user_agent}
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её при необходимости."""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    self._session = self._create_session()
+        return self._session
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Пул HTTP-соединений закрыт")
+        self._session = None
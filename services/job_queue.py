@@ -0,0 +1,189 @@
+# services/job_queue.py
+import asyncio
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class JobStatus(Enum):
+    """Статусы фоновой задачи."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    Фоновая задача пользователя.
+    
+    Attributes:
+        job_id: Уникальный идентификатор задачи
+        user_id: Пользователь Telegram
+        chat_id: Чат, в который отправляются сообщения о прогрессе
+        payload: Данные, необходимые обработчику задачи
+        status: Текущий статус
+        stage: Текущий этап выполнения (для отображения прогресса)
+    """
+    job_id: str
+    user_id: int
+    chat_id: int
+    payload: Dict[str, Any]
+    status: JobStatus = JobStatus.QUEUED
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+JobRunner = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Ограниченная очередь фоновых задач с пулом воркеров.
+    
+    Обработчик Telegram ставит задачу в очередь и сразу возвращает управление,
+    а фиксированное число воркеров выполняет задачи по очереди. Так количество
+    одновременно выполняющихся длинных пайплайнов не растёт вместе с нагрузкой.
+    У пользователя может быть не более одной активной задачи.
+    Очередь и это ограничение действуют в пределах одного процесса.
+    """
+
+    def __init__(self, runner: JobRunner, workers: int = 4, max_queue: int = 100, history_size: int = 200):
+        """
+        Инициализация очереди.
+        
+        Args:
+            runner: Корутина, выполняющая задачу
+            workers: Количество воркеров
+            max_queue: Максимальная длина очереди ожидающих задач
+            history_size: Сколько завершённых задач хранить для просмотра
+        """
+        self.runner = runner
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize=max_queue)
+        self._active: Dict[str, Job] = {}
+        self._active_by_user: Dict[int, str] = {}
+        self._history: Deque[Job] = deque(maxlen=history_size)
+        self._worker_tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество задач, ожидающих воркера."""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        """Состояние очереди для мониторинга."""
+        running = sum(1 for job in self._active.values() if job.status == JobStatus.RUNNING)
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.queue_depth,
+            "running": running,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Возвращает активную или недавно завершённую задачу."""
+        if job_id in self._active:
+            return self._active[job_id]
+        return next((job for job in self._history if job.job_id == job_id), None)
+
+    def get_active_job(self, user_id: int) -> Optional[Job]:
+        """Возвращает активную задачу пользователя, если она есть."""
+        job_id = self._active_by_user.get(user_id)
+        return self._active.get(job_id) if job_id else None
+
+    def submit(self, user_id: int, chat_id: int, payload: Dict[str, Any]) -> Optional[Job]:
+        """
+        Ставит задачу в очередь.
+        
+        Returns:
+            Optional[Job]: Созданная задача или None, если очередь переполнена
+            
+        Raises:
+            ValueError: Если у пользователя уже есть активная задача
+        """
+        if user_id in self._active_by_user:
+            raise ValueError(f"У пользователя {user_id} уже есть активная задача")
+
+        job = Job(job_id=uuid.uuid4().hex[:12], user_id=user_id, chat_id=chat_id, payload=payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь задач переполнена ({self.max_queue}), задача отклонена")
+            return None
+
+        self._active[job.job_id] = job
+        self._active_by_user[user_id] = job.job_id
+        logger.info(f"Задача {job.job_id} пользователя {user_id} поставлена в очередь. Состояние: {self.stats()}")
+        return job
+
+    async def start(self) -> None:
+        """Запускает воркеры."""
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"Очередь задач запущена: workers={self.workers}, max_queue={self.max_queue}")
+
+    async def stop(self) -> None:
+        """Останавливает воркеры (выполняющиеся задачи отменяются)."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        logger.info("Очередь задач остановлена")
+
+    async def _worker(self, worker_id: int) -> None:
+        """Цикл воркера: берёт задачи из очереди и выполняет их."""
+        while True:
+            job = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            logger.info(
+                f"Воркер {worker_id} начал задачу {job.job_id} "
+                f"(ожидание {job.started_at - job.created_at:.1f}s)"
+            )
+            try:
+                await self.runner(job)
+                job.status = JobStatus.DONE
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status = JobStatus.FAILED
+                job.error = "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при выполнении задачи {job.job_id}: {e}")
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                self._finish(job)
+                self._queue.task_done()
+
+    def _finish(self, job: Job) -> None:
+        """Переносит задачу из активных в историю."""
+        self._active.pop(job.job_id, None)
+        if self._active_by_user.get(job.user_id) == job.job_id:
+            del self._active_by_user[job.user_id]
+        self._history.append(job)
+        logger.info(
+            f"Задача {job.job_id} завершена со статусом {job.status.value} "
+            f"за {job.finished_at - (job.started_at or job.created_at):.1f}s. Состояние: {self.stats()}"
+        )
@@ -0,0 +1,148 @@
+# services/llm_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+class LLMResultCache:
+    """
+    Контентно-адресуемый дисковый кэш результатов LLM.
+    
+    Ключ — хэш канонизированных входных данных (см. make_key), значение —
+    JSON провалидированной pydantic-модели. Записи разделены по пространствам
+    имён (например, "gap_analysis"), устаревают по TTL и вытесняются по
+    давности последнего обращения, когда превышен лимит количества записей.
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_entries: int = 5000, ttl: Optional[float] = None):
+        """
+        Инициализация кэша.
+        
+        Args:
+            db_path: Путь к файлу SQLite (":memory:" — только в памяти процесса)
+            max_entries: Максимальное количество записей
+            ttl: Время жизни записи в секундах (None — без ограничения)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._db_lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "namespace TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Строит стабильный ключ по входным данным.
+        
+        Части сериализуются в канонический JSON (отсортированные ключи,
+        без лишних пробелов), поэтому порядок ключей в словарях не влияет на хэш.
+        """
+        canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Синхронные операции с базой (выполняются в отдельном потоке)
+    # ------------------------------------------------------------------
+
+    def _db_get(self, namespace: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if not row:
+                return None
+            if self.ttl is not None and row[1] + self.ttl < now:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._conn.commit()
+        return row[0]
+
+    def _db_set(self, namespace: str, key: str, value: str) -> None:
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, now, now)
+            )
+            # Вытесняем самые давно использованные записи сверх лимита
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE rowid IN ("
+                "SELECT rowid FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Асинхронный интерфейс
+    # ------------------------------------------------------------------
+
+    async def get(self, namespace: str, key: str, model_cls: Type[ModelT]) -> Optional[ModelT]:
+        """
+        Возвращает закэшированный результат, провалидированный моделью.
+        
+        Args:
+            namespace: Пространство имён (тип результата)
+            key: Ключ, построенный make_key
+            model_cls: Pydantic-модель результата
+            
+        Returns:
+            Экземпляр модели или None при промахе
+        """
+        raw = await asyncio.to_thread(self._db_get, namespace, key)
+        if raw is None:
+            self.misses += 1
+            return None
+        try:
+            result = model_cls.model_validate_json(raw)
+        except ValidationError as ve:
+            # Схема могла измениться — считаем запись промахом
+            logger.warning(f"Запись кэша {namespace}/{key[:12]} не прошла валидацию: {ve}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    async def set(self, namespace: str, key: str, value: BaseModel) -> None:
+        """Сохраняет результат в кэш."""
+        await asyncio.to_thread(self._db_set, namespace, key, value.model_dump_json())
+
+    async def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,307 @@
+# services/llm_scheduler.py
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Пользователь, от имени которого выполняются вызовы модели в текущей задаче.
+# Устанавливается обработчиком задачи; дочерние задачи (asyncio.gather) наследуют значение.
+current_llm_user: ContextVar[Optional[int]] = ContextVar("current_llm_user", default=None)
+
+# Ошибки, после которых запрос имеет смысл повторить
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+class LLMScheduler:
+    """
+    Общий планировщик вызовов языковой модели.
+
+    Все запросы к OpenAI проходят через один планировщик:
+      - одновременно выполняется не больше `limit` запросов;
+      - ожидающие запросы обслуживаются по кругу между пользователями
+        (fair queuing), поэтому пользователь, запустивший много задач,
+        не задерживает остальных;
+      - лимит подстраивается по схеме AIMD: растёт на 1 за «окно» успешных
+        ответов и уменьшается вдвое при 429 или превышении целевой задержки;
+      - при 429 новые запросы не отправляются до истечения Retry-After,
+        повторы выполняются с экспоненциальной задержкой и джиттером.
+    Время ожидания в очереди и прочие показатели доступны через stats().
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        decrease_factor: float = 0.5,
+        window_size: int = 1000
+    ):
+        """
+        Инициализация планировщика.
+
+        Args:
+            initial_limit: Начальный лимит одновременных запросов
+            min_limit: Минимальный лимит
+            max_limit: Максимальный лимит
+            latency_target: Задержка ответа (сек), превышение которой считается перегрузкой
+            max_retries: Количество повторов при 429 и временных ошибках
+            backoff_base: Базовая задержка повтора (сек)
+            backoff_max: Максимальная задержка повтора (сек)
+            decrease_factor: Множитель уменьшения лимита при перегрузке
+            window_size: Сколько последних времён ожидания хранить для метрик
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.decrease_factor = decrease_factor
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        # Очереди ожидающих по пользователям и круг пользователей с ожидающими запросами
+        self._waiters: Dict[Any, Deque[asyncio.Future]] = {}
+        self._ring: Deque[Any] = deque()
+        self._paused_until = 0.0
+        self._resume_handle: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = float("-inf")
+        self._waits: Deque[float] = deque(maxlen=window_size)
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def limit(self) -> int:
+        """Текущий лимит одновременных запросов."""
+        return int(self._limit)
+
+    @property
+    def queued(self) -> int:
+        """Количество ожидающих запросов."""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    # -------------------------------------------------------------------------
+    # Выдача слотов
+    # -------------------------------------------------------------------------
+
+    def _can_start(self) -> bool:
+        return self._in_flight < self.limit and time.monotonic() >= self._paused_until
+
+    async def _acquire(self, user_id: Any) -> float:
+        """Ждёт слот для запроса пользователя и возвращает время ожидания."""
+        started = time.monotonic()
+        if not self._ring and self._can_start():
+            self._in_flight += 1
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(user_id, deque())
+        waiters.append(future)
+        if user_id not in self._ring:
+            self._ring.append(user_id)
+        # Слот мог освободиться (или истечь пауза) без вызова _release
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже был выдан — возвращаем его
+                self._release()
+            else:
+                self._discard_waiter(user_id, future)
+            raise
+        return time.monotonic() - started
+
+    def _discard_waiter(self, user_id: Any, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(user_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+        if waiters is not None and not waiters:
+            del self._waiters[user_id]
+            if user_id in self._ring:
+                self._ring.remove(user_id)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Выдаёт свободные слоты ожидающим, по одному пользователю за раз по кругу."""
+        while self._ring and self._can_start():
+            user_id = self._ring.popleft()
+            waiters = self._waiters[user_id]
+            future = waiters.popleft()
+            if waiters:
+                self._ring.append(user_id)
+            else:
+                del self._waiters[user_id]
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+        # Пауза после 429: возобновить выдачу по её окончании
+        delay = self._paused_until - time.monotonic()
+        if self._ring and delay > 0 and self._resume_handle is None:
+            self._resume_handle = asyncio.get_running_loop().call_later(delay, self._resume)
+
+    def _resume(self) -> None:
+        self._resume_handle = None
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+    # AIMD
+    # -------------------------------------------------------------------------
+
+    def _on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self._decrease(f"задержка {latency:.1f} с выше цели {self.latency_target:.0f} с")
+        else:
+            # +1 к лимиту примерно за limit успешных ответов
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def _on_rate_limited(self, retry_after: Optional[float]) -> None:
+        self.rate_limited += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._decrease("ответ 429 Too Many Requests")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        # Одна перегрузка даёт много сигналов сразу: снижаем не чаще раза в 10 с
+        if now - self._last_decrease < min(self.latency_target, 10.0):
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        logger.warning(f"Лимит запросов к LLM снижен {old_limit} -> {self.limit}: {reason}")
+
+    # -------------------------------------------------------------------------
+    # Публичный интерфейс
+    # -------------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def slot(self, user_id: Any = None) -> AsyncIterator[None]:
+        """
+        Занимает слот на время одного запроса к модели.
+
+        Args:
+            user_id: Пользователь (по умолчанию — из current_llm_user)
+        """
+        if user_id is None:
+            user_id = current_llm_user.get()
+        wait = await self._acquire(user_id)
+        self._waits.append(wait)
+        if wait > 1:
+            logger.info(f"Запрос к LLM пользователя {user_id} ждал в очереди {wait:.1f} с")
+        started = time.monotonic()
+        self.calls += 1
+        try:
+            yield
+        except openai.RateLimitError as e:
+            self._on_rate_limited(self.retry_after(e))
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            self._release()
+
+    async def run(self, call: Callable[[], Awaitable[T]], user_id: Any = None) -> T:
+        """
+        Выполняет запрос через планировщик с повторами.
+
+        При 429 и временных ошибках запрос повторяется до max_retries раз;
+        задержка берётся из Retry-After, иначе экспоненциальная с джиттером.
+        Во время задержки слот не занимается.
+
+        Args:
+            call: Функция, создающая корутину запроса (вызывается на каждую попытку)
+            user_id: Пользователь (по умолчанию — из current_llm_user)
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(user_id):
+                    return await call()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_after(e)
+                if delay is None:
+                    delay = min(
+                        self.backoff_max, self.backoff_base * 2 ** attempt
+                    ) * random.uniform(0.5, 1.5)
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"Запрос к LLM не удался ({type(e).__name__}), повтор {attempt}/{self.max_retries} "
+                    f"через {delay:.1f} с"
+                )
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """Задержка из заголовков retry-after-ms / Retry-After ответа (сек) или None."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            value = headers.get("retry-after")
+            if not value:
+                return None
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущее состояние и метрики планировщика (время ожидания — в секундах)."""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queued": self.queued,
+            "waiting_users": len(self._ring),
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "wait_p50": percentile(0.5),
+            "wait_p95": percentile(0.95),
+            "wait_max": round(waits[-1], 3) if waits else 0.0,
+        }
@@ -1,51 +1,285 @@
 # services/llm_service.py
 
+import asyncio
+import json
 import logging
-from typing import Optional
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union
 
-from openai import OpenAI
-from pydantic import ValidationError
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from pydantic import BaseModel, ValidationError
 
 from config.config import Config
-from models.gap_analysis import GapAnalysisResult, ResumeGapAnalysis  # Модель для результата GAP-анализа
-from models.resume import ResumeUpdate            # Модель для финального переписанного резюме
+from models.gap_analysis import GapAnalysisResult, ResumeAnalysisRewrite, ResumeGapAnalysis  # Модель для результата GAP-анализа
+from models.resume import ExperienceUpdate, ResumeUpdate  # Модель для финального переписанного резюме
+from models.vacancy import VacancyRequirements
 from core.logger import setup_logger
+from services.llm_cache import LLMResultCache
+from services.llm_scheduler import RETRYABLE_ERRORS, LLMScheduler
+from services.prompt_serializer import PromptSerializer
+from services.resume_validator import (
+    EXPERIENCE_SECTION_RE,
+    SECTION_MODELS,
+    ResumeOutputValidator,
+    ValidationReport
+)
+from services.stream_parser import IncrementalResumeParser, StreamEvent
 
 logger = setup_logger(__name__)
 
+# Версия промпта GAP-анализа. Входит в ключ кэша: при изменении промпта
+# её нужно увеличить, чтобы не отдавать результаты старой версии.
+GAP_PROMPT_VERSION = "gap-v3"
+
+# Этапы, учитываемые в статистике под общим именем (исправления отдельных разделов и т.п.)
+_STAGE_PREFIXES = ("исправление", "рерайт раздела", "рерайт experience")
+
+# Версия промпта извлечения требований вакансии (входит в ключ кэша)
+REQUIREMENTS_PROMPT_VERSION = "req-v1"
+
+class StreamInterruptedError(Exception):
+    """Поток прерван после того, как пользователь уже получил часть ответа (повтор невозможен)."""
+
 class LLMService:
     """
     Сервис для взаимодействия с языковой моделью (OpenAI).
     Содержит методы для:
       1) GAP-анализа резюме относительно вакансии.
       2) Финального рерайта (Final Resume Rewrite) с учётом результатов GAP-анализа.
+      
+    Все вызовы асинхронные: используется AsyncOpenAI поверх общего пула
+    HTTP-соединений, поэтому длительная генерация не блокирует диспетчер,
+    а отмена корутины прерывает запрос к API.
     """
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        result_cache: Optional[LLMResultCache] = None,
+        scheduler: Optional[LLMScheduler] = None
+    ):
         """
         Инициализация клиента OpenAI.
         
         Args:
             config: Объект конфигурации, содержащий API ключ и т.д.
+            result_cache: Кэш результатов LLM (если не передан, кэширование отключено)
+            scheduler: Общий планировщик запросов (по умолчанию создаётся по конфигурации)
         """
-        self.client = OpenAI(api_key=config.openai.api_key)
-        self.model = config.openai.model_name
+        openai_config = config.openai
+        self._http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=openai_config.max_connections,
+                max_keepalive_connections=openai_config.max_keepalive_connections
+            ),
+            timeout=httpx.Timeout(
+                openai_config.request_timeout,
+                connect=openai_config.connect_timeout
+            )
+        )
+        self.client = AsyncOpenAI(
+            api_key=openai_config.api_key,
+            base_url=openai_config.base_url,
+            # Повторы выполняет планировщик: он учитывает 429 в адаптивном лимите
+            max_retries=0,
+            http_client=self._http_client
+        )
+        self.model = openai_config.model_name
+        self.result_cache = result_cache
+        self.scheduler = scheduler or LLMScheduler(
+            initial_limit=openai_config.concurrency_initial,
+            min_limit=openai_config.concurrency_min,
+            max_limit=openai_config.concurrency_max,
+            latency_target=openai_config.latency_target,
+            max_retries=openai_config.max_retries
+        )
+        self._fanout_semaphore = asyncio.Semaphore(openai_config.fanout_concurrency)
+        self.output_validator = ResumeOutputValidator()
+        self.serializer = PromptSerializer(self.model)
+        # Статистика вызовов модели по этапам: количество, токены, суммарное время
+        self.usage: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+        )
+        # Текущие извлечения требований по ключу вакансии (single-flight)
+        self._requirements_tasks: Dict[str, asyncio.Task] = {}
+
+    async def close(self) -> None:
+        """Закрывает клиента OpenAI, пул HTTP-соединений и кэш результатов."""
+        await self.client.close()
+        if self.result_cache:
+            await self.result_cache.close()
+
+    async def _structured_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        response_format: Type[BaseModel],
+        stage: str
+    ) -> Optional[str]:
+        """
+        Выполняет chat-completion со structured output и возвращает сырой JSON-ответ.
+        
+        Args:
+            messages: Сообщения для chat-completion
+            response_format: Pydantic-модель ожидаемого ответа
+            stage: Название этапа (для логов)
+            
+        Returns:
+            Текст ответа модели или None, если ответ пустой.
+        """
+        async def attempt():
+            # Время считается от отправки запроса, без ожидания в очереди планировщика
+            started = time.monotonic()
+            completion = await self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=messages,
+                temperature = 0.4,
+                presence_penalty = 0.9,
+                frequency_penalty = 0.5,
+                logprobs = True,
+                top_logprobs= 2,
+                response_format=response_format
+            )
+            return completion, time.monotonic() - started
+
+        try:
+            completion, elapsed = await self.scheduler.run(attempt)
+        except asyncio.CancelledError:
+            logger.info(f"Запрос к OpenAI ({stage}) отменён")
+            raise
+
+        self._record_usage(stage, completion.usage, elapsed)
+
+        raw_response_text = completion.choices[0].message.content
+        if not raw_response_text:
+            logger.error(f"Пустой ответ от модели ({stage}).")
+            return None
+        return raw_response_text
     
-    def gap_analysis(self, parsed_resume: dict, parsed_vacancy: dict) -> Optional[ResumeGapAnalysis]:
+    def _record_usage(self, stage: str, usage: Any, elapsed: float) -> None:
+        """Учитывает вызов модели в статистике self.usage."""
+        key = next((prefix for prefix in _STAGE_PREFIXES if stage.startswith(prefix)), stage)
+        stats = self.usage[key]
+        stats["calls"] += 1
+        stats["seconds"] += elapsed
+        if usage:
+            stats["prompt_tokens"] += usage.prompt_tokens
+            stats["completion_tokens"] += usage.completion_tokens
+            logger.info(
+                f"Токены ({stage}): prompt={usage.prompt_tokens}, "
+                f"completion={usage.completion_tokens}, время {elapsed:.1f} с"
+            )
+
+    async def extract_vacancy_requirements(
+        self,
+        parsed_vacancy: dict,
+        vacancy_id: Optional[str] = None
+    ) -> Optional[VacancyRequirements]:
+        """
+        Сжимает описание вакансии в структурированные требования.
+        
+        Результат кэшируется по id вакансии и хэшу её содержимого: на одну
+        и ту же вакансию откликается много пользователей, а описание меняется
+        редко. Одновременные запросы для одной вакансии объединяются в один
+        вызов модели.
+        
+        Args:
+            parsed_vacancy: Словарь с распарсенными данными вакансии.
+            vacancy_id: Идентификатор вакансии на HH (если известен).
+        
+        Returns:
+            Объект VacancyRequirements или None при ошибке.
+        """
+        cache_key = LLMResultCache.make_key(vacancy_id, parsed_vacancy, self.model, REQUIREMENTS_PROMPT_VERSION)
+        if self.result_cache:
+            cached = await self.result_cache.get("vacancy_requirements", cache_key, VacancyRequirements)
+            if cached:
+                logger.info(f"Требования вакансии {vacancy_id} взяты из кэша.")
+                return cached
+
+        task = self._requirements_tasks.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._extract_requirements(parsed_vacancy, vacancy_id, cache_key))
+            self._requirements_tasks[cache_key] = task
+            task.add_done_callback(lambda t: self._requirements_tasks.pop(cache_key, None))
+        # shield: отмена одного из ожидающих не должна прерывать общее извлечение
+        return await asyncio.shield(task)
+
+    async def _extract_requirements(
+        self,
+        parsed_vacancy: dict,
+        vacancy_id: Optional[str],
+        cache_key: str
+    ) -> Optional[VacancyRequirements]:
+        """Выполняет сам запрос извлечения требований (через extract_vacancy_requirements)."""
+        try:
+            messages = [
+                {
+                    "role": "system",
+                    "content": (
+                        "Ты — эксперт по подбору персонала. Выдели из вакансии требования к кандидату "
+                        "коротко и без воды. Возвращай только валидный JSON по заданной структуре (VacancyRequirements)."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": self._create_requirements_prompt(parsed_vacancy)
+                }
+            ]
+            raw_response_text = await self._structured_completion(
+                messages, VacancyRequirements, stage="требования вакансии"
+            )
+            if not raw_response_text:
+                return None
+
+            requirements = VacancyRequirements.model_validate_json(raw_response_text)
+            logger.info(f"Требования вакансии {vacancy_id} извлечены.")
+            if self.result_cache:
+                await self.result_cache.set("vacancy_requirements", cache_key, requirements)
+            return requirements
+
+        except ValidationError as ve:
+            logger.error(f"Ошибка валидации требований вакансии: {ve}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при извлечении требований вакансии: {e}")
+            return None
+
+    async def gap_analysis(
+        self,
+        parsed_resume: dict,
+        parsed_vacancy: dict,
+        vacancy_id: Optional[str] = None
+    ) -> Optional[ResumeGapAnalysis]:
         """
         Выполняет GAP-анализ резюме относительно вакансии.
         
+        Вместо полного описания вакансии в промпт передаются сжатые требования
+        (extract_vacancy_requirements). Если извлечь их не удалось, используется
+        исходное описание.
+        
         Args:
             parsed_resume: Словарь с распарсенными данными резюме.
             parsed_vacancy: Словарь с распарсенными данными вакансии.
+            vacancy_id: Идентификатор вакансии на HH (ключ кэша требований).
         
         Returns:
             Объект GapAnalysisResult, если удалось распарсить корректный JSON-ответ.
             Иначе None.
         """
         try:
-            # 1. Сформировать промпт для GAP-анализа
-            prompt_text = self._create_gap_analysis_prompt(parsed_resume, parsed_vacancy)
+            # 0. Проверить кэш: тот же резюме/вакансия/модель/версия промпта
+            cache_key = LLMResultCache.make_key(parsed_resume, parsed_vacancy, self.model, GAP_PROMPT_VERSION)
+            if self.result_cache:
+                cached = await self.result_cache.get("gap_analysis", cache_key, ResumeGapAnalysis)
+                if cached:
+                    logger.info("GAP-анализ взят из кэша.")
+                    return cached
+
+            # 1. Сжать вакансию до требований и сформировать промпт для GAP-анализа
+            requirements = await self.extract_vacancy_requirements(parsed_vacancy, vacancy_id)
+            prompt_text = self._create_gap_analysis_prompt(parsed_resume, parsed_vacancy, requirements)
             
             # 2. Подготовить сообщения для chat-completion
             messages = [
@@ -62,27 +296,22 @@ class LLMService:
                 }
             ]
             
-            # 3. Вызвать OpenAI API (chat.completions.parse) с явной моделью GapAnalysisResult
-            completion = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=messages,
-                temperature = 0.4,
-                presence_penalty = 0.9,
-                frequency_penalty = 0.5,
-                logprobs = True,
-                top_logprobs= 2,
-                response_format=ResumeGapAnalysis
+            # 3. Вызвать OpenAI API (chat.completions.parse) с явной моделью ResumeGapAnalysis
+            raw_response_text = await self._structured_completion(
+                messages, ResumeGapAnalysis, stage="GAP-анализ"
             )
 
-            # 4. Извлечь ответ
-            raw_response_text = completion.choices[0].message.content
+            # 4. Проверить, что ответ не пустой
             if not raw_response_text:
-                logger.error("Пустой ответ от модели при GAP-анализе.")
                 return None
             
             # 5. Попробовать распарсить JSON в модель GapAnalysisResult
             gap_result = ResumeGapAnalysis.model_validate_json(raw_response_text)
             logger.info("GAP-анализ успешно выполнен.")
+            
+            # 6. Сохранить результат в кэш
+            if self.result_cache:
+                await self.result_cache.set("gap_analysis", cache_key, gap_result)
             return gap_result
 
         except ValidationError as ve:
@@ -92,7 +321,7 @@ class LLMService:
             logger.error(f"Ошибка при GAP-анализе: {e}")
             return None
     
-    def final_resume_rewrite(
+    async def final_resume_rewrite(
         self, 
         parsed_resume: dict, 
         gap_result: ResumeGapAnalysis
@@ -108,47 +337,20 @@ class LLMService:
             Объект ResumeUpdate, если всё OK, иначе None.
         """
         try:
-            # 1. Формируем промпт с учётом gap_result
-            prompt_text = self._create_final_rewrite_prompt(parsed_resume, gap_result)
+            # 1-2. Формируем промпт с учётом gap_result и сообщения для chat-completion
+            messages = self._final_rewrite_messages(parsed_resume, gap_result)
 
-            # 2. Подготавливаем сообщения для chat-completion
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Ты — эксперт HR. Учитывайте GAP-анализ и требования вакансии выпереписываете резюме. "
-                        "Выполните изменение резюме тех разделов что указаны в gap-анализе. "
-                        "ЦЕЛЬ результата: переписанные секции резюме выполненные по рекомендациям из gap-анализа. "
-                        "ALWAYS ANSWER IN RUSSIAN, IT'S IMPORTANT! "
-                        "ALWAYS CONSIDER CHANGES IN ALL OBJECTS <experience>"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt_text
-                }
-            ]
-
-            # 3. Запрашиваем у OpenAI финальный рерайт
-            completion = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=messages,
-                temperature = 0.4,
-                presence_penalty = 0.9,
-                frequency_penalty = 0.5,
-                logprobs = True,
-                top_logprobs= 2,
-                response_format=ResumeUpdate  # парсим сразу в модель ResumeUpdate
+            # 3. Запрашиваем у OpenAI финальный рерайт (парсим сразу в модель ResumeUpdate)
+            raw_response_text = await self._structured_completion(
+                messages, ResumeUpdate, stage="финальный рерайт"
             )
 
-            # 4. Извлекаем текст ответа
-            raw_response_text = completion.choices[0].message.content
+            # 4. Проверяем, что ответ не пустой
             if not raw_response_text:
-                logger.error("Пустой ответ при финальном рерайте.")
                 return None
 
-            # 5. Парсим JSON в модель ResumeUpdate
-            final_resume = ResumeUpdate.model_validate_json(raw_response_text)
+            # 5. Проверяем ответ по разделам и при необходимости чиним отдельные разделы
+            final_resume = await self._validate_and_repair(parsed_resume, gap_result, raw_response_text)
             logger.info("Финальный рерайт выполнен успешно.")
             return final_resume
 
@@ -159,38 +361,517 @@ class LLMService:
             logger.error(f"Ошибка при обращении к OpenAI API (финальный рерайт): {e}")
             return None
 
+    async def stream_final_resume_rewrite(
+        self,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis,
+        on_event: Callable[[StreamEvent], Awaitable[None]]
+    ) -> Optional[ResumeUpdate]:
+        """
+        Финальный рерайт в потоковом режиме.
+        
+        Ответ модели читается по мере генерации и разбирается инкрементально:
+        как только готово очередное поле ResumeUpdate (или отдельная запись
+        experience), вызывается on_event. Итоговый результат валидируется так же,
+        как в final_resume_rewrite.
+        
+        Args:
+            parsed_resume: Исходные данные резюме (dict).
+            gap_result: Результат GAP-анализа.
+            on_event: Корутина, получающая готовые фрагменты ответа.
+        
+        Returns:
+            Объект ResumeUpdate, если всё OK, иначе None.
+        """
+        try:
+            messages = self._final_rewrite_messages(parsed_resume, gap_result)
+            events_sent = False
+
+            async def attempt() -> IncrementalResumeParser:
+                nonlocal events_sent
+                parser = IncrementalResumeParser()
+                try:
+                    async with self.client.beta.chat.completions.stream(
+                        model=self.model,
+                        messages=messages,
+                        temperature = 0.4,
+                        presence_penalty = 0.9,
+                        frequency_penalty = 0.5,
+                        response_format=ResumeUpdate
+                    ) as stream:
+                        async for event in stream:
+                            if event.type != "content.delta":
+                                continue
+                            for parsed_event in parser.feed(event.delta):
+                                events_sent = True
+                                try:
+                                    await on_event(parsed_event)
+                                except Exception as callback_error:
+                                    # Ошибка отображения прогресса не должна прерывать генерацию
+                                    logger.warning(f"Ошибка в обработчике потока: {callback_error}")
+                except RETRYABLE_ERRORS as e:
+                    if events_sent:
+                        # Пользователь уже видит часть ответа — повтор начал бы вывод заново
+                        raise StreamInterruptedError(f"поток прерван после начала вывода: {e!r}") from e
+                    raise
+                return parser
+
+            # Повторы при 429/5xx и паузы по Retry-After — через планировщик, пока вывод не начался
+            parser = await self.scheduler.run(attempt)
+
+            if not parser.text:
+                logger.error("Пустой ответ при потоковом финальном рерайте.")
+                return None
+
+            final_resume = await self._validate_and_repair(parsed_resume, gap_result, parser.text)
+            logger.info("Потоковый финальный рерайт выполнен успешно.")
+            return final_resume
+
+        except asyncio.CancelledError:
+            logger.info("Потоковый финальный рерайт отменён")
+            raise
+        except ValidationError as ve:
+            logger.error(f"Ошибка валидации JSON потокового рерайта: {ve}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при обращении к OpenAI API (потоковый рерайт): {e}")
+            return None
+
+    async def final_resume_rewrite_fanout(
+        self,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis
+    ) -> Optional[ResumeUpdate]:
+        """
+        Финальный рерайт с разбиением на независимые запросы (fan-out).
+        
+        Каждая запись experience[i] и каждый скалярный раздел (title, skills,
+        skill_set, professional_roles), для которых есть рекомендации GAP-анализа,
+        переписываются отдельным запросом. Запросы выполняются параллельно
+        (не больше fanout_concurrency одновременно), поэтому время рерайта
+        определяется самым длинным разделом, а не суммой всех. Разделы без
+        рекомендаций и разделы, которые не удалось переписать, остаются исходными.
+        
+        Args:
+            parsed_resume: Исходные данные резюме (dict).
+            gap_result: Результат GAP-анализа.
+        
+        Returns:
+            Объект ResumeUpdate, если всё OK, иначе None.
+        """
+        try:
+            section_recs, experience_recs = self._group_recommendations(
+                gap_result, len(parsed_resume.get("experience") or [])
+            )
+
+            # Исходные значения — они же результат для разделов без рекомендаций
+            result: Dict[str, Any] = {
+                "title": parsed_resume.get("title", ""),
+                "skills": parsed_resume.get("skills", ""),
+                "skill_set": parsed_resume.get("skill_set", []),
+                "professional_roles": parsed_resume.get("professional_roles", []),
+            }
+            experience: List[Dict[str, Any]] = [
+                {"description": exp.get("description", ""), "position": exp.get("position", "")}
+                for exp in parsed_resume.get("experience") or []
+            ]
+
+            async def rewrite_section(section: str) -> None:
+                rewritten = await self._rewrite_piece(
+                    SECTION_MODELS[section],
+                    self._create_section_rewrite_prompt(
+                        parsed_resume, section, result[section], section_recs[section]
+                    ),
+                    stage=f"рерайт раздела {section}"
+                )
+                if rewritten is not None:
+                    result[section] = rewritten.model_dump()[section]
+
+            async def rewrite_experience(index: int) -> None:
+                rewritten = await self._rewrite_piece(
+                    ExperienceUpdate,
+                    self._create_section_rewrite_prompt(
+                        parsed_resume, f"experience[{index}]", experience[index], experience_recs[index]
+                    ),
+                    stage=f"рерайт experience[{index}]"
+                )
+                if rewritten is not None:
+                    experience[index] = rewritten.model_dump()
+
+            await asyncio.gather(
+                *(rewrite_section(section) for section in SECTION_MODELS if section_recs.get(section)),
+                *(rewrite_experience(index) for index in sorted(experience_recs))
+            )
+
+            result["experience"] = experience
+            final_resume = await self._validate_and_repair(parsed_resume, gap_result, result)
+            logger.info(
+                f"Поразделовый рерайт выполнен: разделов {sum(1 for s in SECTION_MODELS if section_recs.get(s))}, "
+                f"записей опыта {len(experience_recs)}."
+            )
+            return final_resume
+
+        except ValidationError as ve:
+            logger.error(f"Ошибка валидации результата поразделового рерайта: {ve}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при поразделовом рерайте: {e}")
+            return None
+
+    async def fast_analysis_rewrite(
+        self,
+        parsed_resume: dict,
+        parsed_vacancy: dict,
+        vacancy_id: Optional[str] = None
+    ) -> Optional[Tuple[ResumeGapAnalysis, ResumeUpdate]]:
+        """
+        Быстрый режим: GAP-анализ и финальный рерайт одним запросом.
+        
+        Модель заполняет объединённую схему ResumeAnalysisRewrite: сначала
+        рекомендации, затем резюме, переписанное по ним. Резюме передаётся
+        в модель один раз, и пайплайн обходится одним обращением к API вместо
+        двух последовательных. Переписанное резюме проверяется и при
+        необходимости исправляется так же, как в final_resume_rewrite.
+        
+        Args:
+            parsed_resume: Словарь с распарсенными данными резюме.
+            parsed_vacancy: Словарь с распарсенными данными вакансии.
+            vacancy_id: Идентификатор вакансии на HH (ключ кэша требований).
+        
+        Returns:
+            Пара (ResumeGapAnalysis, ResumeUpdate) или None при ошибке.
+        """
+        try:
+            requirements = await self.extract_vacancy_requirements(parsed_vacancy, vacancy_id)
+            messages = [
+                {"role": "system", "content": self._final_rewrite_messages_system()},
+                {"role": "user", "content": self._create_fast_prompt(parsed_resume, parsed_vacancy, requirements)}
+            ]
+            raw_response_text = await self._structured_completion(
+                messages, ResumeAnalysisRewrite, stage="анализ и рерайт"
+            )
+            if not raw_response_text:
+                return None
+
+            data = json.loads(raw_response_text)
+            gap_result = ResumeGapAnalysis.model_validate({"recommendations": data.get("recommendations")})
+            final_resume = await self._validate_and_repair(
+                parsed_resume, gap_result, data.get("rewritten_resume") or {}
+            )
+            logger.info("Анализ и рерайт одним запросом выполнены успешно.")
+            return gap_result, final_resume
+
+        except ValidationError as ve:
+            logger.error(f"Ошибка валидации ответа быстрого режима: {ve}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при обращении к OpenAI API (быстрый режим): {e}")
+            return None
+
+    async def _validate_and_repair(
+        self,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis,
+        candidate: Union[str, Dict[str, Any]]
+    ) -> ResumeUpdate:
+        """
+        Проверяет ответ рерайта и повторно запрашивает только испорченные разделы.
+        
+        Ответ сверяется с исходным резюме (ResumeOutputValidator). Для каждого
+        отсутствующего или некорректного раздела (включая отдельные записи
+        experience[i]) выполняется один параллельный запрос с описанием
+        проблемы. Если и он не дал корректного результата, раздел берётся
+        из исходного резюме — ответ в целом не отбрасывается.
+        
+        Args:
+            parsed_resume: Исходные данные резюме (dict).
+            gap_result: Результат GAP-анализа.
+            candidate: Текст ответа модели или уже собранный dict.
+        
+        Returns:
+            Провалидированный ResumeUpdate.
+        """
+        if isinstance(candidate, str):
+            candidate = self.output_validator.salvage(candidate)
+        report = self.output_validator.check(candidate, parsed_resume)
+        if not report.ok:
+            logger.warning(
+                "Ответ рерайта требует исправления: "
+                + "; ".join(f"{issue.section}: {issue.reason}" for issue in report.issues)
+            )
+            await self._repair(parsed_resume, gap_result, report)
+        return ResumeUpdate.model_validate(report.data)
+
+    async def _repair(
+        self,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis,
+        report: ValidationReport
+    ) -> None:
+        """Заполняет в report.data разделы, перечисленные в report.issues."""
+        section_recs, experience_recs = self._group_recommendations(
+            gap_result, len(parsed_resume.get("experience") or [])
+        )
+
+        async def repair_piece(section: str, reason: str) -> None:
+            match = EXPERIENCE_SECTION_RE.match(section)
+            recommendations = (
+                experience_recs.get(int(match.group(1)), []) if match else section_recs.get(section, [])
+            )
+            rewritten = await self._rewrite_piece(
+                self.output_validator.piece_model(section),
+                self._create_section_rewrite_prompt(
+                    parsed_resume,
+                    section,
+                    self.output_validator.original_piece(section, parsed_resume),
+                    recommendations,
+                    issue=reason
+                ),
+                stage=f"исправление {section}"
+            )
+            value, problem = None, "повторный запрос не удался"
+            if rewritten is not None:
+                piece = rewritten.model_dump()
+                value, problem = self.output_validator.check_piece(
+                    section,
+                    piece if match else piece[section],
+                    self.output_validator.original_piece(section, parsed_resume)
+                )
+            if problem:
+                logger.warning(f"Раздел {section} не исправлен ({problem}), используется исходное значение")
+                value = self.output_validator.fallback_piece(section, parsed_resume)
+
+            if match:
+                report.data["experience"][int(match.group(1))] = value
+            else:
+                report.data[section] = value
+
+        await asyncio.gather(*(repair_piece(issue.section, issue.reason) for issue in report.issues))
+        logger.info(f"Обработано проблемных разделов: {len(report.issues)}")
+
+    async def _rewrite_piece(
+        self,
+        response_format: Type[BaseModel],
+        prompt_text: str,
+        stage: str
+    ) -> Optional[BaseModel]:
+        """
+        Переписывает один раздел резюме отдельным запросом.
+        
+        Returns:
+            Провалидированная модель раздела или None при ошибке.
+        """
+        messages = [
+            {"role": "system", "content": self._final_rewrite_messages_system()},
+            {"role": "user", "content": prompt_text}
+        ]
+        try:
+            async with self._fanout_semaphore:
+                raw_response_text = await self._structured_completion(messages, response_format, stage=stage)
+            if not raw_response_text:
+                return None
+            return response_format.model_validate_json(raw_response_text)
+        except ValidationError as ve:
+            logger.error(f"Ошибка валидации ({stage}): {ve}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при обращении к OpenAI API ({stage}): {e}")
+            return None
+
+    @staticmethod
+    def _group_recommendations(
+        gap_result: ResumeGapAnalysis,
+        experience_count: int
+    ) -> "tuple[Dict[str, List[Any]], Dict[int, List[Any]]]":
+        """
+        Раскладывает рекомендации GAP-анализа по разделам резюме.
+        
+        Рекомендации вида "experience[i]" относятся к записи i. Рекомендации
+        с разделом просто "experience" распределяются по записям по порядку.
+        
+        Returns:
+            Рекомендации скалярных разделов и рекомендации по индексам опыта.
+        """
+        section_recs: Dict[str, List[Any]] = {}
+        experience_recs: Dict[int, List[Any]] = {}
+        unindexed: List[Any] = []
+        for rec in gap_result.recommendations:
+            section = rec.section.strip().lower()
+            match = EXPERIENCE_SECTION_RE.match(section)
+            if match:
+                index = int(match.group(1))
+                if index < experience_count:
+                    experience_recs.setdefault(index, []).append(rec)
+            elif section == "experience":
+                unindexed.append(rec)
+            elif section in SECTION_MODELS:
+                section_recs.setdefault(section, []).append(rec)
+
+        free_indexes = [i for i in range(experience_count) if i not in experience_recs]
+        for index, rec in zip(free_indexes, unindexed):
+            experience_recs[index] = [rec]
+        return section_recs, experience_recs
+
     # =========================================================================
     # ВНУТРЕННИЕ (private) МЕТОДЫ ДЛЯ СОЗДАНИЯ ПРОМПТОВ
     # =========================================================================
 
-    def _create_gap_analysis_prompt(self, parsed_resume: dict, parsed_vacancy: dict) -> str:
+    @staticmethod
+    def _final_rewrite_messages_system() -> str:
+        """Системное сообщение для финального рерайта."""
+        return (
+            "Ты — эксперт HR. Учитывайте GAP-анализ и требования вакансии выпереписываете резюме. "
+            "Выполните изменение резюме тех разделов что указаны в gap-анализе. "
+            "ЦЕЛЬ результата: переписанные секции резюме выполненные по рекомендациям из gap-анализа. "
+            "ALWAYS ANSWER IN RUSSIAN, IT'S IMPORTANT! "
+            "ALWAYS CONSIDER CHANGES IN ALL OBJECTS <experience>"
+        )
+
+    def _create_section_rewrite_prompt(
+        self,
+        parsed_resume: dict,
+        section: str,
+        original_value: Any,
+        recommendations: List[Any],
+        issue: Optional[str] = None
+    ) -> str:
+        """
+        Формирует промпт для рерайта одного раздела резюме.
+        В качестве контекста передаётся желаемая должность и ключевые навыки.
+        Если задан issue, это повторный запрос после некорректного ответа.
+        """
+        details = (
+            self.serializer.render_recommendations(recommendations)
+            or "- no specific recommendations, improve wording only"
+        )
+        issue_note = (
+            f"""
+        IMPORTANT: the previous answer for this section was rejected: {issue}.
+        Fix this problem in your answer. Respect the limits: {self.output_validator.limits}.
+"""
+            if issue else ""
+        )
+        return f"""
+        You are rewriting ONE section of a resume according to the gap analysis recommendations.
+
+        Resume context:
+            title: {self.serializer.render(parsed_resume.get("title"))}
+            skill_set: {self.serializer.render(parsed_resume.get("skill_set"))}
+
+        Section to rewrite: {section}
+            <original_section>
+{self.serializer.render(original_value)}
+            </original_section>
+
+        Recommendations for this section:
+            <recommendations>
+            {details}
+            </recommendations>
+
+        Guidelines:
+        1. Use the original information as a base, but REWRITE it according to the recommendations.
+        2. For experience entries add specific metrics, achievements, technical details and NUMBERS that align with the recommendations, keeping the text natural and authentic.
+        3. Do not invent employers, positions or facts that contradict the original.
+        4. Keep the tone and style of the original resume.
+
+        Return only the rewritten section in the requested JSON structure.
+        {issue_note}
+            """
+
+
+    def _final_rewrite_messages(
+        self,
+        parsed_resume: dict,
+        gap_result: ResumeGapAnalysis
+    ) -> List[Dict[str, Any]]:
+        """Собирает сообщения chat-completion для финального рерайта."""
+        return [
+            {
+                "role": "system",
+                "content": self._final_rewrite_messages_system()
+            },
+            {
+                "role": "user",
+                "content": self._create_final_rewrite_prompt(parsed_resume, gap_result)
+            }
+        ]
+
+    def _create_requirements_prompt(self, parsed_vacancy: dict) -> str:
+        """
+        Формирует промпт для извлечения требований из вакансии.
+        """
+        vacancy = self.serializer.render_vacancy(parsed_vacancy)
+        self.serializer.log_token_report("требования вакансии", vacancy)
+        return f"""
+        Extract the candidate requirements from the job description below.
+
+        <job_description>
+        <description>
+{vacancy["description"]}
+        </description>
+        <key_skills>{vacancy["key_skills"]}</key_skills>
+        <experience>{vacancy["experience"]}</experience>
+        </job_description>
+
+        Guidelines:
+        1. must_have — only explicit requirements; nice_to_have — items marked as a plus / desirable.
+        2. Each item is one short phrase (up to 10 words), no duplicates between lists.
+        3. stack — names of technologies, languages, frameworks and tools only.
+        4. responsibilities — the main duties, one short phrase each.
+        5. seniority — infer from the title, required years of experience and responsibilities.
+        6. Keep the language of the original job description.
+        """
+
+    def _create_gap_analysis_prompt(
+        self,
+        parsed_resume: dict,
+        parsed_vacancy: dict,
+        requirements: Optional[VacancyRequirements] = None
+    ) -> str:
         """
         Формирует промпт для GAP-анализа.
         Здесь можно вставить ваш кастомный текст.
+        Если переданы requirements, они заменяют полное описание вакансии.
         """
+        resume = self.serializer.render_resume(parsed_resume)
+        vacancy = self.serializer.render_vacancy(parsed_vacancy)
+        description_tag = "description"
+        if requirements is not None:
+            description_tag = "requirements"
+            vacancy["description"] = self.serializer.render(requirements)
+        self.serializer.log_token_report("GAP-анализ", {
+            **{f"resume.{name}": text for name, text in resume.items()},
+            **{f"vacancy.{name}": text for name, text in vacancy.items()}
+        })
         return f"""
         You are an AI assistant tasked with performing a comprehensive gap analysis between a resume and a job description. Your goal is to provide detailed recommendations on how to improve the resume to better match the job requirements.
 
         First, you will be given the parsed data from a resume:
         
         <resume>
-        <title>{parsed_resume.get("title")}</title>
-        <skills>{parsed_resume.get("skills")}</skills>
-        <skill_set>{parsed_resume.get("skill_set")}</skill_set>
-        <experience>{parsed_resume.get("experience")}</experience>
-        <professional_roles>{parsed_resume.get("professional_roles")}</professional_roles>
+        <title>{resume["title"]}</title>
+        <skills>
+{resume["skills"]}
+        </skills>
+        <skill_set>{resume["skill_set"]}</skill_set>
+        <experience>
+{resume["experience"]}
+        </experience>
+        <professional_roles>{resume["professional_roles"]}</professional_roles>
         </resume>
 
         Next, you will be presented with the parsed data from the job description that the user wants to apply for:
 
         <job_description>
-        <description>{parsed_vacancy.get("description")}</description>
-        <key_skills>{parsed_vacancy.get("key_skills")}</key_skills>
-        <employment_form>{parsed_vacancy.get("employment_form")}</employment_form>
-        <experience>{parsed_vacancy.get("experience")}</experience>
-        <schedule>{parsed_vacancy.get("schedule")}</schedule>
-        <employment>{parsed_vacancy.get("employment")}</employment>
-        <professional_roles>{parsed_vacancy.get("professional_roles")}</professional_roles>
+        <{description_tag}>
+{vacancy["description"]}
+        </{description_tag}>
+        <key_skills>{vacancy["key_skills"]}</key_skills>
+        <employment_form>{vacancy["employment_form"]}</employment_form>
+        <experience>{vacancy["experience"]}</experience>
+        <schedule>{vacancy["schedule"]}</schedule>
+        <employment>{vacancy["employment"]}</employment>
+        <professional_roles>{vacancy["professional_roles"]}</professional_roles>
         </job_description>
 
         
@@ -252,6 +933,64 @@ class LLMService:
         After completing your analysis, output the filled ResumeGapAnalysis schema in JSON format. Ensure that your recommendations are detailed, specific, and provide clear step-by-step instructions for improving each section of the resume.
         """
     
+    def _create_fast_prompt(
+        self,
+        parsed_resume: dict,
+        parsed_vacancy: dict,
+        requirements: Optional[VacancyRequirements] = None
+    ) -> str:
+        """
+        Формирует промпт быстрого режима (анализ и рерайт одним запросом).
+        """
+        resume = self.serializer.render_resume(parsed_resume)
+        vacancy = self.serializer.render_vacancy(parsed_vacancy)
+        description_tag = "description"
+        if requirements is not None:
+            description_tag = "requirements"
+            vacancy["description"] = self.serializer.render(requirements)
+        self.serializer.log_token_report("анализ и рерайт", {
+            **{f"resume.{name}": text for name, text in resume.items()},
+            **{f"vacancy.{name}": text for name, text in vacancy.items()}
+        })
+        return f"""
+        You will perform a gap analysis between a resume and a job description and then rewrite the resume according to your own analysis, in a single answer.
+
+        <resume>
+        <title>{resume["title"]}</title>
+        <skills>
+{resume["skills"]}
+        </skills>
+        <skill_set>{resume["skill_set"]}</skill_set>
+        <experience>
+{resume["experience"]}
+        </experience>
+        <professional_roles>{resume["professional_roles"]}</professional_roles>
+        </resume>
+
+        <job_description>
+        <{description_tag}>
+{vacancy["description"]}
+        </{description_tag}>
+        <key_skills>{vacancy["key_skills"]}</key_skills>
+        <experience>{vacancy["experience"]}</experience>
+        <schedule>{vacancy["schedule"]}</schedule>
+        <employment>{vacancy["employment"]}</employment>
+        <professional_roles>{vacancy["professional_roles"]}</professional_roles>
+        </job_description>
+
+        Step 1 — recommendations:
+        1. Compare each section of the resume (title, skills, skill_set, experience, professional_roles) with the job description.
+        2. Create one recommendation per experience entry, with section 'experience[i]' where i is the entry index shown above.
+        3. In 'details' give clear step-by-step instructions (minimum 3 items) of what has to change.
+
+        Step 2 — rewritten_resume:
+        1. Apply every recommendation from step 1 to the corresponding section.
+        2. Keep exactly the same number of experience entries as in the original resume, in the same order.
+        3. Use the original information as a base; add specific metrics, achievements, technical details and NUMBERS that align with the job description, keeping the text natural and authentic.
+        4. Do not add false information, new sections or new experiences.
+        5. Keep the tone and style of the original resume.
+        """
+
     def _create_final_rewrite_prompt(
         self,
         parsed_resume: dict,
@@ -260,21 +999,29 @@ class LLMService:
         """
         Формирует промпт для финального рерайта резюме, учитывая результаты GAP-анализа.
         """
+        resume = self.serializer.render_resume(parsed_resume)
+        gap = self.serializer.render_recommendations(gap_result.recommendations)
+        self.serializer.log_token_report("финальный рерайт", {
+            "gap_analysis": gap,
+            **{f"resume.{name}": text for name, text in resume.items()}
+        })
         return f"""
         You are tasked with rewriting a resume based on a gap analysis to better match a job description. You will be provided with three inputs:
 
         Here are the results of the GAP analysis:
             <gap_analysis>
-            {gap_result.recommendations} 
+{gap}
             </gap_analysis>
 
         Here is the candidate's original resume:
             <original_resume>
-            title: {parsed_resume.get("title")}
-            skills: {parsed_resume.get("skills")}
-            skill_set: {parsed_resume.get("skill_set")}
-            experience: {parsed_resume.get("experience")}
-            professional_roles: {parsed_resume.get("professional_roles")}
+            title: {resume["title"]}
+            skills:
+{resume["skills"]}
+            skill_set: {resume["skill_set"]}
+            experience:
+{resume["experience"]}
+            professional_roles: {resume["professional_roles"]}
             </original_resume>
 
 
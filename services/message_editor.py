@@ -0,0 +1,100 @@
+# services/message_editor.py
+import asyncio
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Ограничение Telegram на длину текста сообщения
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+class ThrottledMessageEditor:
+    """
+    Прогрессивно обновляемое сообщение Telegram.
+
+    Отправляет одно сообщение и затем редактирует его по мере поступления
+    новых данных, но не чаще одного раза в min_interval секунд (Telegram
+    ограничивает частоту редактирований). Промежуточные версии текста,
+    пришедшие между редактированиями, схлопываются в последнюю.
+    """
+
+    def __init__(self, bot: Bot, chat_id: int, min_interval: float = 1.5):
+        """
+        Инициализация.
+
+        Args:
+            bot: Экземпляр бота
+            chat_id: Чат, в котором показывается сообщение
+            min_interval: Минимальный интервал между редактированиями (сек)
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self._message_id: Optional[int] = None
+        self._shown_text: Optional[str] = None
+        self._pending_text: Optional[str] = None
+        self._last_edit = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _fit(text: str) -> str:
+        """Обрезает текст до лимита Telegram."""
+        if len(text) <= TELEGRAM_MESSAGE_LIMIT:
+            return text
+        return text[:TELEGRAM_MESSAGE_LIMIT - 1] + "…"
+
+    async def update(self, text: str) -> None:
+        """
+        Запрашивает показ нового текста.
+
+        Первый вызов отправляет сообщение сразу, последующие — не чаще
+        min_interval (последний текст будет показан по истечении интервала).
+        """
+        self._pending_text = self._fit(text)
+        if self._message_id is None:
+            await self._flush()
+            return
+        delay = self.min_interval - (time.monotonic() - self._last_edit)
+        if delay <= 0:
+            await self._flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    async def finish(self, text: Optional[str] = None) -> None:
+        """Показывает финальный текст немедленно и отменяет отложенное обновление."""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        if text is not None:
+            self._pending_text = self._fit(text)
+        await self._flush()
+
+    async def _delayed_flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Отправляет или редактирует сообщение, если текст изменился."""
+        async with self._lock:
+            text = self._pending_text
+            if not text or text == self._shown_text:
+                return
+            try:
+                if self._message_id is None:
+                    message = await self.bot.send_message(self.chat_id, text)
+                    self._message_id = message.message_id
+                else:
+                    await self.bot.edit_message_text(
+                        text=text, chat_id=self.chat_id, message_id=self._message_id
+                    )
+                self._shown_text = text
+            except TelegramBadRequest as e:
+                # Например, "message is not modified" — не критично
+                logger.warning(f"Не удалось обновить сообщение прогресса: {e}")
+            finally:
+                self._last_edit = time.monotonic()
@@ -0,0 +1,133 @@
+# services/oauth_state.py
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.context import FSMContext
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+@dataclass
+class PendingLogin:
+    """
+    Начатая, но не завершённая авторизация пользователя.
+
+    Attributes:
+        user_id: Пользователь Telegram
+        state: Контекст FSM пользователя (в него записывается результат)
+        created_at: Время создания (time.monotonic)
+        expires_at: Время, после которого ссылка авторизации недействительна
+    """
+    user_id: int
+    state: FSMContext
+    created_at: float = field(default_factory=time.monotonic)
+    expires_at: float = 0.0
+
+
+class PendingLoginRegistry:
+    """
+    Реестр ожидающих авторизаций по параметру OAuth `state`.
+
+    Каждая ссылка авторизации получает случайный одноразовый токен state;
+    HH возвращает его в callback вместе с кодом, и по нему определяется,
+    какой пользователь завершил вход. Так одновременные авторизации разных
+    пользователей не смешиваются, а callback с чужим, повторным или
+    просроченным state отклоняется.
+
+    У пользователя одна активная ссылка: новая /auth отменяет предыдущую.
+    Записи живут ttl секунд; так как ttl у всех одинаковый, порядок
+    добавления совпадает с порядком истечения, и просроченные записи
+    удаляются с начала словаря за амортизированное O(1).
+
+    Реестр хранится в памяти процесса: callback должен прийти на тот же
+    экземпляр бота, который выдал ссылку (см. README, «Режим webhook»).
+    """
+
+    def __init__(self, ttl: float = 600.0, max_pending: int = 10000):
+        """
+        Инициализация.
+
+        Args:
+            ttl: Время жизни ссылки авторизации (сек)
+            max_pending: Максимум одновременно ожидающих авторизаций
+        """
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, PendingLogin]" = OrderedDict()
+        self._by_user: Dict[int, str] = {}
+        self.created = 0
+        self.completed = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def _remove(self, token: str) -> Optional[PendingLogin]:
+        login = self._pending.pop(token, None)
+        if login and self._by_user.get(login.user_id) == token:
+            del self._by_user[login.user_id]
+        return login
+
+    def prune(self) -> None:
+        """Удаляет просроченные записи."""
+        now = time.monotonic()
+        while self._pending:
+            token, login = next(iter(self._pending.items()))
+            if login.expires_at > now:
+                break
+            self._remove(token)
+            self.expired += 1
+
+    def create(self, user_id: int, state: FSMContext) -> str:
+        """
+        Регистрирует авторизацию пользователя и возвращает токен state для ссылки.
+
+        Args:
+            user_id: Пользователь Telegram
+            state: Контекст FSM пользователя
+        """
+        self.prune()
+        previous = self._by_user.get(user_id)
+        if previous:
+            self._remove(previous)
+        while len(self._pending) >= self.max_pending:
+            # Переполнение: вытесняем самые старые ссылки
+            self._remove(next(iter(self._pending)))
+            self.expired += 1
+
+        token = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        self._pending[token] = PendingLogin(user_id=user_id, state=state, created_at=now, expires_at=now + self.ttl)
+        self._by_user[user_id] = token
+        self.created += 1
+        return token
+
+    def pop(self, token: Optional[str]) -> Optional[PendingLogin]:
+        """
+        Извлекает авторизацию по токену state (токен одноразовый).
+
+        Returns:
+            Optional[PendingLogin]: Запись или None, если токен неизвестен, уже использован или просрочен
+        """
+        self.prune()
+        login = self._remove(token) if token else None
+        if login is None:
+            self.rejected += 1
+            logger.warning("Callback авторизации с неизвестным или просроченным state")
+            return None
+        self.completed += 1
+        return login
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "created": self.created,
+            "completed": self.completed,
+            "expired": self.expired,
+            "rejected": self.rejected,
+        }
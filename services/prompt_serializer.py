@@ -0,0 +1,232 @@
+# services/prompt_serializer.py
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from core.logger import setup_logger
+
+try:
+    import tiktoken
+except ImportError:  # подсчёт токенов будет приблизительным
+    tiktoken = None
+
+logger = setup_logger(__name__)
+
+# Разделы, которые передаются в промпты
+RESUME_SECTIONS = ("title", "skills", "skill_set", "experience", "professional_roles")
+VACANCY_SECTIONS = (
+    "description", "key_skills", "employment_form", "experience",
+    "schedule", "employment", "professional_roles"
+)
+
+# Сколько последних резюме и текстов разделов запоминать
+RESUME_MEMO_SIZE = 32
+TOKEN_MEMO_SIZE = 1024
+
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+# Ключи справочных значений HH, которые сворачиваются до name
+_REFERENCE_KEYS = frozenset({"id", "name"})
+
+class PromptSerializer:
+    """
+    Компактное детерминированное представление данных для промптов.
+
+    Вместо repr() словарей и pydantic-моделей (кавычки, None, имена классов)
+    данные выводятся в виде простого текста:
+      - пустые значения (None, "", [], {}) пропускаются;
+      - справочные значения HH ({"name": "Python"}, {"id": ..., "name": ...})
+        сворачиваются до name;
+      - списки строк выводятся через запятую;
+      - списки объектов — пронумерованными блоками [0], [1], ...;
+      - вложенные объекты — строками "ключ: значение" с отступом.
+
+    Для одинаковых входных данных результат всегда одинаков. Кроме того,
+    сериализатор считает токены по разделам, чтобы было видно, какая часть
+    промпта сколько стоит.
+
+    Одно и то же резюме попадает во многие промпты (GAP-анализ и рерайт,
+    пакетная обработка нескольких вакансий), поэтому его представление и
+    количество токенов в разделах запоминаются и не вычисляются повторно.
+    """
+
+    def __init__(self, model_name: Optional[str] = None):
+        """
+        Инициализация.
+
+        Args:
+            model_name: Модель OpenAI, для которой выбирается токенизатор
+        """
+        # id(resume) -> (resume, разделы); сам объект хранится, чтобы id не был переиспользован
+        self._rendered_resumes: "OrderedDict[int, Tuple[Dict[str, Any], Dict[str, str]]]" = OrderedDict()
+        self._token_counts: "OrderedDict[str, int]" = OrderedDict()
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = (
+                    tiktoken.encoding_for_model(model_name) if model_name
+                    else tiktoken.get_encoding("o200k_base")
+                )
+            except Exception as e:
+                try:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    logger.warning(f"Токенизатор недоступен ({e}), используется оценка по длине текста")
+
+    # -------------------------------------------------------------------------
+    # Подсчёт токенов
+    # -------------------------------------------------------------------------
+
+    def count_tokens(self, text: str) -> int:
+        """Количество токенов в тексте (точное при наличии tiktoken, иначе оценка)."""
+        if not text:
+            return 0
+        count = self._token_counts.get(text)
+        if count is not None:
+            self._token_counts.move_to_end(text)
+            return count
+        if self._encoding is not None:
+            count = len(self._encoding.encode(text))
+        else:
+            # Грубая оценка: ~4 символа на токен для латиницы, ~2.5 для кириллицы
+            cyrillic = sum(1 for c in text if "Ѐ" <= c <= "ӿ")
+            count = int(cyrillic / 2.5 + (len(text) - cyrillic) / 4) + 1
+        self._token_counts[text] = count
+        if len(self._token_counts) > TOKEN_MEMO_SIZE:
+            self._token_counts.popitem(last=False)
+        return count
+
+    def token_report(self, sections: Dict[str, str]) -> Dict[str, int]:
+        """Количество токенов по разделам."""
+        return {name: self.count_tokens(text) for name, text in sections.items()}
+
+    def log_token_report(self, stage: str, sections: Dict[str, str]) -> Dict[str, int]:
+        """Пишет в лог количество токенов по разделам промпта и возвращает его."""
+        report = self.token_report(sections)
+        details = ", ".join(f"{name}={count}" for name, count in report.items())
+        logger.info(f"Токены входных данных ({stage}): всего {sum(report.values())} [{details}]")
+        return report
+
+    # -------------------------------------------------------------------------
+    # Сериализация
+    # -------------------------------------------------------------------------
+
+    def render(self, value: Any) -> str:
+        """Компактное текстовое представление значения."""
+        return "\n".join(self._lines(self._simplify(value), 0))
+
+    def render_sections(self, data: Dict[str, Any], sections: Iterable[str]) -> Dict[str, str]:
+        """Рендерит перечисленные разделы словаря (пустые разделы дают пустую строку)."""
+        return {name: self.render(data.get(name)) for name in sections}
+
+    def render_resume(self, parsed_resume: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Разделы резюме, используемые в промптах.
+
+        Результат запоминается для объекта резюме: повторные промпты по тому же
+        (неизменяемому в пайплайне) словарю не рендерят его заново.
+        """
+        cached = self._rendered_resumes.get(id(parsed_resume))
+        if cached is not None and cached[0] is parsed_resume:
+            self._rendered_resumes.move_to_end(id(parsed_resume))
+            return dict(cached[1])
+        sections = self.render_sections(parsed_resume, RESUME_SECTIONS)
+        self._rendered_resumes[id(parsed_resume)] = (parsed_resume, sections)
+        if len(self._rendered_resumes) > RESUME_MEMO_SIZE:
+            self._rendered_resumes.popitem(last=False)
+        return dict(sections)
+
+    def render_vacancy(self, parsed_vacancy: Dict[str, Any]) -> Dict[str, str]:
+        """Разделы вакансии, используемые в промптах."""
+        return self.render_sections(parsed_vacancy, VACANCY_SECTIONS)
+
+    def render_recommendations(self, recommendations: Iterable[Any]) -> str:
+        """
+        Рекомендации GAP-анализа в виде:
+
+            experience[0] (update):
+            - шаг 1
+            - шаг 2
+        """
+        blocks: List[str] = []
+        for rec in recommendations:
+            details = "\n".join(f"- {self._clean_text(detail)}" for detail in rec.details if detail)
+            blocks.append(f"{rec.section} ({rec.recommendation_type}):\n{details}".rstrip())
+        return "\n".join(blocks)
+
+    @classmethod
+    def _simplify(cls, value: Any) -> Any:
+        """Приводит значение к простым типам и убирает пустое."""
+        if isinstance(value, BaseModel):
+            value = value.model_dump(exclude_none=True)
+        if isinstance(value, dict):
+            simplified = {}
+            for key, item in value.items():
+                # Справочные значения HH ({"id": ..., "name": ...}) — модели нужен только name
+                if key == "id" and "name" in value:
+                    continue
+                item = cls._simplify(item)
+                if item not in (None, "", [], {}):
+                    simplified[key] = item
+            # Справочник HH сворачивается до названия; прочие объекты сохраняют
+            # ключи, даже если заполнено одно поле (иначе теряются метки и индексы)
+            if set(value) <= _REFERENCE_KEYS and "name" in simplified:
+                return simplified["name"]
+            return simplified
+        if isinstance(value, (list, tuple)):
+            # Пустые объекты в списке сохраняем: индексы элементов (experience[i]) важны
+            items = [cls._simplify(item) for item in value]
+            return [item for item in items if item not in (None, "")]
+        if isinstance(value, str):
+            return cls._clean_text(value)
+        return value
+
+    @staticmethod
+    def _clean_text(text: str) -> str:
+        """Схлопывает повторяющиеся пробелы и пустые строки."""
+        text = _SPACES_RE.sub(" ", text)
+        text = _BLANK_LINES_RE.sub("\n", text)
+        return "\n".join(line.strip() for line in text.strip().splitlines())
+
+    @classmethod
+    def _lines(cls, value: Any, indent: int) -> List[str]:
+        """Строки представления значения с заданным отступом."""
+        pad = " " * indent
+        if isinstance(value, dict):
+            lines: List[str] = []
+            for key, item in value.items():
+                nested = isinstance(item, dict) or (isinstance(item, list) and not cls._is_flat_list(item))
+                multiline = isinstance(item, str) and "\n" in item
+                if nested or multiline:
+                    lines.append(f"{pad}{key}:")
+                    lines.extend(cls._lines(item, indent + 2))
+                else:
+                    lines.append(f"{pad}{key}: {cls._inline(item)}")
+            return lines
+        if isinstance(value, list):
+            if cls._is_flat_list(value):
+                return [pad + cls._inline(value)]
+            lines = []
+            for index, item in enumerate(value):
+                lines.append(f"{pad}[{index}]")
+                lines.extend(cls._lines(item, indent + 2))
+            return lines
+        if value is None:
+            return []
+        return [pad + line for line in str(cls._inline(value)).splitlines()]
+
+    @staticmethod
+    def _is_flat_list(value: Any) -> bool:
+        return isinstance(value, list) and all(
+            not isinstance(item, (dict, list)) and "\n" not in str(item) for item in value
+        )
+
+    @staticmethod
+    def _inline(value: Any) -> str:
+        if isinstance(value, list):
+            return ", ".join(str(item) for item in value)
+        if isinstance(value, bool):
+            return "yes" if value else "no"
+        return str(value)
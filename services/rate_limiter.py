@@ -0,0 +1,206 @@
+# services/rate_limiter.py
+import asyncio
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Deque, Dict, Hashable, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов «корзина токенов».
+
+    Корзина вмещает capacity токенов и пополняется со скоростью rate токенов
+    в секунду. Каждый запрос забирает токен; если корзина пуста, acquire()
+    ждёт пополнения. Ожидающие обслуживаются в порядке очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Инициализация.
+
+        Args:
+            rate: Скорость пополнения (запросов в секунду)
+            capacity: Ёмкость корзины (допустимый всплеск запросов)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.last_used = self._updated
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Забирает один токен, при необходимости дожидаясь его. Возвращает время ожидания."""
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+            self.last_used = time.monotonic()
+        return self.last_used - started
+
+
+class KeyedTokenBuckets:
+    """
+    Набор корзин токенов по ключу (например, по пользователю).
+
+    Корзины создаются при первом обращении; хранится не более max_keys
+    корзин, давно не использовавшиеся вытесняются (полная корзина ничем
+    не отличается от новой, поэтому вытеснение не ослабляет ограничение).
+    """
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    async def acquire(self, key: Hashable) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return await bucket.acquire()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RetryBudget:
+    """
+    Бюджет повторов.
+
+    Повторы разрешены, пока их доля от обычных запросов за последние
+    window секунд не превышает ratio (плюс min_retries повторов всегда).
+    При массовом отказе внешнего сервиса это не даёт повторам умножить
+    нагрузку на него.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Учитывает обычный (первый) запрос."""
+        self._requests.append(time.monotonic())
+
+    def try_retry(self) -> bool:
+        """Разрешает повтор, если бюджет не исчерпан, и учитывает его."""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            self.rejected += 1
+            return False
+        self._retries.append(now)
+        return True
+
+
+class CircuitState(Enum):
+    """Состояния предохранителя."""
+    CLOSED = "closed"          # запросы проходят
+    OPEN = "open"              # запросы сразу отклоняются
+    HALF_OPEN = "half_open"    # пропускается пробный запрос
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонён: предохранитель разомкнут после серии отказов внешнего сервиса."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Сервис временно недоступен, повторите через {retry_in:.0f} с")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Предохранитель (circuit breaker).
+
+    После failure_threshold отказов подряд размыкается на reset_timeout секунд:
+    запросы отклоняются сразу, не нагружая отказавший сервис и не заставляя
+    пользователей ждать таймаутов. Затем пропускается один пробный запрос;
+    при успехе предохранитель замыкается, при отказе — снова размыкается.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "external"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self) -> bool:
+        """
+        Проверяет, можно ли выполнить запрос.
+
+        Returns:
+            bool: True, если запрос пробный (его исход решает, замкнуть ли предохранитель)
+
+        Raises:
+            CircuitOpenError: Если предохранитель разомкнут
+        """
+        if self.state == CircuitState.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - elapsed)
+            self.state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.reset_timeout)
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"Предохранитель {self.name} замкнут: сервис снова отвечает")
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """
+        Освобождает пробный запрос, исход которого не записан (запрос отменён
+        или завершился непредвиденной ошибкой): следующий запрос станет новой пробой.
+        """
+        if self.state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                logger.warning(
+                    f"Предохранитель {self.name} разомкнут на {self.reset_timeout:.0f} с "
+                    f"после {self._failures} отказов подряд"
+                )
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state.value, "consecutive_failures": self._failures}
@@ -1,6 +1,6 @@
 # services/resume_updater.py
+import json
 from typing import Dict, Any, Optional
-import requests
 from core.logger import setup_logger
 from services.hh_api import HeadHunterAPI
 from models.resume_vacancy import ResumeInfo
@@ -24,75 +24,66 @@ class ResumeUpdaterService:
         """
         self.hh_api = hh_api
     
-    def _update_resume_fields(
-        self,
+    @staticmethod
+    def build_update_body(
         existing_resume: Dict[str, Any],
         rewritten_resume: ResumeInfo
     ) -> Dict[str, Any]:
         """
-        Обновляет поля существующего резюме данными из переписанного.
+        Строит минимальное тело PUT-запроса: только изменившиеся поля.
+        
+        HH принимает частичное обновление резюме, поэтому неизменённые поля
+        (контакты, образование, настройки видимости и т.д.) не передаются.
+        Массив experience при изменении хотя бы одной записи передаётся
+        целиком (HH заменяет массив полностью), но в записях меняются только
+        position и description. Исходный словарь не изменяется.
         
         Args:
-            existing_resume: Оригинальное резюме
+            existing_resume: Оригинальное резюме (ответ GET /resumes/{id})
             rewritten_resume: Переписанное резюме
             
         Returns:
-            Dict[str, Any]: Обновленное резюме
+            Dict[str, Any]: Поля для обновления (пустой словарь — изменений нет)
         """
-        # Конвертируем Pydantic модель в словарь
         rewritten_data = rewritten_resume.model_dump()
+        body: Dict[str, Any] = {}
         
-        # Обновляем основные поля
-        if rewritten_data.get("title"):
-            existing_resume["title"] = rewritten_data["title"]
-            
-        if rewritten_data.get("skills"):
-            existing_resume["skills"] = rewritten_data["skills"]
-            
-        if rewritten_data.get("skill_set"):
-            existing_resume["skill_set"] = rewritten_data["skill_set"]
+        # Основные поля: пустые значения не затирают исходные
+        for field in ("title", "skills", "skill_set"):
+            value = rewritten_data.get(field)
+            if value and value != existing_resume.get(field):
+                body[field] = value
         
-        # Обновляем опыт работы
-        if rewritten_data.get("experience"):
-            logger.info(f"Обновление опыта работы. Найдено {len(rewritten_data['experience'])} записей")
-            
-            # Проверяем совпадение количества записей
-            if len(rewritten_data["experience"]) != len(existing_resume["experience"]):
+        # Опыт работы: сравниваем position и description каждой записи
+        existing_experience = existing_resume.get("experience") or []
+        new_experience = rewritten_data.get("experience") or []
+        if new_experience:
+            if len(new_experience) != len(existing_experience):
                 logger.warning(
                     f"Количество записей опыта не совпадает: "
-                    f"rewritten={len(rewritten_data['experience'])}, "
-                    f"existing={len(existing_resume['experience'])}"
+                    f"rewritten={len(new_experience)}, "
+                    f"existing={len(existing_experience)}"
                 )
-                
-            # Обновляем только position и description для каждой записи
-            for i, new_exp in enumerate(rewritten_data["experience"]):
-                if i < len(existing_resume["experience"]):
-                    existing_resume["experience"][i]["position"] = new_exp["position"]
-                    existing_resume["experience"][i]["description"] = new_exp["description"]
-                    logger.debug(
-                        f"Обновлена запись {i}: "
-                        f"position={new_exp['position']}, "
-                        f"description={new_exp['description'][:50]}..."
-                    )
-        
-        # Обработка специальных полей
-        if "specialization" in existing_resume:
-            existing_resume.pop("specialization")
             
-        if "has_vehicle" in existing_resume:
-            existing_resume["has_vehicle"] = (
-                existing_resume["has_vehicle"] 
-                if existing_resume["has_vehicle"] is True 
-                else False
-            )
+            experience = [dict(entry) for entry in existing_experience]
+            changed = False
+            for i, new_exp in enumerate(new_experience[:len(experience)]):
+                for field in ("position", "description"):
+                    if new_exp.get(field) and new_exp[field] != experience[i].get(field):
+                        experience[i][field] = new_exp[field]
+                        changed = True
+                        logger.debug(f"Изменена запись опыта {i}: {field}")
+            if changed:
+                body["experience"] = experience
         
-        return existing_resume
+        return body
     
     async def update_resume(
         self,
         resume_id: str,
         existing_resume: Dict[str, Any],
-        rewritten_resume: ResumeInfo
+        rewritten_resume: ResumeInfo,
+        user_id: int
     ) -> Optional[Dict[str, Any]]:
         """
         Обновляет резюме на HeadHunter.
@@ -101,19 +92,33 @@ class ResumeUpdaterService:
             resume_id: Идентификатор резюме
             existing_resume: Оригинальное резюме
             rewritten_resume: Переписанное резюме
+            user_id: Пользователь Telegram, от имени которого выполняется запрос
             
         Returns:
             Optional[Dict[str, Any]]: Обновленное резюме или None в случае ошибки
         """
         try:
-            # Обновляем поля резюме
-            updated_resume = self._update_resume_fields(existing_resume, rewritten_resume)
+            # Передаём только изменившиеся поля; исходное резюме не изменяется
+            body = self.build_update_body(existing_resume, rewritten_resume)
+            updated_resume = {**existing_resume, **body}
+            
+            if not body:
+                logger.info(f"Резюме {resume_id} не изменилось, обновление не требуется")
+                return updated_resume
+            
+            full_size = len(json.dumps(existing_resume, ensure_ascii=False).encode("utf-8"))
+            body_size = len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            logger.info(
+                f"Обновление резюме {resume_id}: поля {sorted(body)}, "
+                f"{body_size} байт вместо {full_size}"
+            )
             
-            # Отправляем обновленное резюме через API
-            response = await self.hh_api.make_api_request(
+            # Отправляем изменения через API
+            await self.hh_api.make_api_request(
                 endpoint=f'/resumes/{resume_id}',
                 method='PUT',
-                data=updated_resume
+                data=body,
+                user_id=user_id
             )
             
             logger.info(f"Резюме {resume_id} успешно обновлено")
@@ -0,0 +1,266 @@
+# services/resume_validator.py
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from core.logger import setup_logger
+from models.resume import (
+    ExperienceUpdate,
+    ProfessionalRolesUpdate,
+    SkillSetUpdate,
+    SkillsUpdate,
+    TitleUpdate
+)
+from services.stream_parser import IncrementalResumeParser
+
+logger = setup_logger(__name__)
+
+# Модели скалярных разделов ResumeUpdate (каждый раздел можно переписать отдельно)
+SECTION_MODELS: Dict[str, Type[BaseModel]] = {
+    "title": TitleUpdate,
+    "skills": SkillsUpdate,
+    "skill_set": SkillSetUpdate,
+    "professional_roles": ProfessionalRolesUpdate,
+}
+
+EXPERIENCE_SECTION_RE = re.compile(r"^experience\s*\[\s*(\d+)\s*\]$")
+
+@dataclass
+class HHFieldLimits:
+    """Ограничения HH API на длину полей резюме, которые переписывает LLM."""
+    title: int = 100
+    skills: int = 10000
+    skill: int = 100
+    skill_set_items: int = 100
+    position: int = 100
+    description: int = 4096
+
+@dataclass
+class OutputIssue:
+    """
+    Проблема в ответе модели.
+
+    Attributes:
+        section: Раздел ResumeUpdate (title, skills, ..., experience[i])
+        reason: Описание проблемы (передаётся модели при повторном запросе)
+    """
+    section: str
+    reason: str
+
+@dataclass
+class ValidationReport:
+    """
+    Результат проверки ответа модели.
+
+    Attributes:
+        data: Данные ResumeUpdate; некорректные разделы равны None
+        issues: Найденные проблемы
+    """
+    data: Dict[str, Any]
+    issues: List[OutputIssue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+class ResumeOutputValidator:
+    """
+    Локальная проверка ответа финального рерайта.
+
+    Сверяет ответ модели с исходным резюме: количество записей опыта,
+    непустые описания и должности, ограничения HH на длину полей.
+    Ответ разбирается по разделам, поэтому одна испорченная запись
+    не обесценивает остальные — повторно запрашивать нужно только её.
+    Простые дефекты (лишние записи опыта, пустые и повторяющиеся навыки)
+    исправляются на месте без обращения к модели.
+    """
+
+    def __init__(self, limits: Optional[HHFieldLimits] = None):
+        """
+        Инициализация.
+
+        Args:
+            limits: Ограничения на длину полей (по умолчанию — ограничения HH)
+        """
+        self.limits = limits or HHFieldLimits()
+
+    @staticmethod
+    def salvage(raw_text: str) -> Dict[str, Any]:
+        """
+        Разбирает текст ответа модели в dict.
+
+        Если JSON повреждён (например, ответ обрезан по лимиту токенов),
+        извлекает все полностью сформированные разделы и записи опыта.
+        """
+        try:
+            data = json.loads(raw_text)
+            if isinstance(data, dict):
+                return data
+        except (TypeError, json.JSONDecodeError):
+            pass
+
+        data: Dict[str, Any] = {}
+        experience: Dict[int, Any] = {}
+        for event in IncrementalResumeParser().feed(raw_text or ""):
+            if event.section == "experience" and event.index is not None:
+                experience[event.index] = event.value
+            else:
+                data[event.section] = event.value
+        if experience and not isinstance(data.get("experience"), list):
+            data["experience"] = [experience.get(i) for i in range(max(experience) + 1)]
+        logger.warning(f"Ответ модели не является корректным JSON, восстановлены разделы: {sorted(data)}")
+        return data
+
+    @staticmethod
+    def original_piece(section: str, parsed_resume: dict) -> Any:
+        """Значение раздела (или записи experience[i]) в исходном резюме."""
+        match = EXPERIENCE_SECTION_RE.match(section)
+        if match:
+            exp = (parsed_resume.get("experience") or [])[int(match.group(1))]
+            return {"description": exp.get("description", ""), "position": exp.get("position", "")}
+        default = "" if section in ("title", "skills") else []
+        return parsed_resume.get(section, default)
+
+    @staticmethod
+    def piece_model(section: str) -> Type[BaseModel]:
+        """Модель ответа для раздела (или записи experience[i])."""
+        if EXPERIENCE_SECTION_RE.match(section):
+            return ExperienceUpdate
+        return SECTION_MODELS[section]
+
+    def check_piece(self, section: str, value: Any, original: Any = None) -> Tuple[Any, Optional[str]]:
+        """
+        Проверяет и нормализует один раздел.
+
+        Args:
+            section: Раздел ResumeUpdate или experience[i]
+            value: Значение раздела из ответа модели
+            original: Значение раздела в исходном резюме; если оно пустое,
+                пустой ответ модели не считается ошибкой
+
+        Returns:
+            Нормализованное значение и описание проблемы (None, если всё в порядке)
+        """
+        if value is None:
+            return None, "раздел отсутствует в ответе"
+
+        limits = self.limits
+        if EXPERIENCE_SECTION_RE.match(section):
+            try:
+                entry = ExperienceUpdate.model_validate(value).model_dump()
+            except ValidationError as ve:
+                return None, f"запись не соответствует схеме ({ve.error_count()} ошибок)"
+            entry["description"] = entry["description"].strip()
+            entry["position"] = entry["position"].strip()
+            if not entry["description"]:
+                return None, "пустое описание опыта (description)"
+            if not entry["position"]:
+                return None, "пустая должность (position)"
+            if len(entry["description"]) > limits.description:
+                return None, f"description длиннее {limits.description} символов"
+            if len(entry["position"]) > limits.position:
+                return None, f"position длиннее {limits.position} символов"
+            return entry, None
+
+        try:
+            piece = SECTION_MODELS[section].model_validate({section: value}).model_dump()[section]
+        except ValidationError as ve:
+            return None, f"раздел не соответствует схеме ({ve.error_count()} ошибок)"
+        # Раздел, пустой в исходном резюме, модели заполнять не из чего
+        required = original is None or bool(original)
+
+        if section == "title":
+            piece = piece.strip()
+            if required and not piece:
+                return None, "пустая желаемая должность"
+            if len(piece) > limits.title:
+                return None, f"title длиннее {limits.title} символов"
+        elif section == "skills":
+            piece = piece.strip()
+            if required and not piece:
+                return None, "пустое описание навыков"
+            if len(piece) > limits.skills:
+                return None, f"skills длиннее {limits.skills} символов"
+        elif section == "skill_set":
+            # Пустые и повторяющиеся навыки убираем сами, без повторного запроса
+            unique: Dict[str, str] = {}
+            for skill in piece:
+                skill = skill.strip()
+                if skill and skill.lower() not in unique:
+                    unique[skill.lower()] = skill
+            piece = list(unique.values())
+            if required and not piece:
+                return None, "пустой список ключевых навыков"
+            if len(piece) > limits.skill_set_items:
+                return None, f"больше {limits.skill_set_items} ключевых навыков"
+            too_long = [skill for skill in piece if len(skill) > limits.skill]
+            if too_long:
+                return None, f"навыки длиннее {limits.skill} символов: {too_long}"
+        elif section == "professional_roles":
+            if required and not piece:
+                return None, "пустой список профессиональных ролей"
+        return piece, None
+
+    def check(self, candidate: Dict[str, Any], parsed_resume: dict) -> ValidationReport:
+        """
+        Проверяет ответ модели целиком.
+
+        Args:
+            candidate: Ответ модели (dict, возможно неполный)
+            parsed_resume: Исходное резюме
+
+        Returns:
+            ValidationReport: Корректные разделы и список проблем
+        """
+        report = ValidationReport(data={})
+        for section in SECTION_MODELS:
+            piece, reason = self.check_piece(
+                section, candidate.get(section), self.original_piece(section, parsed_resume)
+            )
+            report.data[section] = piece
+            if reason:
+                report.issues.append(OutputIssue(section, reason))
+
+        expected = len(parsed_resume.get("experience") or [])
+        received = candidate.get("experience")
+        if not isinstance(received, list):
+            received = []
+        if len(received) != expected:
+            logger.warning(
+                f"Количество записей опыта не совпадает: получено {len(received)}, ожидалось {expected}"
+            )
+
+        experience: List[Any] = []
+        for index in range(expected):
+            section = f"experience[{index}]"
+            value = received[index] if index < len(received) else None
+            entry, reason = self.check_piece(section, value)
+            experience.append(entry)
+            if reason:
+                report.issues.append(OutputIssue(section, reason))
+        report.data["experience"] = experience
+        return report
+
+    def fallback_piece(self, section: str, parsed_resume: dict) -> Any:
+        """
+        Значение раздела, если модель так и не вернула корректный ответ:
+        исходное значение, обрезанное до ограничений HH.
+        """
+        value = self.original_piece(section, parsed_resume)
+        limits = self.limits
+        if EXPERIENCE_SECTION_RE.match(section):
+            return {
+                "description": value["description"][:limits.description],
+                "position": value["position"][:limits.position]
+            }
+        if section == "title":
+            return value[:limits.title]
+        if section == "skills":
+            return value[:limits.skills]
+        if section == "skill_set":
+            return [skill[:limits.skill] for skill in value][:limits.skill_set_items]
+        return value
@@ -0,0 +1,310 @@
+# services/run_archive.py
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class RunArchive:
+    """
+    Архив прогонов пайплайна рерайта в сжатых JSONL-сегментах.
+
+    Обработчик вызывает archive(record) — запись только кладётся в очередь,
+    а фоновая задача пачками передаёт записи в поток, где они сериализуются,
+    сжимаются и дописываются в текущий сегмент. Event loop не ждёт диска;
+    если очередь переполнена, запись отбрасывается (архив не должен тормозить
+    пользователей).
+
+    Каждая запись — отдельный gzip-член: сегмент целиком читается как обычный
+    .jsonl.gz, а по смещению из индекса одну запись можно прочитать, не
+    распаковывая весь сегмент. Сегмент закрывается при превышении
+    segment_max_bytes или при смене суток (UTC). Индекс (SQLite) хранит
+    run_id, resume_id, vacancy_id, дату и положение записи. Сегменты старше
+    retention_days удаляются вместе с их записями в индексе.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        retention_days: float = 30.0,
+        max_queue: int = 1000,
+        batch_size: int = 50,
+        compress_level: int = 6
+    ):
+        """
+        Инициализация архива.
+
+        Args:
+            root_dir: Каталог сегментов и индекса
+            segment_max_bytes: Размер, после которого открывается новый сегмент
+            retention_days: Срок хранения сегментов (в днях)
+            max_queue: Максимум записей, ожидающих записи на диск
+            batch_size: Максимум записей, записываемых за один проход
+            compress_level: Уровень сжатия gzip (1-9)
+        """
+        self.root_dir = root_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.compress_level = compress_level
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self._writer_task: Optional[asyncio.Task] = None
+        self._segment: Optional[str] = None
+        self._segment_day: Optional[str] = None
+        self._segment_size = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.bytes_written = 0
+
+        os.makedirs(root_dir, exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root_dir, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, "
+            "created_at REAL NOT NULL, "
+            "day TEXT NOT NULL, "
+            "resume_id TEXT, "
+            "vacancy_id TEXT, "
+            "segment TEXT NOT NULL, "
+            "offset INTEGER NOT NULL, "
+            "length INTEGER NOT NULL)"
+        )
+        for column in ("resume_id", "vacancy_id", "day", "segment"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_{column} ON runs ({column})")
+        self._conn.commit()
+
+    # -------------------------------------------------------------------------
+    # Приём записей (event loop)
+    # -------------------------------------------------------------------------
+
+    def archive(self, record: Dict[str, Any]) -> bool:
+        """
+        Ставит запись прогона в очередь на запись (не блокирует).
+
+        Args:
+            record: JSON-сериализуемый словарь; поля resume_id и vacancy_id
+                попадают в индекс, run_id и created_at добавляются, если их нет
+
+        Returns:
+            bool: False, если очередь переполнена и запись отброшена
+        """
+        self._ensure_writer()
+        record = {"run_id": uuid.uuid4().hex, "created_at": time.time(), **record}
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Очередь архива переполнена, запись {record['run_id']} отброшена")
+            return False
+
+    def _ensure_writer(self) -> None:
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer())
+
+    async def start(self) -> None:
+        """Запускает фоновую запись и удаляет устаревшие сегменты."""
+        self._ensure_writer()
+        await self.prune()
+
+    async def stop(self) -> None:
+        """Дописывает очередь на диск и останавливает фоновую запись."""
+        if self._writer_task is None:
+            return
+        await self._queue.join()
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_task = None
+        await asyncio.to_thread(self._close_sync)
+        logger.info(f"Архив прогонов остановлен: записано {self.written}, отброшено {self.dropped}")
+
+    async def _writer(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Ошибка записи {len(batch)} записей в архив: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    # -------------------------------------------------------------------------
+    # Запись (поток)
+    # -------------------------------------------------------------------------
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+
+    def _current_segment(self, day: str) -> str:
+        """Текущий сегмент; новый открывается при смене суток или превышении размера."""
+        if self._segment is None or self._segment_day != day or self._segment_size >= self.segment_max_bytes:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+            self._segment = f"runs-{stamp}-{uuid.uuid4().hex[:6]}.jsonl.gz"
+            self._segment_day = day
+            self._segment_size = 0
+            logger.info(f"Архив прогонов: новый сегмент {self._segment}")
+            # Ротация — подходящий момент применить политику хранения
+            removed = self._prune_sync()
+            if removed:
+                logger.info(f"Архив прогонов: удалено устаревших сегментов: {removed}")
+        return self._segment
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        rows = []
+        for record in records:
+            day = datetime.fromtimestamp(record["created_at"], timezone.utc).strftime("%Y-%m-%d")
+            segment = self._current_segment(day)
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            member = gzip.compress(line.encode("utf-8"), self.compress_level)
+            with open(self._segment_path(segment), "ab") as f:
+                offset = f.tell()
+                f.write(member)
+            self._segment_size += len(member)
+            self.bytes_written += len(member)
+            rows.append((
+                record["run_id"], record["created_at"], day,
+                self._index_value(record.get("resume_id")),
+                self._index_value(record.get("vacancy_id")),
+                segment, offset, len(member)
+            ))
+        with self._db_lock:
+            self._conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        self.written += len(rows)
+
+    @staticmethod
+    def _index_value(value: Any) -> Optional[str]:
+        return None if value is None else str(value)
+
+    def _close_sync(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+    # -------------------------------------------------------------------------
+    # Чтение
+    # -------------------------------------------------------------------------
+
+    def _read_member(self, segment: str, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)).decode("utf-8"))
+
+    def _find_sync(
+        self,
+        resume_id: Optional[str],
+        vacancy_id: Optional[str],
+        day: Optional[str],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        conditions, params = [], []
+        for column, value in (("resume_id", resume_id), ("vacancy_id", vacancy_id), ("day", day)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(str(value))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT segment, offset, length FROM runs {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        records = []
+        for segment, offset, length in rows:
+            try:
+                records.append(self._read_member(segment, offset, length))
+            except (OSError, ValueError) as e:
+                logger.error(f"Не удалось прочитать запись архива из {segment}: {e}")
+        return records
+
+    async def find(
+        self,
+        resume_id: Optional[str] = None,
+        vacancy_id: Optional[str] = None,
+        day: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Находит записи по индексу (новые первыми).
+
+        Args:
+            resume_id: Идентификатор резюме
+            vacancy_id: Идентификатор вакансии
+            day: Дата в формате YYYY-MM-DD (UTC)
+            limit: Максимум записей
+        """
+        return await asyncio.to_thread(self._find_sync, resume_id, vacancy_id, day, limit)
+
+    def segments(self) -> List[str]:
+        """Пути сегментов архива в порядке создания."""
+        return [
+            self._segment_path(name) for name in sorted(os.listdir(self.root_dir))
+            if name.startswith("runs-") and name.endswith(".jsonl.gz")
+        ]
+
+    @staticmethod
+    def iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+        """Последовательно читает записи сегмента (оборванная запись в конце пропускается)."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+        except (EOFError, OSError, ValueError) as e:
+            logger.warning(f"Сегмент {path} прочитан не полностью: {e}")
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Все записи архива в порядке записи (синхронно, для офлайн-инструментов)."""
+        for path in self.segments():
+            yield from self.iter_segment(path)
+
+    # -------------------------------------------------------------------------
+    # Хранение
+    # -------------------------------------------------------------------------
+
+    def _prune_sync(self) -> int:
+        border = time.time() - self.retention_days * 24 * 3600
+        removed = 0
+        for path in self.segments():
+            name = os.path.basename(path)
+            if name == self._segment or os.path.getmtime(path) >= border:
+                continue
+            with self._db_lock:
+                self._conn.execute("DELETE FROM runs WHERE segment = ?", (name,))
+                self._conn.commit()
+            os.remove(path)
+            removed += 1
+        return removed
+
+    async def prune(self) -> int:
+        """Удаляет сегменты старше retention_days вместе с их записями в индексе."""
+        removed = await asyncio.to_thread(self._prune_sync)
+        if removed:
+            logger.info(f"Архив прогонов: удалено устаревших сегментов: {removed}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "bytes_written": self.bytes_written,
+            "segment": self._segment,
+        }
@@ -0,0 +1,151 @@
+# services/stream_parser.py
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+@dataclass
+class StreamEvent:
+    """
+    Готовый фрагмент ответа модели.
+
+    Attributes:
+        section: Имя поля верхнего уровня ResumeUpdate (title, skills, experience, ...)
+        index: Индекс элемента для отдельных записей experience, иначе None
+        value: Разобранное JSON-значение
+    """
+    section: str
+    index: Optional[int]
+    value: Any
+
+
+class IncrementalResumeParser:
+    """
+    Инкрементальный парсер JSON-ответа по схеме ResumeUpdate.
+
+    Получает текст ответа модели кусками по мере генерации и возвращает
+    события, как только очередное поле верхнего уровня полностью сформировано.
+    Элементы массива `experience` выдаются по одному, не дожидаясь конца массива.
+    Парсер не строит дерево: он отслеживает только вложенность и строки,
+    а готовые фрагменты разбирает стандартным json.loads.
+    """
+
+    def __init__(self, item_sections: tuple = ("experience",)):
+        """
+        Инициализация парсера.
+
+        Args:
+            item_sections: Поля-массивы, элементы которых выдаются по одному
+        """
+        self.item_sections = item_sections
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._expecting_key = False
+        self._key_start: Optional[int] = None
+        self._current_key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """
+        Обрабатывает очередной кусок ответа.
+
+        Args:
+            chunk: Новый фрагмент текста
+
+        Returns:
+            List[StreamEvent]: События, ставшие доступными после этого фрагмента
+        """
+        self._text += chunk
+        events: List[StreamEvent] = []
+        text = self._text
+        while self._pos < len(text):
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if depth == 1 and self._expecting_key and self._key_start is not None:
+                        self._current_key = json.loads(text[self._key_start:i + 1])
+                        self._key_start = None
+                    elif depth == 1 and self._value_start is not None:
+                        self._emit(events, self._current_key, None, text[self._value_start:i + 1])
+                        self._value_start = None
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1:
+                    if self._expecting_key:
+                        self._key_start = i
+                    else:
+                        self._value_start = i
+                continue
+
+            if c in "{[":
+                self._stack.append(c)
+                if depth == 0:
+                    self._expecting_key = True
+                elif depth == 1:
+                    self._value_start = i
+                    self._item_index = 0
+                elif depth == 2 and self._stack[1] == "[" and self._current_key in self.item_sections:
+                    self._item_start = i
+                continue
+
+            if c in "}]":
+                if depth == 1 and self._value_start is not None:
+                    # Примитив (число, true/false/null) перед закрывающей скобкой объекта
+                    self._emit(events, self._current_key, None, text[self._value_start:i].strip())
+                    self._value_start = None
+                self._stack.pop()
+                depth -= 1
+                if depth == 2 and self._item_start is not None:
+                    self._emit(events, self._current_key, self._item_index, text[self._item_start:i + 1])
+                    self._item_start = None
+                    self._item_index += 1
+                elif depth == 1 and self._value_start is not None:
+                    self._emit(events, self._current_key, None, text[self._value_start:i + 1])
+                    self._value_start = None
+                continue
+
+            if depth == 1:
+                if c == ":":
+                    self._expecting_key = False
+                elif c == ",":
+                    if self._value_start is not None:
+                        self._emit(events, self._current_key, None, text[self._value_start:i].strip())
+                        self._value_start = None
+                    self._expecting_key = True
+                elif not c.isspace() and not self._expecting_key and self._value_start is None:
+                    self._value_start = i
+        return events
+
+    @property
+    def text(self) -> str:
+        """Весь полученный на данный момент текст ответа."""
+        return self._text
+
+    @staticmethod
+    def _emit(events: List[StreamEvent], section: Optional[str], index: Optional[int], raw: str) -> None:
+        """Разбирает готовый фрагмент и добавляет событие."""
+        if section is None:
+            return
+        try:
+            events.append(StreamEvent(section=section, index=index, value=json.loads(raw)))
+        except json.JSONDecodeError as e:
+            logger.warning(f"Не удалось разобрать фрагмент поля {section}: {e}")
@@ -0,0 +1,101 @@
+# services/token_refresher.py
+import asyncio
+import time
+from typing import Optional
+
+from core.logger import setup_logger
+from services.hh_api import HeadHunterAPI
+
+logger = setup_logger(__name__)
+
+class TokenRefreshScheduler:
+    """
+    Фоновое упреждающее обновление токенов HeadHunter.
+    
+    Периодически находит в хранилище токены, которые истекут в ближайшие
+    `margin` секунд, и обновляет их заранее. Благодаря этому запросы
+    пользователей почти никогда не получают 401 и не тратят лишний round trip.
+    Обновление идёт через HeadHunterAPI.refresh_access_token, поэтому
+    не конфликтует с обновлениями, начатыми самими запросами. Неудачное
+    упреждающее обновление токены не удаляет: оно повторится на следующем
+    проходе или при ответе 401 на запрос пользователя.
+    """
+
+    def __init__(
+        self,
+        hh_api: HeadHunterAPI,
+        margin: float = 300.0,
+        interval: float = 60.0,
+        max_concurrency: int = 5
+    ):
+        """
+        Инициализация планировщика.
+        
+        Args:
+            hh_api: Клиент API HeadHunter
+            margin: За сколько секунд до истечения обновлять токен
+            interval: Период проверки хранилища в секундах
+            max_concurrency: Максимум одновременных обновлений
+        """
+        self.hh_api = hh_api
+        self.margin = margin
+        self.interval = interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Запускает фоновый цикл обновления."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Планировщик обновления токенов запущен "
+                f"(margin={self.margin}s, interval={self.interval}s)"
+            )
+
+    async def stop(self) -> None:
+        """Останавливает фоновый цикл."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Планировщик обновления токенов остановлен")
+
+    async def _run(self) -> None:
+        """Основной цикл: проверка хранилища раз в `interval` секунд."""
+        while True:
+            try:
+                await self.refresh_expiring()
+            except Exception as e:
+                logger.error(f"Ошибка в планировщике обновления токенов: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh_expiring(self) -> int:
+        """
+        Обновляет все токены, истекающие в пределах `margin`.
+        
+        Returns:
+            int: Количество успешно обновлённых пользователей
+        """
+        user_ids = await self.hh_api.token_vault.list_expiring(time.time() + self.margin)
+        if not user_ids:
+            return 0
+
+        logger.info(f"Упреждающее обновление токенов для {len(user_ids)} пользователей")
+        results = await asyncio.gather(*(self._refresh_one(user_id) for user_id in user_ids))
+        return sum(results)
+
+    async def _refresh_one(self, user_id: int) -> bool:
+        """Обновляет токены одного пользователя, не пробрасывая ошибки."""
+        async with self._semaphore:
+            try:
+                await self.hh_api.refresh_access_token(user_id, proactive=True)
+                return True
+            except Exception as e:
+                logger.warning(
+                    f"Не удалось заранее обновить токен пользователя {user_id}, "
+                    f"повтор на следующем проходе: {e}"
+                )
+                return False
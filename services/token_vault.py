@@ -0,0 +1,148 @@
+# services/token_vault.py
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from core.logger import setup_logger
+from models.tokens import HHTokens
+
+logger = setup_logger(__name__)
+
+class TokenVault:
+    """
+    Хранилище OAuth-токенов HeadHunter, разделённое по пользователям Telegram.
+    
+    Состоит из двух уровней:
+      1) LRU-кэш в памяти для горячих пользователей;
+      2) SQLite-база на диске, переживающая перезапуск бота.
+    Обращения к SQLite выполняются в отдельном потоке, чтобы не блокировать
+    event loop, а изменения кэша защищены asyncio.Lock.
+    """
+
+    def __init__(self, db_path: str = ":memory:", cache_size: int = 1024):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            db_path: Путь к файлу SQLite (":memory:" — только в памяти процесса)
+            cache_size: Максимальное количество пользователей в LRU-кэше
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, HHTokens]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._db_lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "user_id INTEGER PRIMARY KEY, "
+            "access_token TEXT NOT NULL, "
+            "refresh_token TEXT NOT NULL, "
+            "expires_at REAL)"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Синхронные операции с базой (выполняются в отдельном потоке)
+    # ------------------------------------------------------------------
+
+    def _db_get(self, user_id: int) -> Optional[HHTokens]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT access_token, refresh_token, expires_at FROM tokens WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return HHTokens(access_token=row[0], refresh_token=row[1], expires_at=row[2])
+
+    def _db_set(self, user_id: int, tokens: HHTokens) -> None:
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tokens (user_id, access_token, refresh_token, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, tokens.access_token, tokens.refresh_token, tokens.expires_at)
+            )
+            self._conn.commit()
+
+    def _db_list_expiring(self, before: float) -> List[int]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT user_id FROM tokens WHERE expires_at IS NOT NULL AND expires_at <= ? "
+                "ORDER BY expires_at",
+                (before,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _db_delete(self, user_id: int) -> None:
+        with self._db_lock:
+            self._conn.execute("DELETE FROM tokens WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Асинхронный интерфейс
+    # ------------------------------------------------------------------
+
+    def _remember(self, user_id: int, tokens: HHTokens) -> None:
+        """Кладёт токены в LRU-кэш, вытесняя самые старые записи."""
+        self._cache[user_id] = tokens
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def get(self, user_id: int) -> Optional[HHTokens]:
+        """
+        Возвращает токены пользователя.
+        
+        Args:
+            user_id: Идентификатор пользователя Telegram
+            
+        Returns:
+            Optional[HHTokens]: Токены или None, если пользователь не авторизован
+        """
+        async with self._lock:
+            tokens = self._cache.get(user_id)
+            if tokens is not None:
+                self._cache.move_to_end(user_id)
+                return tokens
+        tokens = await asyncio.to_thread(self._db_get, user_id)
+        if tokens is not None:
+            async with self._lock:
+                # Не перетираем токены, записанные параллельным set() во время чтения
+                if user_id in self._cache:
+                    return self._cache[user_id]
+                self._remember(user_id, tokens)
+        return tokens
+
+    async def set(self, user_id: int, tokens: HHTokens) -> None:
+        """Сохраняет токены пользователя в кэш и на диск."""
+        async with self._lock:
+            self._remember(user_id, tokens)
+        await asyncio.to_thread(self._db_set, user_id, tokens)
+        logger.info(f"Токены пользователя {user_id} сохранены")
+
+    async def delete(self, user_id: int) -> None:
+        """Удаляет токены пользователя (например, после неудачного обновления)."""
+        async with self._lock:
+            self._cache.pop(user_id, None)
+        await asyncio.to_thread(self._db_delete, user_id)
+        logger.info(f"Токены пользователя {user_id} удалены")
+
+    async def list_expiring(self, before: float) -> List[int]:
+        """
+        Возвращает пользователей, чьи access_token истекают не позже указанного момента.
+        
+        Args:
+            before: Граница по времени (unix time)
+        """
+        return await asyncio.to_thread(self._db_list_expiring, before)
+
+    async def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,149 @@
+# services/vacancy_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from core.logger import setup_logger
+from models.vacancy import VacancyInfo
+from services.entity_extractor import EntityExtractor
+from services.hh_api import HeadHunterAPI
+
+logger = setup_logger(__name__)
+
+@dataclass
+class CachedVacancy:
+    """Запись кэша: сырые данные вакансии, результат парсинга и валидаторы HTTP."""
+    vacancy_id: str
+    raw: Dict[str, Any]
+    parsed: VacancyInfo
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+
+class VacancyCache:
+    """
+    Общий для всего процесса кэш вакансий HeadHunter.
+    
+    Хранит и сырой ответ `GET /vacancies/{id}`, и уже разобранный VacancyInfo,
+    поэтому попадание в кэш пропускает и сетевой запрос, и парсинг.
+    Одновременные промахи по одной вакансии объединяются в одну загрузку.
+    Записи вытесняются по размеру (LRU) и устаревают по TTL. Устаревшая запись
+    с ETag/Last-Modified перепроверяется условным запросом: при 304 данные
+    и результат парсинга переиспользуются без повторной загрузки.
+    """
+
+    def __init__(
+        self,
+        hh_api: HeadHunterAPI,
+        entity_extractor: Optional[EntityExtractor] = None,
+        max_size: int = 512,
+        ttl: float = 600.0
+    ):
+        """
+        Инициализация кэша.
+        
+        Args:
+            hh_api: Клиент API HeadHunter
+            entity_extractor: Парсер вакансий
+            max_size: Максимальное количество вакансий в кэше
+            ttl: Время жизни записи в секундах
+        """
+        self.hh_api = hh_api
+        self.entity_extractor = entity_extractor or EntityExtractor()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedVacancy]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._fetch_tasks: Dict[str, "asyncio.Task[Optional[CachedVacancy]]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики кэша для мониторинга."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions
+        }
+
+    async def get(self, vacancy_id: str, user_id: int) -> Optional[CachedVacancy]:
+        """
+        Возвращает вакансию из кэша или загружает её из API.
+        
+        Args:
+            vacancy_id: Идентификатор вакансии
+            user_id: Пользователь Telegram, от имени которого выполняется запрос
+            
+        Returns:
+            Optional[CachedVacancy]: Запись кэша или None, если вакансию не удалось разобрать
+        """
+        async with self._lock:
+            entry = self._entries.get(vacancy_id)
+            if entry is not None:
+                self._entries.move_to_end(vacancy_id)
+
+        now = time.time()
+        if entry is not None and entry.expires_at > now:
+            self.hits += 1
+            logger.info(f"Вакансия {vacancy_id} взята из кэша")
+            return entry
+
+        task = self._fetch_tasks.get(vacancy_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(vacancy_id, user_id, entry))
+            self._fetch_tasks[vacancy_id] = task
+            task.add_done_callback(lambda t: self._fetch_tasks.pop(vacancy_id, None))
+        # shield: отмена одного из ожидающих не должна прерывать общую загрузку
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        vacancy_id: str,
+        user_id: int,
+        entry: Optional[CachedVacancy]
+    ) -> Optional[CachedVacancy]:
+        """Загружает (или перепроверяет) вакансию и сохраняет её в кэш (через get)."""
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = await self.hh_api.request(
+            f'/vacancies/{vacancy_id}', user_id=user_id, headers=headers or None
+        )
+
+        if response.status == 304 and entry is not None:
+            self.revalidations += 1
+            entry.expires_at = time.time() + self.ttl
+            logger.info(f"Вакансия {vacancy_id} не изменилась (304), запись кэша продлена")
+            return entry
+
+        self.misses += 1
+        parsed = self.entity_extractor.extract_vacancy_info(response.data)
+        if not parsed:
+            return None
+
+        new_entry = CachedVacancy(
+            vacancy_id=vacancy_id,
+            raw=response.data,
+            parsed=parsed,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            expires_at=time.time() + self.ttl
+        )
+        async with self._lock:
+            self._entries[vacancy_id] = new_entry
+            self._entries.move_to_end(vacancy_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return new_entry
@@ -0,0 +1,69 @@
+# standins/__main__.py
+"""
+Запуск локальных заглушек hh.ru, OAuth и OpenAI для нагрузочных тестов.
+
+    python -m standins --port 9100 \\
+        --hh-latency lognormal:0.15,0.4 --hh-error-rate 0.01 --hh-429-rate 0.02 \\
+        --openai-latency lognormal:3,0.5 --openai-429-rate 0.02 --openai-max-in-flight 64
+
+Распределения задержки: fixed:S, uniform:A,B, lognormal:MEDIAN,SIGMA, exp:MEAN (секунды).
+После запуска выводятся переменные окружения, которые нужно задать боту.
+"""
+import argparse
+import asyncio
+import random
+
+from standins.faults import FaultProfile, LatencyModel
+from standins.server import StandinServer
+
+
+def fault_profile(args: argparse.Namespace, prefix: str, rng: random.Random) -> FaultProfile:
+    return FaultProfile(
+        latency=LatencyModel.parse(getattr(args, f"{prefix}_latency"), rng),
+        error_rate=getattr(args, f"{prefix}_error_rate"),
+        rate_limit_rate=getattr(args, f"{prefix}_429_rate"),
+        retry_after=getattr(args, f"{prefix}_retry_after"),
+        max_in_flight=getattr(args, f"{prefix}_max_in_flight"),
+        rng=rng
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seed", type=int, default=0, help="Зерно генератора задержек и ошибок")
+    parser.add_argument("--experience", type=int, default=3, help="Записей опыта в синтетических резюме")
+    parser.add_argument("--long-words", type=int, default=80, help="Длина длинных полей ответа модели (слов)")
+    for prefix, latency in (("hh", "fixed:0.05"), ("openai", "lognormal:2,0.5")):
+        parser.add_argument(f"--{prefix}-latency", default=latency)
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-429-rate", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-retry-after", type=float, default=1.0)
+        parser.add_argument(f"--{prefix}-max-in-flight", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    server = StandinServer(
+        host=args.host,
+        port=args.port,
+        hh_faults=fault_profile(args, "hh", rng),
+        openai_faults=fault_profile(args, "openai", rng),
+        experience=args.experience,
+        long_words=args.long_words
+    )
+    await server.start()
+    print("Заглушки запущены. Переменные окружения для бота:")
+    for name, value in server.env().items():
+        print(f"{name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
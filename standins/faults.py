@@ -0,0 +1,111 @@
+# standins/faults.py
+import asyncio
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+class LatencyModel:
+    """
+    Распределение задержки ответа заглушки.
+
+    Задаётся строкой "<вид>:<параметры>" (секунды):
+      - fixed:0.2             — постоянная задержка;
+      - uniform:0.1,0.5       — равномерная от a до b;
+      - lognormal:0.8,0.5     — логнормальная с медианой 0.8 и sigma 0.5
+                                (типичный длинный хвост ответов LLM);
+      - exp:0.3               — экспоненциальная со средним 0.3.
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "exp")
+
+    def __init__(self, kind: str = "fixed", params: tuple = (0.0,), rng: Optional[random.Random] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестное распределение задержки: {kind}")
+        self.kind = kind
+        self.params = params
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def parse(cls, spec: str, rng: Optional[random.Random] = None) -> "LatencyModel":
+        """Разбирает строку вида "lognormal:0.8,0.5"."""
+        kind, _, raw = spec.partition(":")
+        params = tuple(float(value) for value in raw.split(",") if value.strip()) or (0.0,)
+        return cls(kind.strip().lower(), params, rng)
+
+    def sample(self) -> float:
+        """Очередное значение задержки (сек, не меньше нуля)."""
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "lognormal":
+            median, sigma = self.params[0], self.params[1] if len(self.params) > 1 else 0.5
+            value = median * math.exp(sigma * self.rng.gauss(0.0, 1.0))
+        else:
+            value = self.rng.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(str(p) for p in self.params)}"
+
+
+@dataclass
+class FaultProfile:
+    """
+    Поведение заглушки под нагрузкой.
+
+    Attributes:
+        latency: Распределение задержки ответа
+        error_rate: Доля ответов 5xx
+        rate_limit_rate: Доля ответов 429
+        retry_after: Значение заголовка Retry-After в ответах 429 (сек)
+        max_in_flight: Лимит одновременных запросов; сверх него — 429 (0 — без лимита)
+    """
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    max_in_flight: int = 0
+    rng: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self) -> None:
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    def decide(self) -> Optional[int]:
+        """
+        Решает судьбу очередного запроса.
+
+        Returns:
+            Optional[int]: Статус ошибки (429 или 503) или None — ответить нормально
+        """
+        self.requests += 1
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.rate_limited += 1
+            return 429
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.rate_limited += 1
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors += 1
+            return 503
+        return None
+
+    async def delay(self, share: float = 1.0) -> None:
+        """Выдерживает задержку (или её долю — для потоковых ответов)."""
+        seconds = self.latency.sample() * share
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency": repr(self.latency),
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,211 @@
+# standins/hh.py
+import hashlib
+import random
+import secrets
+from typing import Any, Dict
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+from core.logger import setup_logger
+from standins.faults import FaultProfile
+
+logger = setup_logger(__name__)
+
+# Количество записей опыта в синтетических резюме (заглушка OpenAI отвечает так же)
+DEFAULT_EXPERIENCE = 3
+
+_WORDS = (
+    "Python", "Django", "FastAPI", "PostgreSQL", "Redis", "Docker", "Kubernetes", "asyncio",
+    "разработка", "сервисов", "API", "команда", "проект", "нагрузка", "оптимизация",
+    "интеграция", "архитектура", "тестирование", "микросервисы", "аналитика", "CI/CD", "Kafka"
+)
+
+
+def _rng(kind: str, item_id: str) -> random.Random:
+    """Генератор, детерминированный для объекта: одинаковый id — одинаковые данные."""
+    return random.Random(hashlib.sha256(f"{kind}:{item_id}".encode()).hexdigest())
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def make_resume(resume_id: str, experience: int = DEFAULT_EXPERIENCE) -> Dict[str, Any]:
+    """Синтетическое резюме в формате ответа GET /resumes/{id}."""
+    rng = _rng("resume", resume_id)
+    return {
+        "id": resume_id,
+        "title": f"Backend-разработчик {_text(rng, 2)}",
+        "skills": _text(rng, 80),
+        "skill_set": sorted({rng.choice(_WORDS) for _ in range(10)}),
+        "experience": [
+            {
+                "company": f"Компания {index + 1}",
+                "position": f"Разработчик {_text(rng, 1)}",
+                "description": f"<p>{_text(rng, 120)}</p>",
+                "start": f"{2015 + index * 2}-01-01",
+                "end": None if index == 0 else f"{2016 + index * 2}-12-01",
+            }
+            for index in range(experience)
+        ],
+        "employments": [{"id": "full", "name": "Полная занятость"}],
+        "schedules": [{"id": "remote", "name": "Удаленная работа"}],
+        "language": [{"id": "eng", "name": "Английский", "level": {"id": "b2", "name": "B2 — Средне-продвинутый"}}],
+        "relocation": {"type": {"id": "no_relocation", "name": "не могу переехать"}},
+        "salary": {"amount": rng.randrange(150, 400) * 1000, "currency": "RUR"},
+        "professional_roles": [{"id": "96", "name": "Программист, разработчик"}],
+    }
+
+
+def make_vacancy(vacancy_id: str) -> Dict[str, Any]:
+    """Синтетическая вакансия в формате ответа GET /vacancies/{id}."""
+    rng = _rng("vacancy", vacancy_id)
+    paragraphs = "".join(f"<p>{_text(rng, 60)}</p>" for _ in range(4))
+    return {
+        "id": vacancy_id,
+        "name": f"Python-разработчик {_text(rng, 1)}",
+        "description": f"<strong>Обязанности:</strong>{paragraphs}",
+        "key_skills": [{"name": name} for name in sorted({rng.choice(_WORDS) for _ in range(8)})],
+        "employment_form": {"id": "FULL"},
+        "experience": {"id": "between3And6"},
+        "schedule": {"id": "remote"},
+        "employment": {"id": "full"},
+        "professional_roles": [{"id": "96", "name": "Программист, разработчик"}],
+    }
+
+
+class HHStandin:
+    """
+    Заглушка API hh.ru и OAuth для нагрузочных тестов.
+
+    Маршруты:
+      GET  /oauth/authorize   — сразу перенаправляет на redirect_uri с code и state;
+      POST /oauth/token       — выдаёт токены (authorization_code и refresh_token);
+      GET  /resumes/{id}      — синтетическое резюме (после PUT — с изменениями);
+      PUT  /resumes/{id}      — принимает частичное обновление, отвечает 204;
+      GET  /vacancies/{id}    — синтетическая вакансия с ETag (поддерживает 304).
+    Запросы к API требуют заголовок Authorization: Bearer <выданный токен>.
+    Задержки и ошибки задаются профилем FaultProfile.
+    """
+
+    def __init__(self, faults: FaultProfile, experience: int = DEFAULT_EXPERIENCE):
+        self.faults = faults
+        self.experience = experience
+        self._access_tokens: set = set()
+        self._refresh_tokens: set = set()
+        self._updated_resumes: Dict[str, Dict[str, Any]] = {}
+        self.resume_updates = 0
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_get('/oauth/authorize', self._authorize)
+        app.router.add_post('/oauth/token', self._token)
+        app.router.add_get('/resumes/{resume_id}', self._get_resume)
+        app.router.add_put('/resumes/{resume_id}', self._put_resume)
+        app.router.add_get('/vacancies/{vacancy_id}', self._get_vacancy)
+
+    # -------------------------------------------------------------------------
+    # Общая обработка
+    # -------------------------------------------------------------------------
+
+    async def _guarded(self, request: web.Request, handler, check_auth: bool = True) -> web.Response:
+        """Задержка, внедрение ошибок и проверка токена вокруг обработчика."""
+        status = self.faults.decide()
+        self.faults.in_flight += 1
+        try:
+            await self.faults.delay()
+            if status == 429:
+                return web.json_response(
+                    {"errors": [{"type": "too_many_requests"}]},
+                    status=429,
+                    headers={"Retry-After": f"{self.faults.retry_after:g}"}
+                )
+            if status:
+                return web.json_response({"errors": [{"type": "service_unavailable"}]}, status=status)
+            if check_auth:
+                token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+                if token not in self._access_tokens:
+                    return web.json_response({"errors": [{"type": "oauth", "value": "token_expired"}]}, status=401)
+            return await handler(request)
+        finally:
+            self.faults.in_flight -= 1
+
+    def issue_tokens(self) -> Dict[str, Any]:
+        """Выдаёт новую пару токенов (доступна и напрямую — для подготовки нагрузочных тестов)."""
+        access_token, refresh_token = secrets.token_hex(16), secrets.token_hex(16)
+        self._access_tokens.add(access_token)
+        self._refresh_tokens.add(refresh_token)
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "expires_in": 1209600,
+        }
+
+    # -------------------------------------------------------------------------
+    # OAuth
+    # -------------------------------------------------------------------------
+
+    async def _authorize(self, request: web.Request) -> web.Response:
+        redirect_uri = request.query.get("redirect_uri")
+        if not redirect_uri:
+            return web.json_response({"error": "invalid_request"}, status=400)
+        query = {"code": secrets.token_hex(8)}
+        if request.query.get("state"):
+            query["state"] = request.query["state"]
+        separator = "&" if "?" in redirect_uri else "?"
+        raise web.HTTPFound(f"{redirect_uri}{separator}{urlencode(query)}")
+
+    async def _token(self, request: web.Request) -> web.Response:
+        async def handler(request: web.Request) -> web.Response:
+            form = await request.post()
+            grant_type = form.get("grant_type")
+            if grant_type == "authorization_code" and form.get("code"):
+                return web.json_response(self.issue_tokens())
+            if grant_type == "refresh_token" and form.get("refresh_token") in self._refresh_tokens:
+                self._refresh_tokens.discard(form["refresh_token"])
+                return web.json_response(self.issue_tokens())
+            return web.json_response({"error": "invalid_grant"}, status=400)
+
+        return await self._guarded(request, handler, check_auth=False)
+
+    # -------------------------------------------------------------------------
+    # API
+    # -------------------------------------------------------------------------
+
+    async def _get_resume(self, request: web.Request) -> web.Response:
+        async def handler(request: web.Request) -> web.Response:
+            resume_id = request.match_info["resume_id"]
+            resume = make_resume(resume_id, self.experience)
+            resume.update(self._updated_resumes.get(resume_id, {}))
+            return web.json_response(resume)
+
+        return await self._guarded(request, handler)
+
+    async def _put_resume(self, request: web.Request) -> web.Response:
+        async def handler(request: web.Request) -> web.Response:
+            try:
+                body = await request.json()
+            except ValueError:
+                return web.json_response({"errors": [{"type": "bad_json"}]}, status=400)
+            if not isinstance(body, dict):
+                return web.json_response({"errors": [{"type": "bad_json"}]}, status=400)
+            resume_id = request.match_info["resume_id"]
+            self._updated_resumes.setdefault(resume_id, {}).update(body)
+            self.resume_updates += 1
+            return web.Response(status=204)
+
+        return await self._guarded(request, handler)
+
+    async def _get_vacancy(self, request: web.Request) -> web.Response:
+        async def handler(request: web.Request) -> web.Response:
+            vacancy_id = request.match_info["vacancy_id"]
+            etag = f'"{hashlib.sha256(vacancy_id.encode()).hexdigest()[:16]}"'
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+            return web.json_response(make_vacancy(vacancy_id), headers={"ETag": etag})
+
+        return await self._guarded(request, handler)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.faults.stats(), "resume_updates": self.resume_updates}
@@ -0,0 +1,235 @@
+# standins/openai_api.py
+import json
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from core.logger import setup_logger
+from standins.faults import FaultProfile
+from standins.hh import DEFAULT_EXPERIENCE
+
+logger = setup_logger(__name__)
+
+_WORDS = (
+    "опыт", "разработки", "высоконагруженных", "сервисов", "на", "Python", "и", "Go",
+    "оптимизировал", "запросы", "PostgreSQL", "внедрил", "CI/CD", "руководил", "командой",
+    "снизил", "время", "ответа", "API", "спроектировал", "микросервисную", "архитектуру"
+)
+
+# Поля, для которых генерируется длинный текст (описания опыта, «о себе»)
+_LONG_TEXT_FIELDS = {"description", "skills"}
+
+# Перечисление, заданное в описании поля: "(enum: 'title', 'skills', ...)"
+_DESCRIPTION_ENUM_RE = re.compile(r"enum:\s*((?:'[^']*'\s*,?\s*)+)")
+
+
+class SchemaSampler:
+    """
+    Генерирует JSON, соответствующий JSON Schema из response_format
+    (structured outputs): все поля объектов заполняются, $ref и anyOf
+    разрешаются, для enum берётся первое значение. Строковые поля с
+    перечислением в описании ("enum: 'a', 'b'") получают одно из значений,
+    чтобы рекомендации GAP-анализа попадали в реальные разделы резюме.
+    """
+
+    def __init__(
+        self,
+        rng: random.Random,
+        short_words: int = 4,
+        long_words: int = 80,
+        items: int = 3,
+        experience: int = DEFAULT_EXPERIENCE
+    ):
+        self.rng = rng
+        self.experience = experience
+        self.short_words = short_words
+        self.long_words = long_words
+        self.items = items
+
+    def sample(self, schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None, key: str = "") -> Any:
+        defs = defs if defs is not None else schema.get("$defs", {})
+        if "$ref" in schema:
+            return self.sample(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, key)
+        if "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            return self.sample(options[0], defs, key) if options else None
+        if "enum" in schema:
+            return schema["enum"][0]
+
+        kind = schema.get("type")
+        if isinstance(kind, list):
+            kind = next((item for item in kind if item != "null"), "null")
+        if kind == "object":
+            return {
+                name: self.sample(prop, defs, name)
+                for name, prop in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            # Записей опыта столько же, сколько в синтетических резюме заглушки HH
+            count = self.experience if key == "experience" else self.items
+            return [self.sample(schema.get("items", {}), defs, key) for _ in range(count)]
+        if kind == "integer":
+            return 1
+        if kind == "number":
+            return 1.0
+        if kind == "boolean":
+            return True
+        if kind == "null":
+            return None
+        match = _DESCRIPTION_ENUM_RE.search(schema.get("description", ""))
+        if match:
+            return self.rng.choice(re.findall(r"'([^']*)'", match.group(1)))
+        words = self.long_words if key in _LONG_TEXT_FIELDS else self.short_words
+        return " ".join(self.rng.choice(_WORDS) for _ in range(words))
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class OpenAIStandin:
+    """
+    Заглушка OpenAI Chat Completions (POST /v1/chat/completions).
+
+    Отвечает JSON по схеме из response_format (structured outputs), в том
+    числе потоково (stream=True, SSE-чанки). Ответ детерминирован для
+    одинакового запроса. Задержка, доля 5xx и 429 (с Retry-After) задаются
+    профилем FaultProfile; в потоковом режиме задержка распределяется между
+    первым чанком и остальными.
+    """
+
+    def __init__(
+        self,
+        faults: FaultProfile,
+        long_words: int = 80,
+        stream_chunks: int = 20,
+        experience: int = DEFAULT_EXPERIENCE
+    ):
+        self.faults = faults
+        self.experience = experience
+        self.long_words = long_words
+        self.stream_chunks = stream_chunks
+        self.completions = 0
+        self.completion_tokens = 0
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_post('/v1/chat/completions', self._chat_completions)
+
+    @staticmethod
+    def _error(status: int, retry_after: float) -> web.Response:
+        if status == 429:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached (standin)", "type": "requests",
+                           "param": None, "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after": f"{retry_after:g}"}
+            )
+        return web.json_response(
+            {"error": {"message": "The server had an error (standin)", "type": "server_error",
+                       "param": None, "code": None}},
+            status=status
+        )
+
+    def _content(self, body: Dict[str, Any]) -> str:
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        prompt = json.dumps(messages, ensure_ascii=False)
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            sampler = SchemaSampler(rng, long_words=self.long_words, experience=self.experience)
+            return json.dumps(sampler.sample(schema), ensure_ascii=False)
+        return " ".join(rng.choice(_WORDS) for _ in range(self.long_words))
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        status = self.faults.decide()
+        self.faults.in_flight += 1
+        try:
+            body = await request.json()
+            if status:
+                await self.faults.delay(0.1)
+                return self._error(status, self.faults.retry_after)
+
+            content = self._content(body)
+            prompt_tokens = estimate_tokens(json.dumps(body.get("messages", []), ensure_ascii=False))
+            completion_tokens = estimate_tokens(content)
+            self.completions += 1
+            self.completion_tokens += completion_tokens
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            completion_id = f"chatcmpl-standin-{self.completions}"
+            model = body.get("model", "standin")
+
+            if body.get("stream"):
+                return await self._stream(request, completion_id, model, content, usage, body)
+
+            await self.faults.delay()
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+        finally:
+            self.faults.in_flight -= 1
+
+    async def _stream(
+        self,
+        request: web.Request,
+        completion_id: str,
+        model: str,
+        content: str,
+        usage: Dict[str, int],
+        body: Dict[str, Any]
+    ) -> web.StreamResponse:
+        """Потоковый ответ: SSE-чанки chat.completion.chunk и завершающий [DONE]."""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        created = int(time.time())
+
+        async def send(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        # Время до первого токена — треть задержки, остальное — на генерацию
+        await self.faults.delay(1 / 3)
+        await send({"role": "assistant", "content": ""})
+        step = max(1, len(content) // self.stream_chunks)
+        for start in range(0, len(content), step):
+            await self.faults.delay(2 / 3 / self.stream_chunks)
+            await send({"content": content[start:start + step]})
+        await send({}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [], "usage": usage}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.faults.stats(),
+            "completions": self.completions,
+            "completion_tokens": self.completion_tokens,
+        }
@@ -0,0 +1,85 @@
+# standins/server.py
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from core.logger import setup_logger
+from standins.faults import FaultProfile
+from standins.hh import DEFAULT_EXPERIENCE, HHStandin
+from standins.openai_api import OpenAIStandin
+
+logger = setup_logger(__name__)
+
+class StandinServer:
+    """
+    Локальный сервер-заглушка hh.ru, OAuth и OpenAI на одном порту.
+
+    HH API и OAuth обслуживаются от корня (base_url), OpenAI — по /v1.
+    Статистика обеих заглушек доступна по GET /__standin/stats.
+    Переменные окружения, направляющие бота на заглушку, возвращает env().
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        hh_faults: Optional[FaultProfile] = None,
+        openai_faults: Optional[FaultProfile] = None,
+        experience: int = DEFAULT_EXPERIENCE,
+        long_words: int = 80
+    ):
+        """
+        Инициализация.
+
+        Args:
+            host: Адрес привязки
+            port: Порт (0 — выбрать свободный)
+            hh_faults: Задержки и ошибки заглушки HH
+            openai_faults: Задержки и ошибки заглушки OpenAI
+            experience: Количество записей опыта в синтетических резюме
+            long_words: Длина длинных текстовых полей в ответах модели (в словах)
+        """
+        self.host = host
+        self.port = port
+        self.hh = HHStandin(hh_faults or FaultProfile(), experience=experience)
+        self.openai = OpenAIStandin(openai_faults or FaultProfile(), long_words=long_words, experience=experience)
+        self.app = web.Application(client_max_size=16 * 1024 * 1024)
+        self.hh.add_routes(self.app)
+        self.openai.add_routes(self.app)
+        self.app.router.add_get('/__standin/stats', self._handle_stats)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        """Переменные окружения, направляющие клиентов HH и OpenAI на заглушку."""
+        return {
+            "HH_API_BASE_URL": self.base_url,
+            "HH_TOKEN_URL": f"{self.base_url}/oauth/token",
+            "HH_AUTH_URL": f"{self.base_url}/oauth/authorize",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "OPENAI_API_KEY": "standin",
+        }
+
+    def stats(self) -> Dict[str, Dict]:
+        return {"hh": self.hh.stats(), "openai": self.openai.stats()}
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def start(self) -> None:
+        """Запускает сервер; при port=0 в self.port записывается выбранный порт."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Заглушки hh.ru/OpenAI запущены на {self.base_url}")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,171 @@
+# tests/benchmark_pipeline_modes.py
+"""
+Сравнение двухэтапного и быстрого режимов пайплайна рерайта.
+
+Для одной пары резюме/вакансия несколько раз выполняет:
+  - two_stage: gap_analysis + final_resume_rewrite (два последовательных запроса);
+  - fast: fast_analysis_rewrite (анализ и рерайт одним запросом);
+и выводит задержку, расход токенов и согласованность результатов режимов.
+
+Запуск (нужен OPENAI_API_KEY в окружении или .env):
+    python -m tests.benchmark_pipeline_modes --vacancy vacancy.json [--resume resume.json] [--rounds 3]
+
+vacancy.json — ответ API HH /vacancies/{id} или уже распарсенная вакансия.
+По умолчанию используется резюме из data/resume.py.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from difflib import SequenceMatcher
+from typing import Any, Dict, List
+
+from config.config import load_config
+from core.logger import setup_logger
+from models.gap_analysis import ResumeGapAnalysis
+from models.resume import ResumeUpdate
+from services.entity_extractor import EntityExtractor
+from services.llm_service import LLMService
+
+logger = setup_logger(__name__)
+
+
+def load_vacancy(path: str) -> Dict[str, Any]:
+    """Загружает вакансию: ответ API HH разбирается EntityExtractor, распарсенная берётся как есть."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data.get("key_skills"), list) and data["key_skills"] and isinstance(data["key_skills"][0], dict):
+        parsed = EntityExtractor().extract_vacancy_info(data)
+        if parsed:
+            return parsed.model_dump(exclude_none=True)
+    return data
+
+
+def load_resume(path: str = None) -> Dict[str, Any]:
+    """Загружает распарсенное резюме из файла или пример из data/resume.py."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    from data.resume import resume
+    return resume
+
+
+def jaccard(a: List[str], b: List[str]) -> float:
+    """Коэффициент Жаккара для двух списков строк (без учёта регистра)."""
+    set_a = {item.lower().strip() for item in a}
+    set_b = {item.lower().strip() for item in b}
+    if not set_a and not set_b:
+        return 1.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+
+def text_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def agreement(
+    gap_a: ResumeGapAnalysis,
+    resume_a: ResumeUpdate,
+    gap_b: ResumeGapAnalysis,
+    resume_b: ResumeUpdate
+) -> Dict[str, float]:
+    """Согласованность результатов двух режимов по разделам."""
+    experience = [
+        text_similarity(x.description, y.description)
+        for x, y in zip(resume_a.experience, resume_b.experience)
+    ]
+    return {
+        "sections": jaccard(
+            [rec.section for rec in gap_a.recommendations],
+            [rec.section for rec in gap_b.recommendations]
+        ),
+        "title": text_similarity(resume_a.title, resume_b.title),
+        "skills": text_similarity(resume_a.skills, resume_b.skills),
+        "skill_set": jaccard(resume_a.skill_set, resume_b.skill_set),
+        "experience": statistics.mean(experience) if experience else 1.0,
+    }
+
+
+def usage_totals(llm: LLMService) -> Dict[str, float]:
+    """Суммарная статистика вызовов модели по всем этапам."""
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for stats in llm.usage.values():
+        for key in totals:
+            totals[key] += stats[key]
+    return totals
+
+
+async def run_mode(llm: LLMService, mode: str, parsed_resume: dict, parsed_vacancy: dict) -> Dict[str, Any]:
+    """Один прогон пайплайна в указанном режиме."""
+    before = usage_totals(llm)
+    started = time.perf_counter()
+    if mode == "fast":
+        result = await llm.fast_analysis_rewrite(parsed_resume, parsed_vacancy)
+        gap_result, final_resume = result if result else (None, None)
+    else:
+        gap_result = await llm.gap_analysis(parsed_resume, parsed_vacancy)
+        final_resume = await llm.final_resume_rewrite(parsed_resume, gap_result) if gap_result else None
+    elapsed = time.perf_counter() - started
+    after = usage_totals(llm)
+    return {
+        "ok": final_resume is not None,
+        "seconds": elapsed,
+        "calls": after["calls"] - before["calls"],
+        "prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+        "completion_tokens": after["completion_tokens"] - before["completion_tokens"],
+        "gap": gap_result,
+        "resume": final_resume,
+    }
+
+
+def summarize(mode: str, runs: List[Dict[str, Any]]) -> None:
+    ok_runs = [run for run in runs if run["ok"]]
+    print(f"\n== {mode}: успешно {len(ok_runs)}/{len(runs)}")
+    if not ok_runs:
+        return
+    seconds = [run["seconds"] for run in ok_runs]
+    print(f"   задержка, с: median={statistics.median(seconds):.2f} min={min(seconds):.2f} max={max(seconds):.2f}")
+    for key in ("calls", "prompt_tokens", "completion_tokens"):
+        print(f"   {key}: {statistics.mean(run[key] for run in ok_runs):.0f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacancy", required=True, help="JSON вакансии")
+    parser.add_argument("--resume", help="JSON распарсенного резюме (по умолчанию data/resume.py)")
+    parser.add_argument("--rounds", type=int, default=3, help="Количество прогонов каждого режима")
+    args = parser.parse_args()
+
+    parsed_resume = load_resume(args.resume)
+    parsed_vacancy = load_vacancy(args.vacancy)
+    # Без кэша результатов: каждый прогон обращается к модели
+    llm = LLMService(load_config())
+
+    runs: Dict[str, List[Dict[str, Any]]] = {"two_stage": [], "fast": []}
+    try:
+        for round_index in range(args.rounds):
+            # Режимы чередуются, чтобы колебания задержки API влияли на оба одинаково
+            for mode in ("two_stage", "fast"):
+                run = await run_mode(llm, mode, parsed_resume, parsed_vacancy)
+                runs[mode].append(run)
+                logger.info(f"Прогон {round_index + 1} ({mode}): {run['seconds']:.2f} с, ok={run['ok']}")
+    finally:
+        await llm.close()
+
+    for mode, mode_runs in runs.items():
+        summarize(mode, mode_runs)
+
+    scores = [
+        agreement(a["gap"], a["resume"], b["gap"], b["resume"])
+        for a, b in zip(runs["two_stage"], runs["fast"])
+        if a["ok"] and b["ok"]
+    ]
+    if scores:
+        print("\n== согласованность two_stage / fast (1.0 — совпадение):")
+        for key in scores[0]:
+            print(f"   {key}: {statistics.mean(score[key] for score in scores):.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
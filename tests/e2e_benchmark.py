@@ -0,0 +1,772 @@
+# tests/e2e_benchmark.py
+"""
+Сквозной нагрузочный тест бота: синтетический трафик Telegram от N пользователей.
+
+Собирается тот же диспетчер, что и в main.py (register_handlers: StartCommandHandler,
+AuthCommandHandler, RewriteResumeHandler и остальные), с SQLite-хранилищем FSM
+во временном каталоге. hh.ru, OAuth и OpenAI заменены заглушками standins
+(в этом же процессе или внешними: python -m standins), Telegram — сессией бота,
+которая не ходит в сеть, а записывает исходящие сообщения с заданной задержкой.
+
+Каждый пользователь проходит сценарий:
+  /start → /auth → переход по ссылке авторизации (OAuth callback) → «Изменить резюме»
+  → ссылка на резюме → ссылка на вакансию → ожидание обновления резюме,
+и для каждого этапа измеряется время от сообщения пользователя (или предыдущего
+ответа бота) до ожидаемого ответа бота:
+  start, auth_link, oauth, menu, resume, vacancy — обработчики сообщений;
+  queue_wait — ожидание воркера очереди; gap, rewrite (или fast_rewrite),
+  update — этапы пайплайна; session — сумма этапов без пауз пользователя.
+
+Уровни нагрузки (--users 10,25,50) прогоняются по очереди. Для каждого уровня
+выводятся p50/p95/p99 по этапам, задержка цикла событий (event loop lag),
+память на сессию (прирост RSS или, с --tracemalloc, памяти Python на одну
+одновременно активную сессию) и метрики сервисов (GET /metrics). Уровень
+считается выдерживаемым, если доля ошибок, p95 сессии и p99 задержки цикла
+событий не превышают порогов; максимальный такой уровень — итоговая оценка
+числа пользователей на один экземпляр. Прогон останавливается на первом
+невыдержанном уровне.
+
+Запуск:
+    python -m tests.e2e_benchmark --users 10,25,50,100 [--ramp-up 5]
+        [--openai-latency lognormal:1.5,0.4] [--hh-latency lognormal:0.1,0.3]
+        [--pipeline-mode two_stage|fast] [--rewrite-mode stream|single|fanout]
+        [--ingress direct|webhook] [--json report.json] [--baseline old.json]
+
+Для сравнения между коммитами отчёт сохраняется в JSON (--json) вместе с
+коммитом и параметрами прогона; с --baseline выводится изменение p95 по этапам
+относительно ранее сохранённого отчёта. Заглушки и паузы пользователей
+детерминированы зерном --seed. Заглушки в том же процессе делят с ботом цикл
+событий; для точной оценки задержки цикла запускайте их отдельно (--standin-url).
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiogram import Bot, Dispatcher, __version__ as aiogram_version
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendDocument, SendMessage
+from aiogram.types import Message, Update
+
+from config.config import (
+    BotConfig,
+    CacheConfig,
+    Config,
+    Environment,
+    HHConfig,
+    HHLimitsConfig,
+    HTTPConfig,
+    JobsConfig,
+    OpenAIConfig,
+    PipelineMode,
+    RewriteMode,
+    StorageConfig,
+    UpdateMode
+)
+from core.logger import setup_logger
+from core.text import (
+    AUTH_ERROR_MSG,
+    AUTH_INTRO_MSG,
+    AUTH_SERVER_ERROR_MSG,
+    AUTH_SUCCESS_MSG,
+    EDIT_RESUME_BTN,
+    ERROR_MSG,
+    INVALID_RESUME_LINK,
+    INVALID_VACANCY_LINK,
+    JOB_ALREADY_RUNNING,
+    JOB_QUEUE_FULL,
+    JOB_QUEUED,
+    PROGRESS_FAST_STARTED,
+    PROGRESS_GAP_DONE,
+    PROGRESS_GAP_STARTED,
+    PROGRESS_REWRITE_DONE,
+    RESUME_PARSED,
+    WAITING_RESUME_LINK
+)
+from main import register_handlers
+from services.callback_server import CallbackServer
+from services.fsm_storage import SQLiteStorage
+from standins.faults import FaultProfile, LatencyModel
+from standins.server import StandinServer
+from tests.replay_benchmark import percentile
+
+logger = setup_logger(__name__)
+
+BOT_TOKEN = "123456:e2e-benchmark"
+WEBHOOK_PATH = "/webhook"
+RESUME_UPDATED_MSG = "✅ Резюме успешно обновлено"
+
+# Ответы бота, означающие, что сценарий пользователя прерван
+FAILURE_PREFIXES = (
+    ERROR_MSG,
+    AUTH_ERROR_MSG,
+    AUTH_SERVER_ERROR_MSG,
+    INVALID_RESUME_LINK,
+    INVALID_VACANCY_LINK,
+    JOB_ALREADY_RUNNING,
+    JOB_QUEUE_FULL,
+    "Произошла ошибка",
+    "Внутренняя ошибка",
+)
+
+AUTH_URL_RE = re.compile(r"https?://\S+")
+
+
+def text_prefix(template: str) -> str:
+    """Неизменяемое начало шаблона сообщения (до первой подстановки)."""
+    return template.split("{", 1)[0]
+
+
+def pipeline_stages(pipeline_mode: PipelineMode) -> List[Tuple[str, str]]:
+    """Этапы пайплайна после постановки в очередь: (этап, начало ожидаемого сообщения)."""
+    if pipeline_mode == PipelineMode.FAST:
+        return [
+            ("queue_wait", PROGRESS_FAST_STARTED),
+            ("fast_rewrite", PROGRESS_REWRITE_DONE),
+            ("update", RESUME_UPDATED_MSG),
+        ]
+    return [
+        ("queue_wait", PROGRESS_GAP_STARTED),
+        ("gap", PROGRESS_GAP_DONE),
+        ("rewrite", PROGRESS_REWRITE_DONE),
+        ("update", RESUME_UPDATED_MSG),
+    ]
+
+
+def stage_names(pipeline_mode: PipelineMode) -> List[str]:
+    handlers = ["start", "auth_link", "oauth", "menu", "resume", "vacancy"]
+    return handlers + [stage for stage, _ in pipeline_stages(pipeline_mode)] + ["session"]
+
+
+# -----------------------------------------------------------------------------
+# Telegram без сети
+# -----------------------------------------------------------------------------
+
+class SessionFailed(Exception):
+    """Сценарий пользователя прерван на этапе stage."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class ChatRecorder:
+    """
+    Исходящие сообщения бота по чатам: (время доставки, метод, текст).
+
+    Сообщение попадает в очередь чата в момент вызова Bot API, поэтому порядок
+    сообщений совпадает с порядком их отправки ботом, а время доставки учитывает
+    задержку Telegram.
+    """
+
+    def __init__(self):
+        self._chats: Dict[int, asyncio.Queue] = {}
+
+    def _queue(self, chat_id: int) -> asyncio.Queue:
+        return self._chats.setdefault(chat_id, asyncio.Queue())
+
+    def record(self, chat_id: Any, method: str, text: Optional[str], delay: float = 0.0) -> None:
+        if isinstance(chat_id, int):
+            self._queue(chat_id).put_nowait((time.perf_counter() + delay, method, text or ""))
+
+    async def expect(self, chat_id: int, stage: str, prefix: str, timeout: float) -> Tuple[float, str]:
+        """
+        Ждёт новое сообщение (не редактирование), начинающееся с prefix.
+
+        Returns:
+            Время получения и текст сообщения
+
+        Raises:
+            SessionFailed: Бот ответил ошибкой или не ответил за timeout секунд
+        """
+        queue = self._queue(chat_id)
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise SessionFailed(stage, "timeout")
+            try:
+                received_at, method, text = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                raise SessionFailed(stage, "timeout")
+            if method == "EditMessageText":
+                continue
+            if text.startswith(prefix):
+                return received_at, text
+            if text.startswith(FAILURE_PREFIXES):
+                raise SessionFailed(stage, text.splitlines()[0][:80])
+
+    def forget(self, chat_id: int) -> None:
+        self._chats.pop(chat_id, None)
+
+
+class RecordingSession(BaseSession):
+    """
+    Сессия бота без сети: запросы к Bot API не отправляются, а записываются
+    в ChatRecorder; ответ Telegram имитируется с задержкой из LatencyModel.
+    """
+
+    def __init__(self, recorder: ChatRecorder, latency: LatencyModel):
+        super().__init__()
+        self.recorder = recorder
+        self.latency = latency
+        self.requests = 0
+        self._message_ids = count(1)
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        seconds = self.latency.sample()
+        self.requests += 1
+        chat_id = getattr(method, "chat_id", None)
+        text = getattr(method, "text", None) or getattr(method, "caption", None)
+        self.recorder.record(chat_id, type(method).__name__, text, seconds)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        if isinstance(method, (SendMessage, SendDocument, EditMessageText)):
+            return Message.model_validate(
+                {
+                    "message_id": getattr(method, "message_id", None) or next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": text or "",
+                },
+                context={"bot": bot}
+            )
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any):
+        raise NotImplementedError("Загрузка файлов в нагрузочном тесте не используется")
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+# -----------------------------------------------------------------------------
+# Окружение: бот, диспетчер, заглушки
+# -----------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_config(args: argparse.Namespace, standin_url: str, callback_port: int, data_dir: str) -> Config:
+    """Конфигурация бота, направленная на заглушки (остальные параметры — из окружения)."""
+    openai = dataclasses.replace(
+        OpenAIConfig.from_env(),
+        api_key="standin",
+        base_url=f"{standin_url}/v1",
+        rewrite_mode=RewriteMode(args.rewrite_mode),
+        pipeline_mode=PipelineMode(args.pipeline_mode)
+    )
+    jobs = JobsConfig.from_env()
+    if args.workers:
+        jobs = dataclasses.replace(jobs, workers=args.workers)
+    if args.max_queue:
+        jobs = dataclasses.replace(jobs, max_queue=args.max_queue)
+    return Config(
+        bot=BotConfig(
+            token=BOT_TOKEN,
+            update_mode=UpdateMode.WEBHOOK if args.ingress == "webhook" else UpdateMode.POLLING,
+            webhook_path=WEBHOOK_PATH
+        ),
+        hh=HHConfig(
+            client_id="standin",
+            client_secret="standin",
+            redirect_uri=f"http://127.0.0.1:{callback_port}/",
+            base_url=standin_url,
+            token_url=f"{standin_url}/oauth/token",
+            auth_url=f"{standin_url}/oauth/authorize"
+        ),
+        openai=openai,
+        environment=Environment.DEVELOPMENT,
+        http=HTTPConfig.from_env(),
+        hh_limits=HHLimitsConfig.from_env(),
+        storage=dataclasses.replace(StorageConfig.from_env(), data_dir=data_dir),
+        cache=CacheConfig.from_env(),
+        jobs=jobs
+    )
+
+
+class BotHarness:
+    """
+    Бот с зарегистрированными обработчиками и клиент, играющий роль пользователей.
+
+    Обновления передаются в диспетчер напрямую (ingress=direct) или POST-запросом
+    на webhook общего веб-сервера (ingress=webhook), как в продакшене.
+    """
+
+    def __init__(self, config: Config, ingress: str, tg_latency: LatencyModel, stage_timeout: float):
+        self.config = config
+        self.ingress = ingress
+        self.stage_timeout = stage_timeout
+        self.recorder = ChatRecorder()
+        self.bot = Bot(token=config.bot.token, session=RecordingSession(self.recorder, tg_latency))
+        self.storage = SQLiteStorage(config.storage.fsm_db_path)
+        self.dp = Dispatcher(storage=self.storage)
+        # Общий веб-сервер: OAuth callback, /metrics и (в режиме webhook) приём обновлений
+        self.callback_server = CallbackServer(host="127.0.0.1")
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.active = 0
+        self._update_ids = count(1)
+        self._message_ids = count(1)
+
+    @property
+    def server_url(self) -> str:
+        return f"http://127.0.0.1:{self.callback_server.port}"
+
+    async def start(self) -> None:
+        await register_handlers(self.dp, self.bot, self.config, self.callback_server)
+        if self.ingress == "webhook":
+            self.callback_server.setup_webhook(
+                self.dp,
+                self.bot,
+                path=WEBHOOK_PATH,
+                max_in_flight=self.config.bot.webhook_max_in_flight
+            )
+        if not await self.callback_server.start():
+            raise RuntimeError("Не удалось запустить веб-сервер бота")
+        await self.dp.emit_startup(bot=self.bot)
+        self.http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+    async def stop(self) -> None:
+        if self.http:
+            await self.http.close()
+        await self.callback_server.stop()
+        await self.dp.emit_shutdown(bot=self.bot)
+        await self.storage.close()
+        await self.bot.session.close()
+
+    async def send(self, user_id: int, text: str) -> None:
+        """Сообщение пользователя боту."""
+        message: Dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        update = {"update_id": next(self._update_ids), "message": message}
+        if self.ingress == "webhook":
+            async with self.http.post(f"{self.server_url}{WEBHOOK_PATH}", json=update) as response:
+                if response.status != 200:
+                    raise SessionFailed("ingress", f"webhook HTTP {response.status}")
+            return
+        await self.dp.feed_update(self.bot, Update.model_validate(update, context={"bot": self.bot}))
+
+    async def expect(self, user_id: int, stage: str, prefix: str) -> Tuple[float, str]:
+        return await self.recorder.expect(user_id, stage, prefix, self.stage_timeout)
+
+    async def follow_auth_link(self, auth_url: str) -> None:
+        """Переход по ссылке авторизации: заглушка OAuth перенаправляет на callback бота."""
+        async with self.http.get(auth_url) as response:
+            if response.status != 200:
+                raise SessionFailed("oauth", f"callback HTTP {response.status}")
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Метрики сервисов бота (GET /metrics общего веб-сервера)."""
+        try:
+            async with self.http.get(f"{self.server_url}/metrics") as response:
+                return await response.json()
+        except Exception as e:
+            logger.error(f"Не удалось получить метрики бота: {e}")
+            return {}
+
+
+# -----------------------------------------------------------------------------
+# Сценарий пользователя
+# -----------------------------------------------------------------------------
+
+async def run_session(
+    harness: BotHarness,
+    user_id: int,
+    vacancy_id: str,
+    pipeline_mode: PipelineMode,
+    think: LatencyModel
+) -> Dict[str, Any]:
+    """
+    Полный сценарий одного пользователя.
+
+    Returns:
+        {"ok", "stages": {этап: мс}, "failed_stage", "reason"}
+    """
+    stages: Dict[str, float] = {}
+    harness.active += 1
+
+    async def step(stage: str, text: str, prefix: str) -> Tuple[float, str]:
+        await asyncio.sleep(think.sample())
+        started = time.perf_counter()
+        await harness.send(user_id, text)
+        received_at, reply = await harness.expect(user_id, stage, prefix)
+        stages[stage] = (received_at - started) * 1000
+        return received_at, reply
+
+    try:
+        await step("start", "/start", "👋")
+        _, reply = await step("auth_link", "/auth", text_prefix(AUTH_INTRO_MSG)[:20])
+        links = AUTH_URL_RE.findall(reply)
+        if not links:
+            raise SessionFailed("auth_link", "нет ссылки авторизации")
+
+        await asyncio.sleep(think.sample())
+        started = time.perf_counter()
+        await harness.follow_auth_link(links[-1])
+        received_at, _ = await harness.expect(user_id, "oauth", AUTH_SUCCESS_MSG.strip())
+        stages["oauth"] = (received_at - started) * 1000
+
+        await step("menu", EDIT_RESUME_BTN, WAITING_RESUME_LINK)
+        await step("resume", f"https://hh.ru/resume/bench{user_id}", text_prefix(RESUME_PARSED)[:25])
+        queued_at, _ = await step("vacancy", f"https://hh.ru/vacancy/{vacancy_id}", text_prefix(JOB_QUEUED))
+
+        # Этапы пайплайна идут подряд, без действий пользователя
+        previous = queued_at
+        for stage, prefix in pipeline_stages(pipeline_mode):
+            received_at, _ = await harness.expect(user_id, stage, prefix)
+            stages[stage] = (received_at - previous) * 1000
+            previous = received_at
+
+        stages["session"] = sum(stages.values())
+        return {"ok": True, "stages": stages}
+    except SessionFailed as e:
+        return {"ok": False, "stages": stages, "failed_stage": e.stage, "reason": e.reason}
+    except Exception as e:
+        logger.error(f"Сценарий пользователя {user_id} прерван: {e}")
+        return {"ok": False, "stages": stages, "failed_stage": "exception", "reason": str(e)[:80]}
+    finally:
+        harness.active -= 1
+        harness.recorder.forget(user_id)
+
+
+# -----------------------------------------------------------------------------
+# Измерения
+# -----------------------------------------------------------------------------
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса (Linux: /proc/self/statm; иначе — пиковый ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoopMonitor:
+    """
+    Фоновая задача, измеряющая задержку цикла событий (насколько позже
+    запланированного просыпается sleep) и пиковую память при активных сессиях.
+    """
+
+    def __init__(self, active: Callable[[], int], interval: float = 0.05, traced: bool = False):
+        self.active = active
+        self.interval = interval
+        self.traced = traced
+        self.lags: List[float] = []
+        self.baseline = self._memory()
+        self.peak_memory = self.baseline
+        self.peak_active = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _memory(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.traced else rss_bytes()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - started - self.interval) * 1000)
+            active = self.active()
+            if active >= self.peak_active:
+                self.peak_active = active
+                self.peak_memory = max(self.peak_memory, self._memory())
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def report(self) -> Dict[str, Any]:
+        growth = max(0, self.peak_memory - self.baseline)
+        return {
+            "loop_lag_ms": {
+                "p50": percentile(self.lags, 0.5),
+                "p99": percentile(self.lags, 0.99),
+                "max": round(max(self.lags), 3) if self.lags else 0.0,
+            },
+            "memory": {
+                "source": "tracemalloc" if self.traced else "rss",
+                "baseline_mb": round(self.baseline / 2 ** 20, 1),
+                "peak_mb": round(self.peak_memory / 2 ** 20, 1),
+                "per_session_kb": round(growth / 1024 / self.peak_active, 1) if self.peak_active else 0.0,
+            },
+            "peak_active": self.peak_active,
+        }
+
+
+async def fetch_json(http: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
+    try:
+        async with http.get(url) as response:
+            return await response.json()
+    except Exception as e:
+        logger.error(f"Не удалось получить {url}: {e}")
+        return {}
+
+
+async def run_level(
+    harness: BotHarness,
+    users: int,
+    first_user_id: int,
+    args: argparse.Namespace,
+    think: LatencyModel,
+    standin_url: str
+) -> Dict[str, Any]:
+    """Один уровень нагрузки: users сессий, стартующих равномерно в течение ramp_up секунд."""
+    pipeline_mode = PipelineMode(args.pipeline_mode)
+    monitor = LoopMonitor(lambda: harness.active, traced=args.tracemalloc)
+    monitor.start()
+
+    async def user(index: int) -> Dict[str, Any]:
+        await asyncio.sleep(args.ramp_up * index / users)
+        vacancy_id = str(100000 + (first_user_id + index) % args.vacancy_pool)
+        return await run_session(harness, first_user_id + index, vacancy_id, pipeline_mode, think)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(user(index) for index in range(users)))
+    duration = time.perf_counter() - started
+    await monitor.stop()
+
+    ok = [result for result in results if result["ok"]]
+    failures: Dict[str, int] = {}
+    for result in results:
+        if not result["ok"]:
+            key = f"{result['failed_stage']}: {result['reason']}"
+            failures[key] = failures.get(key, 0) + 1
+
+    stages = {}
+    for stage in stage_names(pipeline_mode):
+        values = [result["stages"][stage] for result in ok if stage in result["stages"]]
+        stages[stage] = {
+            "p50_ms": percentile(values, 0.5),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": round(max(values), 3) if values else 0.0,
+        }
+
+    level = {
+        "users": users,
+        "ok": len(ok),
+        "failed": users - len(ok),
+        "error_rate": round((users - len(ok)) / users, 4),
+        "failures": failures,
+        "duration_s": round(duration, 3),
+        "sessions_per_s": round(len(ok) / duration, 3),
+        "stages": stages,
+        **monitor.report(),
+        "bot_metrics": await harness.metrics(),
+        "standins": await fetch_json(harness.http, f"{standin_url}/__standin/stats"),
+    }
+    level["sustainable"] = (
+        level["error_rate"] <= args.max_error_rate
+        and stages["session"]["p95_ms"] <= args.slo * 1000
+        and level["loop_lag_ms"]["p99"] <= args.max_lag_ms
+    )
+    return level
+
+
+# -----------------------------------------------------------------------------
+# Отчёт
+# -----------------------------------------------------------------------------
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(
+        f"\n=== Пользователей: {level['users']} — успешно {level['ok']}, ошибок {level['failed']} "
+        f"({level['error_rate']:.1%}), {level['sessions_per_s']} сессий/с за {level['duration_s']} с"
+    )
+    print(f"{'этап':<14} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10} {'max, мс':>10}")
+    for stage, stats in level["stages"].items():
+        print(
+            f"{stage:<14} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} "
+            f"{stats['p99_ms']:>10.1f} {stats['max_ms']:>10.1f}"
+        )
+    lag, memory = level["loop_lag_ms"], level["memory"]
+    print(
+        f"Задержка цикла событий: p50 {lag['p50']} мс, p99 {lag['p99']} мс, max {lag['max']} мс; "
+        f"память ({memory['source']}): {memory['per_session_kb']} КБ на сессию, "
+        f"пик {memory['peak_mb']} МБ при {level['peak_active']} активных"
+    )
+    for failure, number in level["failures"].items():
+        print(f"  ошибка {failure} — {number}")
+    print("Уровень выдержан" if level["sustainable"] else "Уровень НЕ выдержан")
+
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Изменение p95 по этапам относительно отчёта baseline (уровни сопоставляются по числу пользователей)."""
+    print(f"\nСравнение с {baseline.get('commit') or 'baseline'} (p95, мс):")
+    old_levels = {level["users"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        old = old_levels.get(level["users"])
+        if not old:
+            continue
+        print(f"  пользователей: {level['users']}")
+        for stage, stats in level["stages"].items():
+            before = old["stages"].get(stage, {}).get("p95_ms")
+            if not before:
+                continue
+            change = (stats["p95_ms"] - before) / before * 100
+            print(f"    {stage:<14} {before:>10.1f} → {stats['p95_ms']:>10.1f} ({change:+.1f}%)")
+    print(
+        f"  максимум пользователей: {baseline.get('max_sustainable_users')} → "
+        f"{report['max_sustainable_users']}"
+    )
+
+
+def set_log_level(level: str) -> None:
+    """Уровень всех логгеров приложения (по умолчанию логи каждого сообщения не выводятся)."""
+    numeric = getattr(logging, level.upper())
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(numeric)
+    logging.getLogger().setLevel(numeric)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="10,25,50", help="Уровни нагрузки через запятую")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="За сколько секунд стартуют все пользователи уровня")
+    parser.add_argument("--think", default="uniform:0.2,1.0", help="Пауза пользователя между действиями")
+    parser.add_argument("--tg-latency", default="fixed:0.03", help="Задержка ответа Bot API")
+    parser.add_argument("--hh-latency", default="lognormal:0.1,0.3", help="Задержка заглушки hh.ru")
+    parser.add_argument("--openai-latency", default="lognormal:1.5,0.4", help="Задержка заглушки OpenAI")
+    parser.add_argument("--hh-429-rate", type=float, default=0.0)
+    parser.add_argument("--openai-429-rate", type=float, default=0.0)
+    parser.add_argument("--openai-max-in-flight", type=int, default=0)
+    parser.add_argument("--standin-url", help="Внешние заглушки (python -m standins) вместо запуска в процессе")
+    parser.add_argument("--pipeline-mode", default=PipelineMode.TWO_STAGE.value, choices=[m.value for m in PipelineMode])
+    parser.add_argument("--rewrite-mode", default=RewriteMode.STREAM.value, choices=[m.value for m in RewriteMode])
+    parser.add_argument("--ingress", default="direct", choices=["direct", "webhook"], help="Как обновления попадают в диспетчер")
+    parser.add_argument("--workers", type=int, help="Воркеров очереди рерайта (по умолчанию из окружения)")
+    parser.add_argument("--max-queue", type=int, help="Длина очереди рерайта (по умолчанию из окружения)")
+    parser.add_argument("--vacancy-pool", type=int, default=20, help="Сколько разных вакансий на всех пользователей")
+    parser.add_argument("--stage-timeout", type=float, default=300.0, help="Максимальное ожидание ответа на этапе (сек)")
+    parser.add_argument("--slo", type=float, default=60.0, help="Порог p95 сессии (сек)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Порог доли ошибок")
+    parser.add_argument("--max-lag-ms", type=float, default=100.0, help="Порог p99 задержки цикла событий (мс)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Память на сессию по tracemalloc (медленнее)")
+    parser.add_argument("--warmup", type=int, default=2, help="Сессий прогрева перед замерами (не входят в отчёт)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="Сохранить отчёт в JSON")
+    parser.add_argument("--baseline", help="Отчёт JSON для сравнения")
+    args = parser.parse_args()
+
+    levels = [int(value) for value in args.users.split(",") if value.strip()]
+    rng = random.Random(args.seed)
+    think = LatencyModel.parse(args.think, rng)
+
+    standins: Optional[StandinServer] = None
+    if args.standin_url:
+        standin_url = args.standin_url.rstrip("/")
+    else:
+        standins = StandinServer(
+            hh_faults=FaultProfile(
+                latency=LatencyModel.parse(args.hh_latency, rng),
+                rate_limit_rate=args.hh_429_rate,
+                rng=rng
+            ),
+            openai_faults=FaultProfile(
+                latency=LatencyModel.parse(args.openai_latency, rng),
+                rate_limit_rate=args.openai_429_rate,
+                max_in_flight=args.openai_max_in_flight,
+                rng=rng
+            )
+        )
+        await standins.start()
+        standin_url = standins.base_url
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    # Веб-сервер бота берёт порт из PORT, как на хостинге
+    os.environ["PORT"] = str(free_port())
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "aiogram": aiogram_version,
+        "params": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        "levels": [],
+        "max_sustainable_users": 0,
+    }
+    with tempfile.TemporaryDirectory(prefix="e2e-benchmark-") as data_dir:
+        config = make_config(args, standin_url, int(os.environ["PORT"]), data_dir)
+        report["params"]["jobs"] = dataclasses.asdict(config.jobs)
+        harness = BotHarness(config, args.ingress, LatencyModel.parse(args.tg_latency, rng), args.stage_timeout)
+        await harness.start()
+        set_log_level(args.log_level)
+        try:
+            first_user_id = 1
+            if args.warmup:
+                # Прогрев: ленивые импорты, схемы моделей, пулы соединений
+                await asyncio.gather(*(
+                    run_session(harness, first_user_id + index, "100000", PipelineMode(args.pipeline_mode), think)
+                    for index in range(args.warmup)
+                ))
+                first_user_id += args.warmup
+            for users in levels:
+                level = await run_level(harness, users, first_user_id, args, think, standin_url)
+                first_user_id += users
+                report["levels"].append(level)
+                print_level(level)
+                if not level["sustainable"]:
+                    break
+                report["max_sustainable_users"] = users
+        finally:
+            await harness.stop()
+            if standins:
+                await standins.stop()
+            if args.tracemalloc:
+                tracemalloc.stop()
+
+    print(
+        f"\nМаксимум пользователей при p95 сессии ≤ {args.slo:g} с, ошибках ≤ {args.max_error_rate:.0%} "
+        f"и p99 задержки цикла ≤ {args.max_lag_ms:g} мс: {report['max_sustainable_users']}"
+    )
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчёт сохранён: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,354 @@
+# tests/replay_benchmark.py
+"""
+Воспроизведение архивных прогонов пайплайна без OpenAI и hh.ru.
+
+Входные данные реальных прогонов (из архива RunArchive или старых папок LOG/)
+снова проходят через пайплайн, а вместо OpenAI используется детерминированный
+фейковый клиент, возвращающий записанные ответы модели. Измеряются этапы:
+  - extract: EntityExtractor по исходному резюме HH;
+  - prompts: сборка промптов GAP-анализа и финального рерайта;
+  - pipeline: gap_analysis + final_resume_rewrite (сериализация, валидация
+    и починка ответа, планировщик) с фейковой моделью;
+  - update_body: ResumeUpdaterService.build_update_body.
+Для каждого этапа выводятся задержка (p50/p95), выделенная память
+(tracemalloc, отдельным проходом, чтобы не искажать задержки) и итоговая
+пропускная способность при параллельном воспроизведении.
+
+Запуск:
+    python -m tests.replay_benchmark [--archive storage/archive | --log-dir LOG]
+        [--limit 200] [--rounds 3] [--concurrency 8] [--llm-latency 0] [--json report.json]
+
+Отчёт в JSON удобно сохранять для сравнения между коммитами.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+import tracemalloc
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.config import Config, Environment, OpenAIConfig
+from core.logger import setup_logger
+from models.gap_analysis import ResumeGapAnalysis
+from models.resume import ResumeUpdate
+from models.vacancy import VacancyRequirements
+from services.entity_extractor import EntityExtractor
+from services.llm_service import LLMService
+from services.resume_updater import ResumeUpdaterService
+from services.resume_validator import EXPERIENCE_SECTION_RE
+from services.run_archive import RunArchive
+
+logger = setup_logger(__name__)
+
+STAGES = ("extract", "prompts", "pipeline", "update_body")
+
+# Раздел в промпте рерайта/исправления одного раздела (см. LLMService._create_section_rewrite_prompt)
+SECTION_PROMPT_RE = re.compile(r"Section to rewrite: (\S+)")
+
+# Прогон, ответы которого возвращает фейковая модель в текущей задаче
+current_record: ContextVar[Dict[str, Any]] = ContextVar("current_record")
+
+
+# -----------------------------------------------------------------------------
+# Загрузка прогонов
+# -----------------------------------------------------------------------------
+
+def load_archive(root_dir: str) -> Iterator[Dict[str, Any]]:
+    """Записи архива RunArchive."""
+    for path in sorted(os.listdir(root_dir)):
+        if path.startswith("runs-") and path.endswith(".jsonl.gz"):
+            yield from RunArchive.iter_segment(os.path.join(root_dir, path))
+
+
+def load_log_dir(log_dir: str) -> Iterator[Dict[str, Any]]:
+    """Прогоны из старых папок LOG/<timestamp>_<resume_id>/ с отдельными JSON-файлами."""
+    files = {
+        "original_resume": "original_resume.json",
+        "parsed_resume": "parsed_resume.json",
+        "parsed_vacancy": "parsed_vacancy.json",
+        "gap_analysis": "gap_analysis.json",
+        "final_resume": "final_resume.json",
+    }
+    for folder in sorted(os.listdir(log_dir)):
+        record: Dict[str, Any] = {"run_id": folder, "resume_id": folder.rsplit("_", 1)[-1]}
+        for key, filename in files.items():
+            path = os.path.join(log_dir, folder, filename)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    record[key] = json.load(f)
+        yield record
+
+
+def is_replayable(record: Dict[str, Any]) -> bool:
+    return all(record.get(key) for key in ("parsed_resume", "parsed_vacancy", "gap_analysis", "final_resume"))
+
+
+# -----------------------------------------------------------------------------
+# Фейковая модель
+# -----------------------------------------------------------------------------
+
+def recorded_requirements(parsed_vacancy: Dict[str, Any]) -> Dict[str, Any]:
+    """Детерминированные требования вакансии (в архиве они не хранятся)."""
+    key_skills = [skill for skill in parsed_vacancy.get("key_skills", []) if isinstance(skill, str)]
+    return VacancyRequirements(
+        position=parsed_vacancy.get("name", ""),
+        seniority="unknown",
+        must_have=key_skills,
+        nice_to_have=[],
+        stack=key_skills,
+        responsibilities=[]
+    ).model_dump()
+
+
+def recorded_piece(
+    final_resume: Dict[str, Any],
+    response_format: Any,
+    messages: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Часть записанного финального рерайта для запроса одного раздела:
+    запись experience[i] или поле раздела (модели разделов запрещают лишние поля).
+    """
+    match = SECTION_PROMPT_RE.search(str(messages[-1].get("content", "")))
+    section = match.group(1) if match else ""
+    experience = EXPERIENCE_SECTION_RE.match(section)
+    if experience:
+        entries = final_resume.get("experience") or []
+        index = int(experience.group(1))
+        source = entries[index] if index < len(entries) else {}
+    else:
+        source = final_resume
+    return {name: source[name] for name in response_format.model_fields if name in source}
+
+
+class ReplayCompletions:
+    """Заменяет client.beta.chat.completions: отвечает записанными результатами."""
+
+    def __init__(self, llm_service: LLMService, latency: float = 0.0):
+        self.llm_service = llm_service
+        self.latency = latency
+
+    async def parse(self, messages: List[Dict[str, Any]], response_format: Any, **kwargs: Any) -> Any:
+        record = current_record.get()
+        if response_format is ResumeGapAnalysis:
+            payload = record["gap_analysis"]
+        elif response_format is VacancyRequirements:
+            payload = recorded_requirements(record["parsed_vacancy"])
+        elif response_format is ResumeUpdate:
+            payload = record["final_resume"]
+        else:
+            # Исправление отдельного раздела — соответствующая часть финального рерайта
+            payload = recorded_piece(record["final_resume"], response_format, messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = json.dumps(payload, ensure_ascii=False)
+        count = self.llm_service.serializer.count_tokens
+        usage = SimpleNamespace(
+            prompt_tokens=sum(count(str(message.get("content", ""))) for message in messages),
+            completion_tokens=count(content)
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+class ReplayClient:
+    """Минимальная замена AsyncOpenAI для воспроизведения."""
+
+    def __init__(self, llm_service: LLMService, latency: float = 0.0):
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=ReplayCompletions(llm_service, latency)))
+
+    async def close(self) -> None:
+        pass
+
+
+async def make_replay_service(latency: float) -> LLMService:
+    """LLMService без кэша, обращающийся к фейковой модели."""
+    config = Config(bot=None, hh=None, openai=OpenAIConfig(api_key="replay"), environment=Environment.DEVELOPMENT)
+    llm_service = LLMService(config)
+    await llm_service.client.close()
+    llm_service.client = ReplayClient(llm_service, latency)
+    return llm_service
+
+
+# -----------------------------------------------------------------------------
+# Этапы
+# -----------------------------------------------------------------------------
+
+async def run_stage(stage: str, record: Dict[str, Any], llm_service: LLMService, extractor: EntityExtractor) -> Any:
+    parsed_resume = record["parsed_resume"]
+    parsed_vacancy = record["parsed_vacancy"]
+    if stage == "extract":
+        if record.get("original_resume"):
+            return extractor.extract_resume_info(record["original_resume"])
+        return None
+    if stage == "prompts":
+        gap_result = ResumeGapAnalysis.model_validate(record["gap_analysis"])
+        requirements = VacancyRequirements.model_validate(recorded_requirements(parsed_vacancy))
+        return (
+            llm_service._create_gap_analysis_prompt(parsed_resume, parsed_vacancy, requirements),
+            llm_service._final_rewrite_messages(parsed_resume, gap_result),
+        )
+    if stage == "pipeline":
+        gap_result = await llm_service.gap_analysis(parsed_resume, parsed_vacancy, vacancy_id=record.get("vacancy_id"))
+        if not gap_result:
+            raise RuntimeError("gap_analysis вернул None")
+        final_resume = await llm_service.final_resume_rewrite(parsed_resume, gap_result)
+        if not final_resume:
+            raise RuntimeError("final_resume_rewrite вернул None")
+        record["_replayed_resume"] = final_resume
+        return final_resume
+    if stage == "update_body":
+        final_resume = record.get("_replayed_resume")
+        if final_resume is None or not record.get("original_resume"):
+            return None
+        return ResumeUpdaterService.build_update_body(record["original_resume"], final_resume)
+    raise ValueError(stage)
+
+
+async def replay_record(record: Dict[str, Any], llm_service: LLMService, extractor: EntityExtractor) -> None:
+    current_record.set(record)
+    for stage in STAGES:
+        await run_stage(stage, record, llm_service, extractor)
+
+
+async def measure_latency(
+    records: List[Dict[str, Any]],
+    llm_service: LLMService,
+    extractor: EntityExtractor,
+    rounds: int
+) -> Dict[str, List[float]]:
+    """Последовательное воспроизведение: задержка каждого этапа каждого прогона (мс)."""
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for _ in range(rounds):
+        for record in records:
+            current_record.set(record)
+            for stage in STAGES:
+                started = time.perf_counter()
+                await run_stage(stage, record, llm_service, extractor)
+                latencies[stage].append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def measure_allocations(
+    records: List[Dict[str, Any]],
+    llm_service: LLMService,
+    extractor: EntityExtractor
+) -> Dict[str, Dict[str, float]]:
+    """Отдельный проход под tracemalloc: пиковая и оставшаяся память на этап (КБ)."""
+    allocations: Dict[str, Dict[str, List[float]]] = {stage: {"peak": [], "retained": []} for stage in STAGES}
+    tracemalloc.start()
+    try:
+        for record in records:
+            current_record.set(record)
+            for stage in STAGES:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                await run_stage(stage, record, llm_service, extractor)
+                current, peak = tracemalloc.get_traced_memory()
+                allocations[stage]["peak"].append((peak - before) / 1024)
+                allocations[stage]["retained"].append((current - before) / 1024)
+    finally:
+        tracemalloc.stop()
+    return {
+        stage: {key: round(statistics.mean(values), 1) for key, values in stats.items()}
+        for stage, stats in allocations.items()
+    }
+
+
+async def measure_throughput(
+    records: List[Dict[str, Any]],
+    llm_service: LLMService,
+    extractor: EntityExtractor,
+    concurrency: int,
+    rounds: int
+) -> Dict[str, float]:
+    """Параллельное воспроизведение всех прогонов: прогонов в секунду."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(record: Dict[str, Any]) -> None:
+        async with semaphore:
+            # Копия: у параллельных повторов одного прогона свой результат рерайта
+            await replay_record(dict(record), llm_service, extractor)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(record) for _ in range(rounds) for record in records))
+    elapsed = time.perf_counter() - started
+    total = len(records) * rounds
+    return {"runs": total, "seconds": round(elapsed, 3), "runs_per_second": round(total / elapsed, 1)}
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3) if ordered else 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--archive", default=os.path.join("storage", "archive"), help="Каталог архива RunArchive")
+    source.add_argument("--log-dir", help="Каталог старых логов LOG/ (папка на прогон)")
+    parser.add_argument("--limit", type=int, default=200, help="Максимум прогонов")
+    parser.add_argument("--rounds", type=int, default=3, help="Повторов при замере задержек и пропускной способности")
+    parser.add_argument("--concurrency", type=int, default=8, help="Параллельных прогонов при замере пропускной способности")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Искусственная задержка ответа модели (сек)")
+    parser.add_argument("--json", help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    source_records = load_log_dir(args.log_dir) if args.log_dir else load_archive(args.archive)
+    records = []
+    for record in source_records:
+        if is_replayable(record):
+            records.append(record)
+        if len(records) >= args.limit:
+            break
+    if not records:
+        print("Нет прогонов для воспроизведения")
+        return
+
+    llm_service = await make_replay_service(args.llm_latency)
+    extractor = EntityExtractor()
+    try:
+        latencies = await measure_latency(records, llm_service, extractor, args.rounds)
+        allocations = await measure_allocations(records, llm_service, extractor)
+        throughput = await measure_throughput(records, llm_service, extractor, args.concurrency, args.rounds)
+    finally:
+        await llm_service.close()
+
+    report = {
+        "records": len(records),
+        "stages": {
+            stage: {
+                "p50_ms": percentile(latencies[stage], 0.5),
+                "p95_ms": percentile(latencies[stage], 0.95),
+                "peak_kb": allocations[stage]["peak"],
+                "retained_kb": allocations[stage]["retained"],
+            }
+            for stage in STAGES
+        },
+        "throughput": throughput,
+        "llm_usage": {stage: dict(stats) for stage, stats in llm_service.usage.items()},
+    }
+
+    print(f"\nПрогонов: {len(records)}")
+    print(f"{'этап':<12} {'p50, мс':>10} {'p95, мс':>10} {'пик, КБ':>10} {'осталось, КБ':>13}")
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:<12} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} "
+            f"{stats['peak_kb']:>10.1f} {stats['retained_kb']:>13.1f}"
+        )
+    print(
+        f"\nПропускная способность (concurrency={args.concurrency}): "
+        f"{throughput['runs_per_second']} прогонов/с ({throughput['runs']} за {throughput['seconds']} с)"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчёт сохранён: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+# tests/test_blob_store.py
+import asyncio
+import os
+
+from services.blob_store import BlobStore
+
+
+def test_concurrent_identical_put(tmp_path):
+    """Параллельная запись одного объекта не падает и даёт одну ссылку и один файл."""
+    store = BlobStore(str(tmp_path))
+    # Крупный плохо сжимаемый объект: запись занимает заметное время, и потоки пересекаются
+    vacancy = {"id": "123", "skills": [f"{i * 7919 % 100003:x}" for i in range(20000)]}
+
+    async def run():
+        for _ in range(10):
+            refs = await asyncio.gather(*(store.put(vacancy) for _ in range(8)))
+            assert len(set(refs)) == 1
+            assert await store.get(refs[0]) == vacancy
+            os.remove(store._path(refs[0]))
+
+    asyncio.run(run())
+    leftovers = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert leftovers == []
@@ -0,0 +1,57 @@
+# tests/test_circuit_breaker.py
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from config.config import HHLimitsConfig
+from models.tokens import HHTokens
+from services.hh_api import HeadHunterAPI
+from services.rate_limiter import CircuitState
+from standins.faults import FaultProfile, LatencyModel
+from standins.server import StandinServer
+
+USER_ID = 1
+
+
+async def make_client(server: StandinServer) -> HeadHunterAPI:
+    hh_api = HeadHunterAPI(
+        client_id="standin",
+        client_secret="standin",
+        redirect_uri="http://127.0.0.1/",
+        limits=HHLimitsConfig(breaker_threshold=1, breaker_reset_timeout=0.0),
+        base_url=server.base_url
+    )
+    await hh_api.token_vault.set(USER_ID, HHTokens.from_token_response(server.hh.issue_tokens()))
+    return hh_api
+
+
+def test_cancelled_half_open_probe_releases_breaker():
+    """Отменённая проба в HALF_OPEN не блокирует последующие запросы."""
+
+    async def run():
+        faults = FaultProfile(latency=LatencyModel("fixed", (1.0,)))
+        server = StandinServer(hh_faults=faults)
+        await server.start()
+        hh_api = await make_client(server)
+        try:
+            hh_api.circuit_breaker.record_failure()
+            assert hh_api.circuit_breaker.state == CircuitState.OPEN
+
+            # Проба зависает на ответе HH и отменяется (пользователь ушёл, остановка очереди)
+            probe = asyncio.create_task(hh_api.make_api_request("/vacancies/1", user_id=USER_ID))
+            await asyncio.sleep(0.2)
+            assert hh_api.circuit_breaker.state == CircuitState.HALF_OPEN
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+            faults.latency = LatencyModel("fixed", (0.0,))
+            vacancy = await hh_api.make_api_request("/vacancies/1", user_id=USER_ID)
+            assert vacancy["id"] == "1"
+            assert hh_api.circuit_breaker.state == CircuitState.CLOSED
+        finally:
+            await hh_api.close()
+            await server.stop()
+
+    asyncio.run(run())
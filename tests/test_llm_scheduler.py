@@ -0,0 +1,34 @@
+# tests/test_llm_scheduler.py
+import asyncio
+import time
+
+import httpx
+import openai
+
+from services.llm_scheduler import LLMScheduler
+
+
+def _rate_limit_error(retry_after: str) -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://standin/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_run_honours_zero_retry_after():
+    async def run():
+        scheduler = LLMScheduler(backoff_base=5.0)
+        calls = []
+
+        async def call():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise _rate_limit_error("0")
+            return "ok"
+
+        started = time.monotonic()
+        assert await scheduler.run(call, user_id=1) == "ok"
+        # Retry-After: 0 — повтор сразу, без экспоненциальной задержки
+        assert time.monotonic() - started < 1.0
+        assert scheduler.retries == 1
+
+    asyncio.run(run())
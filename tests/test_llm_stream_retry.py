@@ -0,0 +1,57 @@
+# tests/test_llm_stream_retry.py
+import asyncio
+import random
+
+from config.config import Config, Environment, OpenAIConfig
+from models.gap_analysis import ResumeGapAnalysis
+from services.entity_extractor import EntityExtractor
+from services.llm_service import LLMService
+from standins.faults import FaultProfile
+from standins.hh import make_resume
+from standins.openai_api import SchemaSampler
+from standins.server import StandinServer
+
+
+class ScriptedRandom(random.Random):
+    """Первый запрос к заглушке получает 429, остальные — успешный ответ."""
+
+    def __init__(self):
+        super().__init__(0)
+        self._rolls = [0.0]
+
+    def random(self) -> float:
+        return self._rolls.pop(0) if self._rolls else 0.99
+
+
+def test_stream_rewrite_retries_rate_limit_before_output():
+    async def run():
+        faults = FaultProfile(rate_limit_rate=0.5, retry_after=0.1, rng=ScriptedRandom())
+        server = StandinServer(openai_faults=faults)
+        await server.start()
+        config = Config(
+            bot=None,
+            hh=None,
+            openai=OpenAIConfig(api_key="standin", base_url=f"{server.base_url}/v1"),
+            environment=Environment.DEVELOPMENT
+        )
+        llm_service = LLMService(config)
+        try:
+            parsed_resume = EntityExtractor().extract_resume_info(make_resume("1")).model_dump(exclude_none=True)
+            gap_result = ResumeGapAnalysis.model_validate(
+                SchemaSampler(random.Random(0)).sample(ResumeGapAnalysis.model_json_schema())
+            )
+            events = []
+
+            async def on_event(event):
+                events.append(event)
+
+            final_resume = await llm_service.stream_final_resume_rewrite(parsed_resume, gap_result, on_event)
+            assert final_resume is not None
+            assert events
+            assert faults.rate_limited == 1
+            assert llm_service.scheduler.retries == 1
+        finally:
+            await llm_service.close()
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,24 @@
+# tests/test_prompt_serializer.py
+from services.prompt_serializer import PromptSerializer
+
+
+def test_single_field_experience_keeps_labels_and_indices():
+    serializer = PromptSerializer()
+    experience = [
+        {"position": "Backend-разработчик"},
+        {"position": "Тимлид", "company": "ООО Ромашка", "industries": [{"id": "7", "name": "IT"}]}
+    ]
+    assert serializer.render(experience).splitlines() == [
+        "[0]",
+        "  position: Backend-разработчик",
+        "[1]",
+        "  position: Тимлид",
+        "  company: ООО Ромашка",
+        "  industries: IT"
+    ]
+
+
+def test_reference_values_collapse_to_name():
+    serializer = PromptSerializer()
+    roles = [{"id": "96", "name": "Программист, разработчик"}, {"name": "Python"}]
+    assert serializer.render(roles) == "Программист, разработчик, Python"
@@ -0,0 +1,42 @@
+# tests/test_resume_validator.py
+from services.resume_validator import ResumeOutputValidator
+
+
+def _candidate(**overrides):
+    candidate = {
+        "title": "Python-разработчик",
+        "skills": "Python, asyncio",
+        "skill_set": ["Python"],
+        "professional_roles": [],
+        "experience": [{"position": "Разработчик", "description": "Сервисы на aiohttp"}]
+    }
+    candidate.update(overrides)
+    return candidate
+
+
+def test_empty_source_sections_are_not_flagged():
+    validator = ResumeOutputValidator()
+    parsed_resume = {
+        "title": "Разработчик",
+        "skills": "",
+        "skill_set": ["Python"],
+        "professional_roles": [],
+        "experience": [{"position": "Разработчик", "description": "Бэкенд"}]
+    }
+    report = validator.check(_candidate(skills=""), parsed_resume)
+    assert report.ok, report.issues
+    assert report.data["professional_roles"] == []
+    assert report.data["skills"] == ""
+
+
+def test_empty_answer_for_filled_section_is_flagged():
+    validator = ResumeOutputValidator()
+    parsed_resume = {
+        "title": "Разработчик",
+        "skills": "Python",
+        "skill_set": ["Python"],
+        "professional_roles": [{"name": "Программист, разработчик"}],
+        "experience": [{"position": "Разработчик", "description": "Бэкенд"}]
+    }
+    report = validator.check(_candidate(skills=""), parsed_resume)
+    assert sorted(issue.section for issue in report.issues) == ["professional_roles", "skills"]
@@ -0,0 +1,77 @@
+# tests/test_token_refresh.py
+import asyncio
+
+import aiohttp
+import pytest
+
+from config.config import HHLimitsConfig
+from models.tokens import HHTokens
+from services.hh_api import HeadHunterAPI, InvalidGrantError
+from services.token_refresher import TokenRefreshScheduler
+from standins.faults import FaultProfile
+from standins.server import StandinServer
+
+USER_ID = 1
+
+
+async def start(error_rate: float = 0.0):
+    faults = FaultProfile(error_rate=error_rate)
+    server = StandinServer(hh_faults=faults)
+    await server.start()
+    hh_api = HeadHunterAPI(
+        client_id="standin",
+        client_secret="standin",
+        redirect_uri="http://127.0.0.1/",
+        limits=HHLimitsConfig(backoff_base=0.01, backoff_max=0.05, retry_budget_ratio=1.0),
+        base_url=server.base_url,
+        token_url=f"{server.base_url}/oauth/token"
+    )
+    # Токен уже истекает: его подхватит упреждающее обновление
+    tokens = server.hh.issue_tokens()
+    tokens["expires_in"] = 60
+    await hh_api.token_vault.set(USER_ID, HHTokens.from_token_response(tokens))
+    return server, hh_api, faults
+
+
+def test_token_endpoint_503_keeps_tokens():
+    """503 от token endpoint повторяется и не удаляет токены пользователя."""
+
+    async def run():
+        server, hh_api, faults = await start(error_rate=1.0)
+        try:
+            with pytest.raises(aiohttp.ClientResponseError) as error:
+                await hh_api.refresh_access_token(USER_ID)
+            assert error.value.status == 503
+            assert faults.requests == 1 + hh_api.limits.max_retries
+            assert await hh_api.token_vault.get(USER_ID) is not None
+
+            # Упреждающее обновление тоже не выходит из строя и токены не трогает
+            assert await TokenRefreshScheduler(hh_api).refresh_expiring() == 0
+            assert await hh_api.token_vault.get(USER_ID) is not None
+        finally:
+            await hh_api.close()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_invalid_grant_deletes_tokens_only_on_401_path():
+    """invalid_grant удаляет токены при обновлении по 401, но не при упреждающем обновлении."""
+
+    async def run():
+        server, hh_api, _ = await start()
+        try:
+            stale = HHTokens(access_token="stale", refresh_token="revoked", expires_at=0)
+            await hh_api.token_vault.set(USER_ID, stale)
+
+            assert await TokenRefreshScheduler(hh_api).refresh_expiring() == 0
+            assert await hh_api.token_vault.get(USER_ID) is not None
+
+            with pytest.raises(InvalidGrantError):
+                await hh_api.refresh_access_token(USER_ID, stale_access_token="stale")
+            assert await hh_api.token_vault.get(USER_ID) is None
+        finally:
+            await hh_api.close()
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+# tests/test_vacancy_cache.py
+import asyncio
+
+from services.hh_api import HHResponse
+from services.vacancy_cache import VacancyCache
+from standins.hh import make_vacancy
+
+
+class CountingAPI:
+    """Подменяет HeadHunterAPI: отвечает вакансией-заглушкой и считает запросы."""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def request(self, path, user_id=None, headers=None):
+        self.requests += 1
+        await asyncio.sleep(0.05)
+        return HHResponse(status=200, data=make_vacancy(path.rsplit("/", 1)[-1]), headers={})
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def run():
+        api = CountingAPI()
+        cache = VacancyCache(api)
+        entries = await asyncio.gather(*(cache.get("42", user_id=i) for i in range(10)))
+        assert api.requests == 1
+        assert cache.misses == 1
+        assert all(entry is entries[0] for entry in entries)
+        assert entries[0].parsed is not None
+
+    asyncio.run(run())